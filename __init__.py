@@ -5,6 +5,7 @@ Sistema de Gestion de Peliculas con MongoDB
 Modulos:
     - config: Configuracion y logging
     - models: Datos de peliculas y esquema de validacion
+    - validator: Validacion en cliente compilada desde el esquema
     - database: Conexion y configuracion de MongoDB
     - crud: Operaciones Create, Read, Update, Delete
     - queries: Consultas avanzadas y agregaciones
@@ -0,0 +1,232 @@
+"""
+Coleccion de actores con su filmografia precalculada.
+
+Cada actor es un documento (_id = nombre) con la lista de sus peliculas
+y de los directores con los que trabajo. Se genera con una agregacion
+sobre actores.nombre y se mantiene con los eventos de escritura de
+CRUDOperations, de modo que la filmografia es una lectura por _id y
+"actores que trabajaron con X" usa un indice multikey sobre directores.
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.collection import Collection
+
+from config import get_logger
+
+logger = get_logger(__name__)
+
+
+def clave_nombre(nombre: str) -> str:
+    """Clave de busqueda de un nombre (minusculas, sin espacios extremos)."""
+    return nombre.strip().lower()
+
+
+def _entrada(pelicula: Dict[str, Any], actor: Dict[str, Any]) -> Dict[str, Any]:
+    """Entrada de la filmografia de un actor."""
+    return {
+        "titulo": pelicula["titulo"],
+        "año": pelicula.get("año"),
+        "director": pelicula.get("director"),
+        "rol": actor.get("rol")
+    }
+
+
+class ActorService:
+    """
+    Busqueda de actores, filmografias y relaciones entre actores y directores.
+    """
+
+    def __init__(self, collection: Collection, actores: Collection):
+        """
+        Inicializa el servicio.
+
+        Args:
+            collection: Coleccion de peliculas
+            actores: Coleccion de actores precalculada
+        """
+        self.collection = collection
+        self.actores = actores
+
+    def crear_indices(self) -> None:
+        """Indices de la coleccion de actores."""
+        self.actores.create_index([("clave", ASCENDING)], name="idx_clave")
+        self.actores.create_index([("directores", ASCENDING)], name="idx_directores")
+        self.actores.create_index([("num_peliculas", DESCENDING)], name="idx_num_peliculas")
+
+    # ==================== MANTENIMIENTO ====================
+
+    def aplicar_evento(self, evento: str, datos: Dict[str, Any]) -> None:
+        """
+        Observador para CRUDOperations.registrar_observador.
+
+        Args:
+            evento: Nombre del evento de escritura
+            datos: Datos del evento
+        """
+        if evento == "insertar":
+            self._añadir(datos["peliculas"])
+        elif evento == "eliminar":
+            self._quitar(datos["peliculas"])
+
+    def _añadir(self, peliculas: List[Dict[str, Any]]) -> None:
+        """Añade las peliculas a la filmografia de sus actores."""
+        operaciones = [
+            UpdateOne(
+                {"_id": a["nombre"]},
+                {
+                    "$push": {"peliculas": _entrada(p, a)},
+                    "$addToSet": {"directores": p.get("director")},
+                    "$inc": {"num_peliculas": 1},
+                    "$setOnInsert": {"nombre": a["nombre"], "clave": clave_nombre(a["nombre"])}
+                },
+                upsert=True
+            )
+            for p in peliculas
+            for a in p.get("actores") or []
+            if a.get("nombre")
+        ]
+        if operaciones:
+            self.actores.bulk_write(operaciones, ordered=False)
+
+    def _quitar(self, peliculas: List[Dict[str, Any]]) -> None:
+        """Quita las peliculas de la filmografia de sus actores."""
+        operaciones = [
+            UpdateOne({"_id": a["nombre"]}, [
+                {"$set": {"peliculas": {"$filter": {
+                    "input": "$peliculas",
+                    "cond": {"$ne": ["$$this.titulo", p["titulo"]]}
+                }}}},
+                {"$set": {
+                    "num_peliculas": {"$size": "$peliculas"},
+                    "directores": {"$setUnion": ["$peliculas.director", []]}
+                }}
+            ])
+            for p in peliculas
+            for a in p.get("actores") or []
+            if a.get("nombre")
+        ]
+        if operaciones:
+            self.actores.bulk_write(operaciones, ordered=False)
+            self.actores.delete_many({"num_peliculas": {"$lte": 0}})
+
+    def reconstruir(self) -> int:
+        """
+        Regenera la coleccion de actores desde las peliculas.
+
+        La agregacion escribe el resultado con $out, que sustituye la
+        coleccion de forma atomica y conserva sus indices.
+
+        Returns:
+            Numero de actores
+        """
+        pipeline = [
+            {"$match": {"actores.0": {"$exists": True}}},
+            {"$project": {"titulo": 1, "año": 1, "director": 1, "actores": 1}},
+            {"$unwind": "$actores"},
+            {"$match": {"actores.nombre": {"$type": "string"}}},
+            {"$sort": {"año": 1}},
+            {"$group": {
+                "_id": "$actores.nombre",
+                "peliculas": {"$push": {
+                    "titulo": "$titulo",
+                    "año": "$año",
+                    "director": "$director",
+                    "rol": "$actores.rol"
+                }},
+                "directores": {"$addToSet": "$director"},
+                "num_peliculas": {"$sum": 1}
+            }},
+            {"$set": {"nombre": "$_id", "clave": {"$toLower": {"$trim": {"input": "$_id"}}}}},
+            {"$out": self.actores.name}
+        ]
+        self.collection.aggregate(pipeline, allowDiskUse=True)
+        self.crear_indices()
+
+        total = self.actores.estimated_document_count()
+        logger.info("Coleccion de actores reconstruida: %d actores", total)
+        return total
+
+    # ==================== CONSULTA ====================
+
+    def buscar_actores(self, texto: str, limite: int = 20) -> List[Dict[str, Any]]:
+        """
+        Actores cuyo nombre empieza por el texto (sin distinguir mayusculas).
+
+        El prefijo anclado usa el indice sobre clave.
+
+        Returns:
+            Lista de {"nombre", "num_peliculas"} por numero de peliculas
+        """
+        return list(
+            self.actores.find(
+                {"clave": {"$regex": "^" + re.escape(clave_nombre(texto))}},
+                {"_id": 0, "nombre": 1, "num_peliculas": 1}
+            )
+            .sort("num_peliculas", DESCENDING)
+            .limit(limite)
+        )
+
+    def filmografia(self, nombre: str) -> Optional[Dict[str, Any]]:
+        """
+        Filmografia de un actor.
+
+        Returns:
+            Diccionario con nombre, num_peliculas, directores y peliculas
+            ordenadas por año, o None si no existe
+        """
+        actor = self.actores.find_one({"_id": nombre}, {"_id": 0, "clave": 0})
+        if actor is not None:
+            actor["peliculas"].sort(key=lambda p: p.get("año") or 0)
+        return actor
+
+    def actores_con_director(self, director: str, limite: int = 0) -> List[Dict[str, Any]]:
+        """
+        Actores que trabajaron con un director.
+
+        Returns:
+            Lista de {"nombre", "peliculas"} con los titulos en comun,
+            de mas a menos colaboraciones
+        """
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"directores": director}},
+            {"$project": {
+                "_id": 0,
+                "nombre": 1,
+                "peliculas": {"$map": {
+                    "input": {"$filter": {"input": "$peliculas", "cond": {"$eq": ["$$this.director", director]}}},
+                    "in": "$$this.titulo"
+                }}
+            }},
+            {"$set": {"colaboraciones": {"$size": "$peliculas"}}},
+            {"$sort": {"colaboraciones": -1, "nombre": 1}}
+        ]
+        if limite:
+            pipeline.append({"$limit": limite})
+        pipeline.append({"$unset": "colaboraciones"})
+        return list(self.actores.aggregate(pipeline))
+
+    def coprotagonistas(self, nombre: str, limite: int = 10) -> List[Dict[str, Any]]:
+        """
+        Actores que compartieron reparto con uno dado.
+
+        Lee la filmografia del actor y el reparto de esas peliculas por
+        el indice de titulo.
+
+        Returns:
+            Lista de {"nombre", "peliculas_juntos"} de mayor a menor
+        """
+        actor = self.actores.find_one({"_id": nombre}, {"peliculas.titulo": 1})
+        if actor is None:
+            return []
+        titulos = [p["titulo"] for p in actor["peliculas"]]
+        conteo: Counter = Counter()
+        for p in self.collection.find({"titulo": {"$in": titulos}}, {"_id": 0, "actores.nombre": 1}):
+            conteo.update({a["nombre"] for a in p.get("actores") or [] if a.get("nombre")} - {nombre})
+        return [
+            {"nombre": otro, "peliculas_juntos": veces}
+            for otro, veces in sorted(conteo.items(), key=lambda c: (-c[1], c[0]))[:limite]
+        ]
@@ -3,13 +3,29 @@ Interfaz grafica web con Streamlit para el sistema de peliculas.
 Ejecutar: streamlit run app.py
 """
 
+import json
+import os
+import tempfile
+import threading
+
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from typing import Any, Dict, Iterable, List
 
 from database import DatabaseManager
-from crud import CRUDOperations
-from queries import QueryOperations
+from exporter import Exportador, FORMATOS
+from main import configurar_base_datos, crear_servicios
+from replica import ReplicaLocal
+from recomendador import RecomendadorColaborativo, RecomendadorContenido
+from config import (
+    APP_CACHE_MAX_ENTRIES,
+    APP_CACHE_TTL,
+    CHANGE_STREAM_ENABLED,
+    REPLICA_ENABLED,
+    SIMILARES_COLLECTION,
+    USER_REVIEWS_PAGE_SIZE,
+)
 
 
 # Configuracion de pagina
@@ -53,16 +69,134 @@ st.markdown("""
 
 @st.cache_resource
 def inicializar_conexion():
-    """Inicializa la conexion a MongoDB (cached)."""
+    """
+    Inicializa la conexion a MongoDB (cached).
+    
+    Como main.py, solo carga los datos y las colecciones auxiliares si
+    la coleccion esta vacia.
+    """
     db_manager = DatabaseManager()
     if db_manager.conectar():
-        db_manager.inicializar_datos()
-        db_manager.crear_indices()
-        db_manager.aplicar_validacion()
+        if db_manager.collection.estimated_document_count() == 0:
+            configurar_base_datos(db_manager)
         return db_manager
     return None
 
 
+# Servicios cuyas lecturas cambian con cada evento de escritura; los
+# eventos que no aparecen (insertar, eliminar) afectan a todos
+_SERVICIOS = (
+    "crud", "queries", "facetas", "historial", "reviews_usuario",
+    "actores", "busqueda", "similares", "colaborativo"
+)
+_SERVICIOS_POR_EVENTO = {
+    "reviews": ("crud", "queries", "historial", "reviews_usuario", "colaborativo"),
+    "eliminar_review": ("crud", "queries", "historial", "reviews_usuario", "colaborativo"),
+    "rating": ("crud", "queries", "facetas", "historial", "similares"),
+    "archivar_reviews": ("crud", "queries", "colaborativo"),
+}
+
+# Version de la cache de cada servicio: forma parte de la clave de
+# consultar, de modo que invalidar un servicio no descarta las lecturas
+# cacheadas de los demas (las antiguas caducan por TTL o max_entries)
+_versiones: Dict[str, int] = dict.fromkeys(_SERVICIOS, 0)
+_lock_versiones = threading.Lock()
+
+
+def _invalidar(servicios: Iterable[str]) -> None:
+    with _lock_versiones:
+        for servicio in set(servicios):
+            _versiones[servicio] += 1
+
+
+def _evento_de_cambio(cambio: Dict[str, Any]) -> str:
+    """Evento de crud equivalente a un evento del change stream."""
+    if cambio["operationType"] != "update":
+        return cambio["operationType"]
+    descripcion = cambio.get("updateDescription") or {}
+    campos = set(descripcion.get("updatedFields") or {}) | set(descripcion.get("removedFields") or [])
+    raices = {campo.split(".")[0] for campo in campos} - {"updatedAt", "version"}
+    if raices and raices <= {"reviews", "num_reviews", "suma_puntuaciones"}:
+        return "reviews"
+    if raices == {"rating"}:
+        return "rating"
+    return "update"
+
+
+def invalidar_cache(evento: str, datos: Dict[str, Any]) -> None:
+    """Observador de escrituras: invalida las lecturas de los servicios afectados."""
+    _invalidar(_SERVICIOS_POR_EVENTO.get(evento, _SERVICIOS))
+
+
+def invalidar_cache_cambios(lote: List[Dict[str, Any]]) -> None:
+    """Consumidor del bus de cambios: como invalidar_cache para cada evento."""
+    servicios = set()
+    for cambio in lote:
+        servicios.update(_SERVICIOS_POR_EVENTO.get(_evento_de_cambio(cambio), _SERVICIOS))
+    _invalidar(servicios)
+
+
+@st.cache_resource
+def obtener_servicios() -> Dict[str, Any]:
+    """
+    Crea los servicios una sola vez por proceso (cached).
+    
+    Los servicios y observadores comunes los crea main.crear_servicios;
+    aqui se añaden los recomendadores y la invalidacion de la cache.
+    """
+    db_manager = inicializar_conexion()
+    replica = None
+    if REPLICA_ENABLED:
+        replica = ReplicaLocal(db_manager.collection)
+        replica.iniciar()
+    servicios = crear_servicios(db_manager, replica)
+    crud = servicios["crud"]
+    colaborativo = RecomendadorColaborativo(db_manager.collection)
+    crud.registrar_observador(colaborativo.aplicar_evento)
+    crud.registrar_observador(invalidar_cache)
+    # Escrituras de otros procesos (cli, ingesta) llegan por el change stream
+    bus = None
+    if CHANGE_STREAM_ENABLED:
+        bus = db_manager.bus_cambios("app")
+        bus.registrar("cache", invalidar_cache_cambios)
+        bus.iniciar()
+    return {
+        **servicios,
+        "db": db_manager,
+        "similares": RecomendadorContenido(db_manager.collection, db_manager.db[SIMILARES_COLLECTION]),
+        "colaborativo": colaborativo,
+        "bus": bus
+    }
+
+
+def consultar(servicio: str, metodo: str, *args, **kwargs) -> Any:
+    """
+    Ejecuta una lectura de un servicio con cache por parametros.
+    
+    La clave de cache es (servicio, version, metodo, argumentos); cada
+    escritura solo invalida los servicios a los que afecta.
+    
+    Args:
+        servicio: crud, queries, facetas, historial, reviews_usuario,
+            actores, busqueda, similares o colaborativo
+        metodo: Metodo de lectura del servicio
+    """
+    return _consultar(servicio, _versiones[servicio], metodo, *args, **kwargs)
+
+
+@st.cache_data(ttl=APP_CACHE_TTL, max_entries=APP_CACHE_MAX_ENTRIES, show_spinner=False)
+def _consultar(servicio: str, version: int, metodo: str, *args, **kwargs) -> Any:
+    return getattr(obtener_servicios()[servicio], metodo)(*args, **kwargs)
+
+
+def mostrar_tabla(resultados: List[Dict], vacio: str = "No se encontraron resultados") -> None:
+    """Muestra una lista de documentos como tabla."""
+    if resultados:
+        st.dataframe(pd.DataFrame(resultados), use_container_width=True, hide_index=True)
+    else:
+        st.info(vacio)
+
+
 def main():
     # Inicializar conexion
     db_manager = inicializar_conexion()
@@ -72,9 +206,6 @@ def main():
         st.info("Verifica que MongoDB este ejecutandose en mongodb://mongodb_service:27017/")
         return
     
-    crud = CRUDOperations(db_manager.collection)
-    queries = QueryOperations(db_manager.collection)
-    
     # Header
     st.markdown('<p class="main-header">Sistema de Gestion de Peliculas</p>', unsafe_allow_html=True)
     st.markdown('<p class="sub-header">MongoDB + Python | MD003 - La Salle</p>', unsafe_allow_html=True)
@@ -84,28 +215,31 @@ def main():
         st.header("Navegacion")
         pagina = st.radio(
             "Selecciona una seccion:",
-            ["Dashboard", "Busquedas", "Consultas Avanzadas", "Agregaciones", "Gestionar Reviews", "Administrar"]
+            ["Dashboard", "Busquedas", "Consultas Avanzadas", "Agregaciones", "Gestionar Reviews", "Recomendaciones", "Administrar"]
         )
     
     # Contenido segun pagina
     if pagina == "Dashboard":
-        mostrar_dashboard(queries)
+        mostrar_dashboard()
     elif pagina == "Busquedas":
-        mostrar_busquedas(crud)
+        mostrar_busquedas()
     elif pagina == "Consultas Avanzadas":
-        mostrar_consultas_avanzadas(queries)
+        mostrar_consultas_avanzadas()
     elif pagina == "Agregaciones":
-        mostrar_agregaciones(queries)
+        mostrar_agregaciones()
     elif pagina == "Gestionar Reviews":
-        mostrar_gestion_reviews(crud)
+        mostrar_gestion_reviews()
+    elif pagina == "Recomendaciones":
+        mostrar_recomendaciones()
     elif pagina == "Administrar":
-        mostrar_administrar(crud, queries)
+        mostrar_administrar()
 
 
-def mostrar_dashboard(queries: QueryOperations):
+@st.fragment
+def mostrar_dashboard():
     """Muestra el dashboard principal con metricas."""
     
-    stats = queries.estadisticas_generales()
+    stats = consultar("queries", "estadisticas_generales")
     
     # Metricas principales
     col1, col2, col3, col4 = st.columns(4)
@@ -126,7 +260,7 @@ def mostrar_dashboard(queries: QueryOperations):
     
     with col1:
         st.subheader("Top 5 Peliculas")
-        top = queries.top_peliculas(5)
+        top = consultar("queries", "top_peliculas", 5)
         df_top = pd.DataFrame(top)
         if not df_top.empty:
             df_top = df_top[['titulo', 'director', 'año', 'rating', 'score_combinado']]
@@ -135,7 +269,7 @@ def mostrar_dashboard(queries: QueryOperations):
     
     with col2:
         st.subheader("Rating por Genero")
-        rating_genero = queries.rating_promedio_por_genero()
+        rating_genero = consultar("queries", "rating_promedio_por_genero")
         df_rating = pd.DataFrame(rating_genero)
         if not df_rating.empty:
             st.bar_chart(df_rating.set_index('genero')['rating_promedio'])
@@ -144,130 +278,251 @@ def mostrar_dashboard(queries: QueryOperations):
     
     # Reporte por decada
     st.subheader("Peliculas por Decada")
-    decadas = queries.reporte_por_decada()
-    df_decadas = pd.DataFrame([{
-        'Decada': d['decada'],
-        'Cantidad': d['cantidad'],
-        'Rating Promedio': d['rating_promedio'],
-        'Presupuesto Promedio': f"${d['presupuesto_promedio']:,.0f}"
-    } for d in decadas])
+    df_decadas = consultar("queries", "reporte_por_decada_df")
     
     if not df_decadas.empty:
+        df_decadas['presupuesto_promedio'] = df_decadas['presupuesto_promedio'].map(lambda v: f"${v:,.0f}")
+        df_decadas.columns = ['Decada', 'Cantidad', 'Rating Promedio', 'Presupuesto Promedio']
         st.dataframe(df_decadas, use_container_width=True, hide_index=True)
 
 
-def mostrar_busquedas(crud: CRUDOperations):
+def mostrar_busquedas():
     """Muestra la seccion de busquedas."""
     
     st.subheader("Busqueda de Peliculas")
     
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "Por Titulo", "Por Genero", "Por Director", "Por Rating", "Texto Completo"
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
+        "Por Titulo", "Por Genero", "Por Director", "Por Rating", "Texto Completo", "Difusa", "Facetas", "Avanzada"
     ])
     
     with tab1:
-        titulo = st.text_input("Buscar por titulo:", key="buscar_titulo")
-        if titulo:
-            resultados = crud.buscar_por_titulo(titulo)
-            if resultados:
-                df = pd.DataFrame(resultados)
-                st.dataframe(df, use_container_width=True, hide_index=True)
-            else:
-                st.info("No se encontraron resultados")
-    
+        busqueda_titulo()
     with tab2:
-        generos = ["Drama", "Accion", "Comedia", "Ciencia Ficcion", "Thriller", 
-                   "Fantasia", "Romance", "Crimen", "Animacion", "Aventura", "Guerra", "Misterio", "Familia"]
-        genero = st.selectbox("Selecciona un genero:", generos)
-        if st.button("Buscar por genero", key="btn_genero"):
-            resultados = crud.buscar_por_genero(genero)
-            if resultados:
-                df = pd.DataFrame(resultados)
-                st.dataframe(df, use_container_width=True, hide_index=True)
-            else:
-                st.info("No se encontraron peliculas de este genero")
-    
+        busqueda_genero()
     with tab3:
-        director = st.text_input("Buscar por director:", key="buscar_director")
-        if director:
-            resultados = crud.buscar_por_director(director)
-            if resultados:
-                df = pd.DataFrame(resultados)
-                st.dataframe(df, use_container_width=True, hide_index=True)
-            else:
-                st.info("No se encontraron resultados")
-    
+        busqueda_director()
     with tab4:
-        rating_min = st.slider("Rating minimo:", 0.0, 10.0, 8.0, 0.1)
-        if st.button("Buscar por rating", key="btn_rating"):
-            resultados = crud.buscar_por_rating_minimo(rating_min)
-            if resultados:
-                df = pd.DataFrame(resultados)
-                st.dataframe(df, use_container_width=True, hide_index=True)
-            else:
-                st.info("No se encontraron peliculas")
-    
+        busqueda_rating()
     with tab5:
-        texto = st.text_input("Busqueda de texto completo:", key="texto_completo")
-        if texto:
-            resultados = crud.busqueda_texto_completo(texto)
-            if resultados:
-                df = pd.DataFrame(resultados)
-                st.dataframe(df, use_container_width=True, hide_index=True)
-            else:
-                st.info("No se encontraron resultados")
+        busqueda_texto()
+    with tab6:
+        busqueda_difusa()
+    with tab7:
+        busqueda_facetas()
+    with tab8:
+        busqueda_avanzada()
+
+
+@st.fragment
+def busqueda_titulo():
+    """Busqueda por titulo."""
+    titulo = st.text_input("Buscar por titulo:", key="buscar_titulo")
+    if titulo:
+        mostrar_tabla(consultar("crud", "buscar_por_titulo", titulo))
+
+
+@st.fragment
+def busqueda_genero():
+    """Busqueda por genero con conteos de facetas."""
+    conteo_generos = {g['valor']: g['cantidad'] for g in consultar("facetas", "conteos", "genero")}
+    genero = st.selectbox(
+        "Selecciona un genero:",
+        list(conteo_generos),
+        format_func=lambda g: f"{g} ({conteo_generos[g]})"
+    )
+    if st.button("Buscar por genero", key="btn_genero"):
+        mostrar_tabla(consultar("crud", "buscar_por_genero", genero), "No se encontraron peliculas de este genero")
+
+
+@st.fragment
+def busqueda_director():
+    """Busqueda por director."""
+    director = st.text_input("Buscar por director:", key="buscar_director")
+    if director:
+        mostrar_tabla(consultar("crud", "buscar_por_director", director))
+
+
+@st.fragment
+def busqueda_rating():
+    """Busqueda por rating minimo."""
+    rating_min = st.slider("Rating minimo:", 0.0, 10.0, 8.0, 0.1)
+    if st.button("Buscar por rating", key="btn_rating"):
+        mostrar_tabla(consultar("crud", "buscar_por_rating_minimo", rating_min), "No se encontraron peliculas")
+
+
+@st.fragment
+def busqueda_texto():
+    """Busqueda de texto completo."""
+    texto = st.text_input("Busqueda de texto completo:", key="texto_completo")
+    if texto:
+        mostrar_tabla(consultar("crud", "busqueda_texto_completo", texto))
+
+
+@st.fragment
+def busqueda_difusa():
+    """Busqueda tolerante a erratas y acentos por titulo o director."""
+    texto = st.text_input("Titulo o director (admite erratas):", key="texto_difuso")
+    if texto:
+        mostrar_tabla(consultar("busqueda", "buscar", texto))
+
+
+@st.fragment
+def busqueda_facetas():
+    """Busqueda facetada."""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sel_generos = st.multiselect(
+            "Generos:", [g['valor'] for g in consultar("facetas", "conteos", "genero")], key="faceta_generos"
+        )
+    with col2:
+        decadas = sorted(d['valor'] for d in consultar("facetas", "conteos", "decada"))
+        sel_decada = st.selectbox(
+            "Decada:", [None] + decadas,
+            format_func=lambda d: "Todas" if d is None else f"{d}s", key="faceta_decada"
+        )
+    with col3:
+        sel_rating = st.slider("Rating minimo:", 0.0, 10.0, 0.0, 0.1, key="faceta_rating")
+    
+    resultado = consultar("facetas", "buscar", sel_generos, sel_decada, sel_rating or None)
+    st.write(f"**{resultado['total']}** peliculas")
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        if resultado['resultados']:
+            st.dataframe(pd.DataFrame(resultado['resultados']), use_container_width=True, hide_index=True)
+    with col2:
+        for tipo in ("genero", "decada", "idioma"):
+            st.caption(tipo.capitalize())
+            for f in resultado['facetas'][tipo][:10]:
+                st.write(f"{f['valor']} ({f['cantidad']})")
+
+
+# Limites del slider de años de la busqueda avanzada
+AÑO_MIN, AÑO_MAX = 1888, 2030
 
 
-def mostrar_consultas_avanzadas(queries: QueryOperations):
+@st.fragment
+def busqueda_avanzada():
+    """Busqueda combinando varios criterios."""
+    col1, col2 = st.columns(2)
+    with col1:
+        adv_titulo = st.text_input("Titulo contiene:", key="adv_titulo")
+        adv_director = st.text_input("Director contiene:", key="adv_director")
+        adv_generos = st.multiselect(
+            "Generos:", [g['valor'] for g in consultar("facetas", "conteos", "genero")], key="adv_generos"
+        )
+    with col2:
+        adv_años = st.slider("Años:", AÑO_MIN, AÑO_MAX, (AÑO_MIN, AÑO_MAX), key="adv_años")
+        adv_rating = st.slider("Rating minimo:", 0.0, 10.0, 0.0, 0.1, key="adv_rating")
+        adv_disponible = st.checkbox("Solo disponibles", key="adv_disponible")
+        adv_orden = st.selectbox("Ordenar por:", ["rating", "año", "titulo"], key="adv_orden")
+    
+    if st.button("Buscar", key="btn_avanzada"):
+        resultados = consultar(
+            "crud", "busqueda_avanzada",
+            titulo=adv_titulo or None,
+            generos=adv_generos or None,
+            director=adv_director or None,
+            # Los extremos del slider no filtran
+            año_inicio=adv_años[0] if adv_años[0] > AÑO_MIN else None,
+            año_fin=adv_años[1] if adv_años[1] < AÑO_MAX else None,
+            rating_min=adv_rating or None,
+            disponible=True if adv_disponible else None,
+            orden=adv_orden
+        )
+        mostrar_tabla(resultados, "No se encontraron peliculas")
+
+
+def mostrar_consultas_avanzadas():
     """Muestra consultas avanzadas."""
     
     st.subheader("Consultas Avanzadas")
     
-    tab1, tab2, tab3 = st.tabs(["Rango de Años", "Top Directores", "Buscar en Reviews"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Rango de Años", "Top Directores", "Buscar en Reviews", "Actores"])
     
     with tab1:
-        col1, col2 = st.columns(2)
-        with col1:
-            año_inicio = st.number_input("Año inicio:", 1990, 2025, 2000)
-        with col2:
-            año_fin = st.number_input("Año fin:", 1990, 2025, 2020)
-        
-        if st.button("Buscar por rango", key="btn_rango"):
-            resultados = queries.peliculas_por_rango_años(año_inicio, año_fin)
-            if resultados:
-                df = pd.DataFrame(resultados)
-                st.dataframe(df, use_container_width=True, hide_index=True)
-            else:
-                st.info("No se encontraron peliculas en este rango")
-    
+        consulta_rango_años()
     with tab2:
-        limite = st.slider("Cantidad de directores:", 3, 10, 5)
-        directores = queries.directores_con_mas_peliculas(limite)
-        
-        for d in directores:
-            with st.expander(f"{d['director']} - {d['cantidad']} peliculas"):
-                st.write(f"**Rating promedio:** {d['rating_promedio']}")
-                st.write(f"**Peliculas:** {', '.join(d['peliculas'])}")
-    
+        consulta_top_directores()
     with tab3:
-        palabra = st.text_input("Palabra clave en titulo o reviews:")
-        if palabra:
-            from crud import CRUDOperations
-            db_manager = inicializar_conexion()
-            crud = CRUDOperations(db_manager.collection)
-            resultados = crud.buscar_por_palabra_clave(palabra)
-            if resultados:
-                for r in resultados:
-                    st.write(f"**{r['titulo']}** (Rating: {r['rating']})")
-                    if 'reviews' in r:
-                        for review in r['reviews']:
-                            if palabra.lower() in review.get('comentario', '').lower():
-                                st.caption(f"Review: {review['comentario']}")
-            else:
-                st.info("No se encontraron resultados")
+        consulta_reviews()
+    with tab4:
+        consulta_actores()
+
+
+@st.fragment
+def consulta_rango_años():
+    """Peliculas en un rango de años."""
+    col1, col2 = st.columns(2)
+    with col1:
+        año_inicio = st.number_input("Año inicio:", 1990, 2025, 2000)
+    with col2:
+        año_fin = st.number_input("Año fin:", 1990, 2025, 2020)
+    
+    if st.button("Buscar por rango", key="btn_rango"):
+        resultados = consultar("queries", "peliculas_por_rango_años", año_inicio, año_fin)
+        mostrar_tabla(resultados, "No se encontraron peliculas en este rango")
+
+
+@st.fragment
+def consulta_top_directores():
+    """Directores con mas peliculas."""
+    limite = st.slider("Cantidad de directores:", 3, 10, 5)
+    directores = consultar("queries", "directores_con_mas_peliculas", limite)
+    
+    for d in directores:
+        with st.expander(f"{d['director']} - {d['cantidad']} peliculas"):
+            st.write(f"**Rating promedio:** {d['rating_promedio']}")
+            st.write(f"**Peliculas:** {', '.join(d['peliculas'])}")
+
 
+@st.fragment
+def consulta_reviews():
+    """Busqueda de palabras en titulos y reviews."""
+    palabra = st.text_input("Palabra clave en titulo o reviews:")
+    if palabra:
+        resultados = consultar("crud", "buscar_por_palabra_clave", palabra)
+        if resultados:
+            for r in resultados:
+                st.write(f"**{r['titulo']}** (Rating: {r['rating']})")
+                if 'reviews' in r:
+                    for review in r['reviews']:
+                        if palabra.lower() in review.get('comentario', '').lower():
+                            st.caption(f"Review: {review['comentario']}")
+        else:
+            st.info("No se encontraron resultados")
 
-def mostrar_agregaciones(queries: QueryOperations):
+
+@st.fragment
+def consulta_actores():
+    """Busqueda de actores, filmografia, coprotagonistas y actores por director."""
+    texto = st.text_input("Buscar actor:", key="buscar_actor")
+    if texto:
+        encontrados = consultar("actores", "buscar_actores", texto)
+        if not encontrados:
+            st.info("No se encontraron actores")
+        else:
+            nombre = st.selectbox(
+                "Actor:",
+                [a['nombre'] for a in encontrados],
+                key="actor_nombre"
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("Filmografia")
+                actor = consultar("actores", "filmografia", nombre)
+                mostrar_tabla(actor['peliculas'] if actor else [])
+            with col2:
+                st.write("Coprotagonistas")
+                mostrar_tabla(consultar("actores", "coprotagonistas", nombre), "Sin coprotagonistas")
+    
+    director = st.text_input("Actores que trabajaron con el director:", key="actores_director")
+    if director:
+        mostrar_tabla(consultar("actores", "actores_con_director", director), "Sin actores para este director")
+
+
+@st.fragment
+def mostrar_agregaciones():
     """Muestra resultados de agregaciones."""
     
     st.subheader("Agregaciones y Estadisticas")
@@ -278,14 +533,14 @@ def mostrar_agregaciones(queries: QueryOperations):
     
     with tab1:
         st.write("Estadisticas completas por genero")
-        stats = queries.estadisticas_por_genero()
+        stats = consultar("queries", "estadisticas_por_genero")
         df = pd.DataFrame(stats)
         if not df.empty:
             df.columns = ['Genero', 'Cantidad', 'Rating Prom', 'Rating Max', 'Rating Min', 'Presupuesto Total', 'Duracion Prom']
             st.dataframe(df, use_container_width=True, hide_index=True)
     
     with tab2:
-        rating_genero = queries.rating_promedio_por_genero()
+        rating_genero = consultar("queries", "rating_promedio_por_genero")
         df = pd.DataFrame(rating_genero)
         if not df.empty:
             col1, col2 = st.columns([2, 1])
@@ -296,14 +551,14 @@ def mostrar_agregaciones(queries: QueryOperations):
     
     with tab3:
         st.write("Analisis de reviews por pelicula")
-        reviews = queries.analisis_reviews()
+        reviews = consultar("queries", "analisis_reviews")
         df = pd.DataFrame(reviews)
         if not df.empty:
             df.columns = ['Titulo', 'Rating', 'Num Reviews', 'Promedio', 'Max', 'Min']
             st.dataframe(df, use_container_width=True, hide_index=True)
     
     with tab4:
-        decadas = queries.reporte_por_decada()
+        decadas = consultar("queries", "reporte_por_decada")
         for d in decadas:
             with st.expander(f"{d['decada']} - {d['cantidad']} peliculas"):
                 st.write(f"**Rating promedio:** {d['rating_promedio']}")
@@ -313,85 +568,184 @@ def mostrar_agregaciones(queries: QueryOperations):
                     st.write(f"- {p['titulo']} ({p['año']}) - Rating: {p['rating']}")
 
 
-def mostrar_gestion_reviews(crud: CRUDOperations):
+def mostrar_gestion_reviews():
     """Muestra seccion de gestion de reviews."""
     
     st.subheader("Gestionar Reviews")
     
-    tab1, tab2, tab3 = st.tabs(["Añadir Review", "Eliminar Review", "Actualizar Rating"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        "Añadir Review", "Eliminar Review", "Actualizar Rating", "Historial", "Por Usuario"
+    ])
     
-    with tab1:
-        st.write("Añadir una nueva review")
-        
-        # Obtener lista de peliculas
-        peliculas = crud.obtener_todas()
-        titulos = [p['titulo'] for p in peliculas]
-        
-        titulo = st.selectbox("Selecciona pelicula:", titulos, key="add_review_titulo")
-        usuario = st.text_input("Tu nombre de usuario:", key="add_review_user")
-        puntuacion = st.slider("Puntuacion:", 1, 10, 8, key="add_review_score")
-        comentario = st.text_area("Comentario:", key="add_review_comment")
-        
-        if st.button("Añadir Review", type="primary"):
-            if usuario and comentario:
-                if crud.añadir_review(titulo, usuario, puntuacion, comentario):
-                    st.success(f"Review añadida a '{titulo}'")
-                else:
-                    st.error("Error al añadir review")
-            else:
-                st.warning("Completa todos los campos")
+    # Obtener lista de peliculas
+    titulos = [p['titulo'] for p in consultar("crud", "obtener_todas")]
     
+    with tab1:
+        gestion_añadir_review(titulos)
     with tab2:
-        st.write("Eliminar una review existente")
-        
-        titulo_del = st.selectbox("Selecciona pelicula:", titulos, key="del_review_titulo")
-        usuario_del = st.text_input("Nombre del usuario:", key="del_review_user")
-        
-        if st.button("Eliminar Review", type="secondary"):
-            if usuario_del:
-                if crud.eliminar_review(titulo_del, usuario_del):
-                    st.success(f"Review de '{usuario_del}' eliminada")
-                else:
-                    st.error("Review no encontrada")
-            else:
-                st.warning("Ingresa el nombre del usuario")
-    
+        gestion_eliminar_review(titulos)
     with tab3:
-        st.write("Actualizar rating de una pelicula")
-        
-        titulo_upd = st.selectbox("Selecciona pelicula:", titulos, key="upd_rating_titulo")
-        nuevo_rating = st.slider("Nuevo rating:", 0.0, 10.0, 8.0, 0.1, key="upd_rating_value")
-        
-        if st.button("Actualizar Rating", type="primary"):
-            if crud.actualizar_rating(titulo_upd, nuevo_rating):
-                st.success(f"Rating de '{titulo_upd}' actualizado a {nuevo_rating}")
+        gestion_actualizar_rating(titulos)
+    with tab4:
+        gestion_historial(titulos)
+    with tab5:
+        gestion_reviews_usuario()
+
+
+@st.fragment
+def gestion_añadir_review(titulos: List[str]):
+    """Formulario para añadir una review."""
+    st.write("Añadir una nueva review")
+    
+    titulo = st.selectbox("Selecciona pelicula:", titulos, key="add_review_titulo")
+    usuario = st.text_input("Tu nombre de usuario:", key="add_review_user")
+    puntuacion = st.slider("Puntuacion:", 1, 10, 8, key="add_review_score")
+    comentario = st.text_area("Comentario:", key="add_review_comment")
+    
+    if st.button("Añadir Review", type="primary"):
+        if usuario and comentario:
+            if obtener_servicios()["crud"].añadir_review(titulo, usuario, puntuacion, comentario):
+                st.success(f"Review añadida a '{titulo}'")
             else:
-                st.error("Error al actualizar")
+                st.error("Error al añadir review")
+        else:
+            st.warning("Completa todos los campos")
+
+
+@st.fragment
+def gestion_eliminar_review(titulos: List[str]):
+    """Formulario para eliminar una review."""
+    st.write("Eliminar una review existente")
+    
+    titulo_del = st.selectbox("Selecciona pelicula:", titulos, key="del_review_titulo")
+    usuario_del = st.text_input("Nombre del usuario:", key="del_review_user")
+    
+    if st.button("Eliminar Review", type="secondary"):
+        if usuario_del:
+            if obtener_servicios()["crud"].eliminar_review(titulo_del, usuario_del):
+                st.success(f"Review de '{usuario_del}' eliminada")
+            else:
+                st.error("Review no encontrada")
+        else:
+            st.warning("Ingresa el nombre del usuario")
+
+
+@st.fragment
+def gestion_actualizar_rating(titulos: List[str]):
+    """Formulario para actualizar el rating."""
+    st.write("Actualizar rating de una pelicula")
+    
+    titulo_upd = st.selectbox("Selecciona pelicula:", titulos, key="upd_rating_titulo")
+    nuevo_rating = st.slider("Nuevo rating:", 0.0, 10.0, 8.0, 0.1, key="upd_rating_value")
+    
+    if st.button("Actualizar Rating", type="primary"):
+        if obtener_servicios()["crud"].actualizar_rating(titulo_upd, nuevo_rating):
+            st.success(f"Rating de '{titulo_upd}' actualizado a {nuevo_rating}")
+        else:
+            st.error("Error al actualizar")
+
+
+@st.fragment
+def gestion_historial(titulos: List[str]):
+    """Historial de rating y actividad de reviews."""
+    titulo_hist = st.selectbox("Selecciona pelicula:", titulos, key="hist_titulo")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write("Rating en el tiempo")
+        evolucion = pd.DataFrame(consultar("historial", "rating_en_el_tiempo", titulo_hist, unidad="hour"))
+        if not evolucion.empty:
+            st.line_chart(evolucion.set_index('fecha')['rating'])
+        else:
+            st.info("Sin cambios de rating registrados")
+    
+    with col2:
+        dias = st.slider("Ventana (dias):", 1, 365, 30, key="hist_dias")
+        st.write("Reviews por dia")
+        actividad = pd.DataFrame(consultar("historial", "reviews_por_dia", dias))
+        if not actividad.empty:
+            st.bar_chart(actividad.set_index('fecha')['cantidad'])
+        else:
+            st.info("Sin reviews en la ventana")
+
+
+@st.fragment
+def gestion_reviews_usuario():
+    """Historial paginado y resumen de las reviews de un usuario."""
+    usuario = st.text_input("Nombre del usuario:", key="reviews_usuario")
+    if not usuario:
+        return
+    
+    resumen = consultar("reviews_usuario", "resumen", usuario)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Reviews", resumen['total_reviews'])
+    col2.metric("Puntuacion media", resumen['puntuacion_media'] or "-")
+    col3.metric("Ultima review", resumen['ultima'] or "-")
+    
+    if resumen['total_reviews']:
+        paginas = -(-resumen['total_reviews'] // USER_REVIEWS_PAGE_SIZE)
+        pagina = st.number_input("Pagina:", 1, paginas, 1, key="reviews_usuario_pagina")
+        historial = consultar("reviews_usuario", "historial", usuario, pagina)
+        mostrar_tabla(historial['reviews'])
+        st.caption(f"Pagina {historial['pagina']} de {historial['paginas']}")
+
+
+def mostrar_recomendaciones():
+    """Muestra la seccion de recomendaciones."""
+    
+    st.subheader("Recomendaciones")
+    
+    tab1, tab2 = st.tabs(["Peliculas Similares", "Para un Usuario"])
+    
+    with tab1:
+        recomendaciones_similares()
+    with tab2:
+        recomendaciones_usuario()
+
 
+@st.fragment
+def recomendaciones_similares():
+    """Peliculas parecidas por contenido (vecinos precalculados)."""
+    titulos = [p['titulo'] for p in consultar("crud", "obtener_todas")]
+    titulo = st.selectbox("Selecciona pelicula:", titulos, key="reco_titulo")
+    k = st.slider("Numero de recomendaciones:", 1, 20, 5, key="reco_k")
+    mostrar_tabla(
+        consultar("similares", "similares_por_titulo", titulo, k),
+        "Sin vecinos calculados (ejecuta: python recomendador.py)"
+    )
 
-def mostrar_administrar(crud: CRUDOperations, queries: QueryOperations):
+
+@st.fragment
+def recomendaciones_usuario():
+    """Recomendaciones colaborativas a partir de las reviews del usuario."""
+    usuario = st.text_input("Nombre de usuario:", key="reco_usuario")
+    n = st.slider("Numero de recomendaciones:", 1, 20, 5, key="reco_n")
+    if usuario:
+        with st.spinner("Calculando recomendaciones..."):
+            recomendaciones = consultar("colaborativo", "recomendar", usuario, n)
+        mostrar_tabla(recomendaciones, "El usuario no tiene reviews suficientes")
+
+
+def mostrar_administrar():
     """Muestra seccion de administracion."""
     
     st.subheader("Administracion del Sistema")
     
-    tab1, tab2, tab3 = st.tabs(["Ver Todas", "Indices", "Estadisticas"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Ver Todas", "Indices", "Estadisticas", "Exportar"])
     
     with tab1:
         st.write("Listado completo de peliculas")
-        peliculas = crud.obtener_todas()
-        df = pd.DataFrame(peliculas)
+        df = consultar("crud", "obtener_todas_df")
         if not df.empty:
             st.dataframe(df, use_container_width=True, hide_index=True)
     
     with tab2:
         st.write("Indices de la coleccion")
-        db_manager = inicializar_conexion()
-        indices = db_manager.listar_indices()
-        for idx in indices:
+        for idx in inicializar_conexion().listar_indices():
             st.code(f"{idx['name']}: {idx['key']}")
     
     with tab3:
-        stats = queries.estadisticas_generales()
+        stats = consultar("queries", "estadisticas_generales")
         
         col1, col2 = st.columns(2)
         with col1:
@@ -400,6 +754,53 @@ def mostrar_administrar(crud: CRUDOperations, queries: QueryOperations):
         with col2:
             st.metric("Generos Unicos", stats['generos_unicos'])
             st.metric("Directores", stats['directores'])
+        
+        bus = obtener_servicios()["bus"]
+        if bus is not None:
+            st.write("Change stream")
+            st.json(bus.metricas())
+    
+    with tab4:
+        administrar_exportar()
+
+
+@st.fragment
+def administrar_exportar():
+    """Exportacion de datos a fichero."""
+    st.write("Exportar datos a fichero")
+    origenes = {
+        "Todas las peliculas": "todas",
+        "Analisis de reviews": "reviews",
+        "Estadisticas por genero": "generos",
+        "Filtro personalizado": "filtro"
+    }
+    origen = origenes[st.selectbox("Origen:", list(origenes), key="export_origen")]
+    formato = st.selectbox("Formato:", list(FORMATOS), key="export_formato")
+    filtro_txt = "{}"
+    if origen == "filtro":
+        filtro_txt = st.text_area("Filtro JSON:", "{}", key="export_filtro")
+    
+    if st.button("Generar exportacion", key="btn_exportar"):
+        try:
+            filtro = json.loads(filtro_txt)
+        except ValueError as e:
+            st.error(f"Filtro invalido: {e}")
+        else:
+            with tempfile.NamedTemporaryFile(suffix=f".{formato}", delete=False) as tmp:
+                ruta = tmp.name
+            try:
+                total = Exportador(obtener_servicios()["crud"].collection).exportar(origen, ruta, formato, filtro=filtro)
+                with open(ruta, "rb") as f:
+                    datos = f.read()
+            finally:
+                os.remove(ruta)
+            st.success(f"{total} documentos exportados")
+            st.download_button(
+                "Descargar",
+                datos,
+                file_name=f"{origen}.{formato}",
+                key="btn_descargar"
+            )
 
 
 if __name__ == "__main__":
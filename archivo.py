@@ -0,0 +1,257 @@
+"""
+Archivado por niveles de peliculas no disponibles y reviews antiguas.
+
+El trabajo de archivado mueve las peliculas con disponible: false y las
+reviews mas antiguas que un umbral a colecciones de archivo comprimidas
+con zstd, para que la coleccion principal (y su working set) solo
+contenga datos activos. CRUDOperations consulta el archivo cuando la
+coleccion principal no devuelve nada (o se pide incluir el archivo) y
+reenvia a sus observadores los movimientos: eliminar al archivar una
+pelicula, insertar al restaurarla y archivar_reviews al mover reviews.
+Las vistas que son historiales (reviews por usuario, historial de
+ratings) conservan las reviews archivadas, igual que obtener_reviews;
+el modelo colaborativo las descarta, como un reentrenamiento que solo
+lee la coleccion principal.
+
+Ejecutar:
+    python archivo.py [dias]
+"""
+
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from config import ARCHIVE_BATCH_SIZE, ARCHIVE_REVIEW_DAYS, MUESTREO, get_logger
+
+logger = get_logger(__name__)
+
+_COMPRESION = {"wiredTiger": {"configString": "block_compressor=zstd"}}
+
+# Observador de movimientos: (evento, datos) -> None, como en CRUDOperations
+Observador = Callable[[str, Dict[str, Any]], None]
+
+
+class ArchivoService:
+    """
+    Archivado de peliculas y reviews frias.
+    """
+
+    def __init__(self, collection: Collection, peliculas: Collection, reviews: Collection):
+        """
+        Inicializa el servicio.
+
+        Args:
+            collection: Coleccion principal de peliculas
+            peliculas: Coleccion de archivo de peliculas
+            reviews: Coleccion de archivo de reviews (una por documento)
+        """
+        self.collection = collection
+        self.peliculas = peliculas
+        self.reviews = reviews
+        self.observadores: List[Observador] = []
+
+    def registrar_observador(self, observador: Observador) -> None:
+        """
+        Registra un observador de los movimientos de peliculas.
+
+        Eventos (mismo formato que CRUDOperations):
+            - eliminar: {"peliculas": [peliculas archivadas]}
+            - insertar: {"peliculas": [peliculas restauradas]}
+        """
+        self.observadores.append(observador)
+
+    def _notificar(self, evento: str, datos: Dict[str, Any]) -> None:
+        for observador in self.observadores:
+            try:
+                observador(evento, datos)
+            except Exception:
+                logger.exception("Error en observador de '%s'", evento)
+
+    def crear_colecciones(self) -> None:
+        """Crea las colecciones de archivo comprimidas y sus indices."""
+        for coleccion in (self.peliculas, self.reviews):
+            try:
+                coleccion.database.create_collection(coleccion.name, storageEngine=_COMPRESION)
+            except CollectionInvalid:
+                pass
+            except OperationFailure as e:
+                logger.warning("Coleccion de archivo %s sin compresion: %s", coleccion.name, e)
+
+        self.peliculas.create_index([("titulo", ASCENDING)], name="idx_titulo")
+        self.peliculas.create_index([("director", ASCENDING)], name="idx_director")
+        self.peliculas.create_index([("generos", ASCENDING)], name="idx_generos")
+        self.reviews.create_index(
+            [("pelicula", ASCENDING), ("fecha", DESCENDING), ("usuario", ASCENDING)],
+            name="idx_pelicula_fecha_usuario"
+        )
+
+    # ==================== ARCHIVADO ====================
+
+    def archivar(self, dias: int = ARCHIVE_REVIEW_DAYS, tamaño_lote: int = ARCHIVE_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Ejecuta el archivado completo.
+
+        Args:
+            dias: Antiguedad minima de las reviews a archivar
+            tamaño_lote: Documentos por lote
+
+        Returns:
+            Diccionario con peliculas y reviews archivadas
+        """
+        resultado = {
+            "peliculas": self.archivar_no_disponibles(tamaño_lote),
+            "reviews": self.archivar_reviews(dias, tamaño_lote)
+        }
+        logger.info("Archivado completado: %s", resultado)
+        return resultado
+
+    def archivar_no_disponibles(self, tamaño_lote: int = ARCHIVE_BATCH_SIZE) -> int:
+        """
+        Mueve las peliculas no disponibles al archivo.
+
+        Cada lote se copia con upserts antes de borrarse, de modo que
+        repetir el trabajo tras un fallo no duplica peliculas.
+
+        Returns:
+            Numero de peliculas archivadas
+        """
+        total = 0
+        while True:
+            lote = list(self.collection.find({"disponible": False}).limit(tamaño_lote))
+            if not lote:
+                return total
+            self.peliculas.bulk_write(
+                [ReplaceOne({"_id": p["_id"]}, p, upsert=True) for p in lote],
+                ordered=False
+            )
+            resultado = self.collection.delete_many({"_id": {"$in": [p["_id"] for p in lote]}, "disponible": False})
+            total += resultado.deleted_count
+            logger.info("%d peliculas archivadas", resultado.deleted_count, extra=MUESTREO)
+            if resultado.deleted_count:
+                # Si alguna volvio a estar disponible entre la copia y el
+                # borrado, sigue en la principal: solo se notifican las ausentes
+                if resultado.deleted_count < len(lote):
+                    presentes = {p["_id"] for p in self.collection.find(
+                        {"_id": {"$in": [p["_id"] for p in lote]}}, {"_id": 1}
+                    )}
+                    lote = [p for p in lote if p["_id"] not in presentes]
+                self._notificar("eliminar", {"peliculas": lote})
+
+    def archivar_reviews(self, dias: int = ARCHIVE_REVIEW_DAYS, tamaño_lote: int = ARCHIVE_BATCH_SIZE) -> int:
+        """
+        Mueve las reviews mas antiguas que `dias` al archivo.
+
+        Los contadores num_reviews y suma_puntuaciones no cambian: siguen
+        contando todas las reviews, archivadas o no.
+
+        Returns:
+            Numero de reviews archivadas
+        """
+        corte = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d")
+        antigua = {"$lt": ["$$r.fecha", corte]}
+        total = 0
+        ultimo_id = None
+
+        while True:
+            filtro: Dict[str, Any] = {"reviews.fecha": {"$lt": corte}}
+            if ultimo_id is not None:
+                filtro["_id"] = {"$gt": ultimo_id}
+            lote = list(self.collection.aggregate([
+                {"$match": filtro},
+                {"$sort": {"_id": 1}},
+                {"$limit": tamaño_lote},
+                {"$project": {
+                    "id": 1,
+                    "titulo": 1,
+                    "reviews": {"$filter": {"input": "$reviews", "as": "r", "cond": antigua}}
+                }}
+            ]))
+            if not lote:
+                return total
+            ultimo_id = lote[-1]["_id"]
+
+            copias = [
+                UpdateOne(
+                    {"pelicula": p.get("id"), "usuario": r["usuario"], "createdAt": r.get("createdAt"), "fecha": r["fecha"]},
+                    {"$setOnInsert": {**r, "pelicula": p.get("id"), "titulo": p["titulo"]}},
+                    upsert=True
+                )
+                for p in lote
+                for r in p["reviews"]
+            ]
+            if copias:
+                self.reviews.bulk_write(copias, ordered=False)
+
+            self.collection.update_many(
+                {"_id": {"$in": [p["_id"] for p in lote]}},
+                [{"$set": {
+                    "reviews": {"$filter": {"input": "$reviews", "as": "r", "cond": {"$not": [antigua]}}},
+                    "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+                }}]
+            )
+            total += len(copias)
+            logger.info("%d reviews archivadas", len(copias), extra=MUESTREO)
+            if copias:
+                self._notificar("archivar_reviews", {"reviews": {p["titulo"]: p["reviews"] for p in lote if p["reviews"]}})
+
+    def restaurar_pelicula(self, titulo: str) -> bool:
+        """
+        Devuelve una pelicula archivada a la coleccion principal como disponible.
+
+        Returns:
+            True si se restauro
+        """
+        pelicula = self.peliculas.find_one({"titulo": titulo})
+        if pelicula is None:
+            logger.warning("Pelicula '%s' no esta archivada", titulo)
+            return False
+        pelicula["disponible"] = True
+        pelicula["updatedAt"] = datetime.now()
+        self.collection.replace_one({"_id": pelicula["_id"]}, pelicula, upsert=True)
+        self.peliculas.delete_one({"_id": pelicula["_id"]})
+        logger.info("Pelicula '%s' restaurada", titulo)
+        self._notificar("insertar", {"peliculas": [pelicula]})
+        return True
+
+    # ==================== LECTURA ====================
+
+    def buscar_peliculas(
+        self,
+        filtro: Dict[str, Any],
+        proyeccion: Dict[str, Any],
+        limite: int = 0,
+        orden: Optional[List[Tuple[str, int]]] = None
+    ) -> List[Dict]:
+        """Busca en el archivo de peliculas."""
+        cursor = self.peliculas.find(filtro, proyeccion).limit(limite)
+        if orden:
+            cursor = cursor.sort(orden)
+        return list(cursor)
+
+    def reviews_archivadas(self, pelicula_id: str, limite: int = 0) -> List[Dict]:
+        """Reviews archivadas de una pelicula, de la mas reciente a la mas antigua."""
+        return list(self.reviews.find(
+            {"pelicula": pelicula_id},
+            {"_id": 0, "pelicula": 0, "titulo": 0}
+        ).sort("fecha", DESCENDING).limit(limite))
+
+
+if __name__ == "__main__":
+    from database import DatabaseManager
+    from main import crear_operaciones
+
+    db_manager = DatabaseManager()
+    if not db_manager.conectar():
+        sys.exit(1)
+    try:
+        # Archivo de CRUDOperations: los movimientos llegan a sus observadores
+        crud, _ = crear_operaciones(db_manager)
+        archivo = crud.archivo
+        archivo.crear_colecciones()
+        archivo.archivar(*[int(a) for a in sys.argv[1:2]])
+    finally:
+        db_manager.desconectar()
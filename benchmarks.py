@@ -0,0 +1,376 @@
+"""
+Benchmarks del sistema de peliculas.
+
+Ejecutar:
+    python benchmarks.py memoria [n]
+    python benchmarks.py concurrencia [hilos] [operaciones]   (requiere MongoDB)
+    python benchmarks.py enrutamiento [shards] [peliculas]    (requiere MongoDB)
+    python benchmarks.py arranque [repeticiones] [consulta]   (consulta=1 requiere MongoDB)
+    python benchmarks.py columnar [n]
+"""
+
+import gc
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from typing import Any, Callable, Dict, List, Optional
+
+from models import PELICULAS_INICIALES, Pelicula
+
+
+def _medir(construir: Callable[[], object]) -> int:
+    """Devuelve los bytes retenidos por el objeto que crea `construir`."""
+    gc.collect()
+    tracemalloc.start()
+    objeto = construir()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objeto
+    gc.collect()
+    return actual
+
+
+def benchmark_memoria(n: int = 1_000_000) -> Dict[str, float]:
+    """
+    Compara la memoria de n peliculas como dicts frente a Pelicula.
+    
+    Cada pelicula es una copia profunda de una de las iniciales, de modo
+    que ambas representaciones tienen su propia estructura anidada.
+    
+    Args:
+        n: Numero de peliculas
+        
+    Returns:
+        Diccionario con MB de cada representacion y el ratio
+    """
+    base = PELICULAS_INICIALES
+    
+    def como_dicts() -> List[dict]:
+        return [deepcopy(base[i % len(base)]) for i in range(n)]
+    
+    def como_modelo() -> List[Pelicula]:
+        return [Pelicula.desde_dict(base[i % len(base)]) for i in range(n)]
+    
+    mb_dicts = _medir(como_dicts) / 1024 ** 2
+    mb_modelo = _medir(como_modelo) / 1024 ** 2
+    
+    resultado = {
+        "peliculas": n,
+        "dicts_mb": round(mb_dicts, 1),
+        "modelo_mb": round(mb_modelo, 1),
+        "ratio": round(mb_modelo / mb_dicts, 3)
+    }
+    print(f"{n:,} peliculas | dicts: {resultado['dicts_mb']} MB | "
+          f"Pelicula: {resultado['modelo_mb']} MB | ratio: {resultado['ratio']}")
+    return resultado
+
+
+def stress_concurrencia(hilos: int = 16, operaciones: int = 200) -> Dict[str, Any]:
+    """
+    Prueba de estres de escrituras concurrentes sobre una misma pelicula.
+    
+    Cada hilo incrementa el rating con modificar_rating (compare-and-set)
+    y añade y elimina reviews. Al final se comprueba que no se perdio
+    ningun incremento y que los contadores coinciden con las reviews.
+    Usa una coleccion temporal que se elimina al terminar.
+    
+    Args:
+        hilos: Escritores concurrentes
+        operaciones: Operaciones por hilo
+        
+    Returns:
+        Diccionario con tiempos y resultado de las comprobaciones
+    """
+    from crud import CRUDOperations
+    from database import DatabaseManager
+    
+    db_manager = DatabaseManager(collection_name="peliculas_stress")
+    if not db_manager.conectar():
+        raise RuntimeError("No se pudo conectar a MongoDB")
+    
+    try:
+        db_manager.collection.drop()
+        crud = CRUDOperations(db_manager.collection)
+        pelicula = deepcopy(PELICULAS_INICIALES[0])
+        pelicula["rating"] = 0.0
+        crud.insertar_pelicula(pelicula)
+        titulo = pelicula["titulo"]
+        incremento = 1 / (hilos * operaciones)
+        
+        def escritor(h: int) -> int:
+            fallos = 0
+            for i in range(operaciones):
+                if crud.modificar_rating(titulo, lambda r: r + incremento, reintentos=1000) is None:
+                    fallos += 1
+                usuario = f"stress-{h}-{i}"
+                crud.añadir_review(titulo, usuario, 1 + (i % 10), "stress")
+                if i % 2:
+                    crud.eliminar_review(titulo, usuario)
+            return fallos
+        
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            fallos = sum(pool.map(escritor, range(hilos)))
+        duracion = time.perf_counter() - inicio
+        
+        doc = db_manager.collection.find_one({"titulo": titulo})
+        reviews = doc.get("reviews", [])
+        resultado = {
+            "hilos": hilos,
+            "operaciones": hilos * operaciones,
+            "segundos": round(duracion, 2),
+            "fallos_cas": fallos,
+            "rating_final": round(doc["rating"], 6),
+            "rating_ok": abs(doc["rating"] - 1.0) < 1e-6 and fallos == 0,
+            "contadores_ok": (
+                doc["num_reviews"] == len(reviews)
+                and doc["suma_puntuaciones"] == sum(r["puntuacion"] for r in reviews)
+            )
+        }
+        print(resultado)
+        return resultado
+    finally:
+        db_manager.collection.drop()
+        db_manager.desconectar()
+
+
+def simulacion_enrutamiento(
+    shards: int = 3,
+    peliculas: int = 3000,
+    uris: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Verifica el enrutamiento por clave de shard con un cluster simulado.
+    
+    Cada shard es una coleccion temporal; con `uris` cada una vive en un
+    mongod distinto (p. ej. varios mongod locales en puertos diferentes).
+    Se comprueba que cada pelicula queda en un unico shard, que las
+    consultas por clave van a un solo shard y devuelven el documento,
+    que las consultas sin clave se difunden a todos y que las escrituras
+    por titulo de CRUDOperations (reviews, rating, CAS con conflicto)
+    llegan a un unico shard una vez resuelta la clave de la pelicula.
+    
+    Args:
+        shards: Numero de shards simulados
+        peliculas: Peliculas a repartir
+        uris: URIs de los mongod (por defecto, todos en MONGO_URI)
+        
+    Returns:
+        Diccionario con el reparto y el resultado de las comprobaciones
+    """
+    from pymongo import MongoClient
+    from config import DB_NAME, MONGO_URI
+    from crud import CRUDOperations
+    from sharding import CLAVES_SHARD, RouterLocal
+    
+    uris = uris or [MONGO_URI] * shards
+    clientes = [MongoClient(uri, serverSelectionTimeoutMS=5000) for uri in uris]
+    colecciones = [c[DB_NAME][f"peliculas_shard_{i}"] for i, c in enumerate(clientes)]
+    
+    try:
+        for coleccion in colecciones:
+            coleccion.drop()
+            coleccion.create_index("id")
+        router = RouterLocal(colecciones, CLAVES_SHARD["hashed_id"])
+        
+        ids, titulos = [], []
+        for i in range(peliculas):
+            doc = deepcopy(PELICULAS_INICIALES[i % len(PELICULAS_INICIALES)])
+            doc["id"] = f"sim-{i}"
+            doc["titulo"] = f"{doc['titulo']} #{i}"
+            doc["version"] = 0
+            router.insert_one(doc)
+            ids.append(doc["id"])
+            titulos.append(doc["titulo"])
+        
+        reparto = [c.count_documents({}) for c in colecciones]
+        muestra = ids[::max(1, peliculas // 100)]
+        dirigidas_ok = all([d["id"] for d in router.find({"id": id_})] == [id_] for id_ in muestra)
+        dirigidas_ok = dirigidas_ok and router.estadisticas == {"dirigidas": len(muestra), "scatter_gather": 0}
+        
+        drama = router.find({"generos": "Drama"}, {"_id": 1})
+        esperado = sum(c.count_documents({"generos": "Drama"}) for c in colecciones)
+        
+        scatter_ok = len(drama) == esperado and router.estadisticas["scatter_gather"] == 1
+        
+        resultado = {
+            "shards": shards,
+            "reparto": reparto,
+            "desequilibrio": round(max(reparto) / max(1, min(reparto)), 3),
+            "total_ok": sum(reparto) == peliculas,
+            "dirigidas_ok": dirigidas_ok,
+            "scatter_ok": scatter_ok,
+            "crud_ok": _escrituras_crud_dirigidas(
+                CRUDOperations(router, router.clave), router, colecciones, titulos[::max(1, peliculas // 20)]
+            ),
+        }
+        print(resultado)
+        return resultado
+    finally:
+        for coleccion in colecciones:
+            coleccion.drop()
+        for cliente in clientes:
+            cliente.close()
+
+
+def _escrituras_crud_dirigidas(crud, router, colecciones, titulos: List[str]) -> bool:
+    """
+    Escribe con CRUDOperations sobre RouterLocal y comprueba el enrutamiento.
+    
+    La primera escritura de cada titulo resuelve su clave (una consulta
+    difundida); las siguientes, incluido un CAS con version obsoleta,
+    deben ir a un unico shard y modificar un unico documento.
+    """
+    for titulo in titulos:
+        if not crud.añadir_review(titulo, "sim", 7, "simulacion"):
+            return False
+        if sum(c.count_documents({"titulo": titulo, "reviews.usuario": "sim"}) for c in colecciones) != 1:
+            return False
+        
+        antes = dict(router.estadisticas)
+        ok = (
+            crud.actualizar_rating(titulo, 5.0)
+            and crud.modificar_rating(titulo, lambda r: r + 0.5) == 5.5
+            and not crud.actualizar_rating(titulo, 1.0, version=10 ** 6)
+            and crud.eliminar_review(titulo, "sim")
+        )
+        if not ok or router.estadisticas["scatter_gather"] != antes["scatter_gather"]:
+            return False
+        if sum(c.count_documents({"titulo": titulo, "rating": 5.5}) for c in colecciones) != 1:
+            return False
+    return True
+
+
+# Codigo medido en el benchmark de arranque: nombre -> programa
+_PROGRAMAS_ARRANQUE = {
+    "import config": "import config",
+    "import cli": "import cli",
+    "import main": "import main",
+    "import crud (pymongo)": "import crud",
+}
+
+_CONSULTA_UNICA = (
+    "from database import DatabaseManager\n"
+    "from crud import CRUDOperations\n"
+    "db = DatabaseManager()\n"
+    "db.conectar(verificar=False)\n"
+    "CRUDOperations(db.collection).buscar_por_titulo('Matrix', limite=1)\n"
+    "db.desconectar()\n"
+)
+
+
+def benchmark_arranque(repeticiones: int = 5, consulta: int = 0) -> Dict[str, float]:
+    """
+    Mide el tiempo de arranque de procesos nuevos (importaciones).
+    
+    Cada programa se ejecuta en un interprete nuevo para que no haya
+    modulos ya cargados. Tambien comprueba que importar main y cli no
+    carga pymongo.
+    
+    Args:
+        repeticiones: Ejecuciones por programa (se informa la mediana)
+        consulta: Si es 1, mide tambien una consulta completa de un solo
+            uso (conexion + busqueda por titulo)
+        
+    Returns:
+        Diccionario programa -> milisegundos (mediana)
+    """
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    programas = dict(_PROGRAMAS_ARRANQUE)
+    if consulta:
+        programas["consulta unica"] = _CONSULTA_UNICA
+    
+    def medir(codigo: str) -> float:
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", codigo], cwd=directorio, check=True, capture_output=True)
+        return (time.perf_counter() - inicio) * 1000
+    
+    resultado = {
+        nombre: round(statistics.median(medir(codigo) for _ in range(repeticiones)), 1)
+        for nombre, codigo in programas.items()
+    }
+    for nombre, ms in resultado.items():
+        print(f"{nombre:<24} {ms:>8.1f} ms")
+    
+    carga = subprocess.run(
+        [sys.executable, "-c", "import sys, main, cli; print('pymongo' in sys.modules)"],
+        cwd=directorio, check=True, capture_output=True, text=True
+    )
+    print(f"pymongo cargado al importar main/cli: {carga.stdout.strip()}")
+    return resultado
+
+
+def benchmark_columnar(n: int = 200_000) -> Dict[str, Dict[str, float]]:
+    """
+    Mide la lectura a columnas sin PyMongoArrow sobre n documentos BSON.
+
+    Simula el cursor decodificando un buffer BSON documento a documento
+    y compara tres variantes: lista de dicts completa y luego columnas,
+    columnas_desde_cursor sobre el flujo de dicts (lo que hace columnar)
+    y RawBSONDocument con acceso solo a los campos pedidos.
+
+    Args:
+        n: Numero de documentos
+
+    Returns:
+        Diccionario variante -> segundos y MB de pico
+    """
+    import bson
+    from bson.raw_bson import RawBSONDocument
+
+    from columnar import columnas_desde_cursor
+
+    campos = ("titulo", "año", "rating", "director")
+    base = PELICULAS_INICIALES
+    datos = b"".join(
+        bson.encode({k: base[i % len(base)].get(k) for k in campos}) for i in range(n)
+    )
+
+    def lista_dicts():
+        docs = bson.decode_all(datos)
+        return columnas_desde_cursor(docs, campos)
+
+    def flujo_dicts():
+        return columnas_desde_cursor(bson.decode_iter(datos), campos)
+
+    def raw_bson():
+        opciones = bson.CodecOptions(document_class=RawBSONDocument)
+        return columnas_desde_cursor(bson.decode_iter(datos, opciones), campos)
+
+    resultado = {}
+    for nombre, variante in (("lista_dicts", lista_dicts),
+                             ("flujo_dicts", flujo_dicts),
+                             ("raw_bson", raw_bson)):
+        # el tiempo se mide sin tracemalloc, que ralentiza cada asignacion
+        gc.collect()
+        inicio = time.perf_counter()
+        variante()
+        segundos = time.perf_counter() - inicio
+        gc.collect()
+        tracemalloc.start()
+        variante()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultado[nombre] = {"s": round(segundos, 2), "pico_mb": round(pico / 1024 ** 2, 1)}
+        print(f"{nombre:<12} {segundos:>6.2f} s | pico {resultado[nombre]['pico_mb']} MB")
+    return resultado
+
+
+BENCHMARKS = {
+    "memoria": benchmark_memoria,
+    "concurrencia": stress_concurrencia,
+    "enrutamiento": simulacion_enrutamiento,
+    "arranque": benchmark_arranque,
+    "columnar": benchmark_columnar,
+}
+
+
+if __name__ == "__main__":
+    nombre = sys.argv[1] if len(sys.argv) > 1 else "memoria"
+    args = [int(a) for a in sys.argv[2:]]
+    BENCHMARKS[nombre](*args)
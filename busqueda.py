@@ -0,0 +1,219 @@
+"""
+Busqueda difusa de peliculas por titulo y director.
+
+Los textos se normalizan (minusculas, sin acentos ni signos) y se
+descomponen en trigramas. Cada pelicula tiene un documento en una
+coleccion auxiliar con su array de trigramas e indice multikey; una
+consulta recupera los candidatos que comparten mas trigramas y los
+reordena en Python combinando Jaccard de trigramas y distancia de
+Levenshtein por palabra, de modo que "parasitos", "Parásitos" o
+"parsitos" encuentran la misma pelicula.
+"""
+
+import math
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Set
+
+from pymongo import ASCENDING, ReplaceOne
+from pymongo.collection import Collection
+
+from config import FUZZY_CANDIDATES, FUZZY_MIN_SCORE, MUESTREO, get_logger
+
+logger = get_logger(__name__)
+
+# Documentos por bulk_write al reconstruir
+_TAMAÑO_LOTE = 1000
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+
+
+def normalizar(texto: str) -> str:
+    """Minusculas, sin acentos (ñ -> n) y con signos sustituidos por espacios."""
+    sin_acentos = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode("ascii")
+    return _NO_ALFANUMERICO.sub(" ", sin_acentos.lower()).strip()
+
+
+def trigramas(texto: str) -> Set[str]:
+    """
+    Trigramas de un texto normalizado.
+
+    Cada palabra se rellena con dos espacios delante y uno detras, como
+    en pg_trgm, para que los prefijos pesen mas que los sufijos.
+    """
+    resultado: Set[str] = set()
+    for palabra in normalizar(texto).split():
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Indice de Jaccard entre dos conjuntos."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Distancia de edicion entre dos cadenas."""
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = actual
+    return anterior[-1]
+
+
+def _parecido_palabras(consulta: List[str], texto: List[str]) -> float:
+    """
+    Media, por palabra de la consulta, de su mejor parecido en el texto.
+
+    Una palabra del texto que empieza por la de la consulta cuenta como
+    coincidencia completa (busquedas parciales).
+    """
+    if not consulta or not texto:
+        return 0.0
+    total = 0.0
+    for q in consulta:
+        mejor = 0.0
+        for t in texto:
+            if t.startswith(q):
+                mejor = 1.0
+                break
+            mejor = max(mejor, 1 - levenshtein(q, t) / max(len(q), len(t)))
+        total += mejor
+    return total / len(consulta)
+
+
+def puntuar(consulta: str, texto: str) -> float:
+    """Parecido entre 0 y 1 de una consulta con un texto."""
+    return 0.5 * jaccard(trigramas(consulta), trigramas(texto)) + \
+        0.5 * _parecido_palabras(normalizar(consulta).split(), normalizar(texto).split())
+
+
+def _documento(pelicula: Dict[str, Any]) -> Dict[str, Any]:
+    """Documento del indice de trigramas de una pelicula."""
+    return {
+        "titulo": pelicula["titulo"],
+        "director": pelicula.get("director"),
+        "año": pelicula.get("año"),
+        "trigramas": sorted(trigramas(pelicula["titulo"]) | trigramas(pelicula.get("director") or ""))
+    }
+
+
+class BusquedaDifusa:
+    """
+    Indice de trigramas de titulos y directores con reordenacion.
+    """
+
+    def __init__(self, collection: Collection, indice: Collection):
+        """
+        Inicializa el motor.
+
+        Args:
+            collection: Coleccion de peliculas
+            indice: Coleccion con los trigramas de cada pelicula (_id = _id de la pelicula)
+        """
+        self.collection = collection
+        self.indice = indice
+
+    def crear_indices(self) -> None:
+        """Indice multikey sobre los trigramas."""
+        self.indice.create_index([("trigramas", ASCENDING)], name="idx_trigramas")
+
+    # ==================== MANTENIMIENTO ====================
+
+    def aplicar_evento(self, evento: str, datos: Dict[str, Any]) -> None:
+        """
+        Observador para CRUDOperations.registrar_observador.
+
+        Args:
+            evento: Nombre del evento de escritura
+            datos: Datos del evento
+        """
+        if evento == "insertar":
+            self._indexar(p for p in datos["peliculas"] if "_id" in p)
+        elif evento == "eliminar":
+            self.indice.delete_many({"_id": {"$in": [p["_id"] for p in datos["peliculas"]]}})
+
+    def _indexar(self, peliculas: Iterable[Dict[str, Any]]) -> int:
+        operaciones = [ReplaceOne({"_id": p["_id"]}, _documento(p), upsert=True) for p in peliculas]
+        if operaciones:
+            self.indice.bulk_write(operaciones, ordered=False)
+        return len(operaciones)
+
+    def reconstruir(self) -> int:
+        """
+        Regenera el indice de trigramas desde las peliculas.
+
+        Returns:
+            Numero de peliculas indexadas
+        """
+        self.indice.delete_many({})
+        total = 0
+        lote: List[Dict[str, Any]] = []
+        for p in self.collection.find({}, {"titulo": 1, "director": 1, "año": 1}):
+            lote.append(p)
+            if len(lote) >= _TAMAÑO_LOTE:
+                total += self._indexar(lote)
+                lote = []
+        total += self._indexar(lote)
+        self.crear_indices()
+
+        logger.info("Indice de trigramas reconstruido: %d peliculas", total)
+        return total
+
+    # ==================== CONSULTA ====================
+
+    def buscar(
+        self,
+        texto: str,
+        limite: int = 10,
+        candidatos: int = FUZZY_CANDIDATES,
+        minimo: float = FUZZY_MIN_SCORE
+    ) -> List[Dict[str, Any]]:
+        """
+        Peliculas cuyo titulo o director se parecen al texto.
+
+        Args:
+            texto: Consulta (admite erratas, acentos y palabras parciales)
+            limite: Maximo de resultados
+            candidatos: Peliculas recuperadas por trigramas antes de reordenar
+            minimo: Puntuacion minima (0-1)
+
+        Returns:
+            Lista de {"titulo", "director", "año", "score"} de mayor a menor
+        """
+        consulta = sorted(trigramas(texto))
+        if not consulta:
+            return []
+
+        # Al menos un quinto de los trigramas de la consulta en comun
+        pipeline = [
+            {"$match": {"trigramas": {"$in": consulta}}},
+            {"$project": {
+                "_id": 0,
+                "titulo": 1,
+                "director": 1,
+                "año": 1,
+                "comunes": {"$size": {"$setIntersection": ["$trigramas", consulta]}}
+            }},
+            {"$match": {"comunes": {"$gte": max(1, math.ceil(len(consulta) / 5))}}},
+            {"$sort": {"comunes": -1}},
+            {"$limit": candidatos}
+        ]
+        resultados = []
+        for p in self.indice.aggregate(pipeline):
+            score = max(puntuar(texto, p["titulo"]), puntuar(texto, p.get("director") or ""))
+            if score >= minimo:
+                p["score"] = round(score, 3)
+                del p["comunes"]
+                resultados.append(p)
+
+        resultados.sort(key=lambda p: -p["score"])
+        logger.info("Busqueda difusa '%s': %d resultados", texto, len(resultados), extra=MUESTREO)
+        return resultados[:limite]
@@ -0,0 +1,370 @@
+"""
+Bus de eventos sobre el change stream de la coleccion de peliculas.
+
+Un hilo sigue el change stream, agrupa los eventos en lotes (por tamaño
+o por tiempo) y los entrega a los consumidores registrados en un pool
+de hilos. El resume token se guarda en MongoDB solo despues de que todos
+los consumidores procesen cada lote: un consumidor que falla se reintenta
+con espera creciente sin avanzar el token, de modo que tras un error, un
+reinicio o una reconexion no se pierden eventos (entrega al menos una
+vez; un consumidor puede recibir un lote repetido). Si agota sus
+intentos, su lote va al fichero dead-letter y el bus continua.
+
+Requiere un replica set o un cluster shardeado.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+
+from config import (
+    CHANGE_BATCH_SECONDS,
+    CHANGE_BATCH_SIZE,
+    CHANGE_MAX_ATTEMPTS,
+    CHANGE_RETRY_MAX_SECONDS,
+    CHANGE_TOKEN_SECONDS,
+    CHANGE_WORKERS,
+    DEAD_LETTER_PATH,
+    MUESTREO,
+    get_logger,
+)
+from validator import escribir_rechazados
+
+logger = get_logger(__name__)
+
+# Consumidor: recibe un lote de eventos del change stream
+Consumidor = Callable[[List[Dict[str, Any]]], None]
+
+# Codigo de error cuando el resume token ya no esta en el oplog
+_HISTORIA_PERDIDA = 286
+
+
+def momento_evento(evento: Dict[str, Any]) -> Optional[datetime]:
+    """Momento en que se produjo un evento en el servidor (UTC)."""
+    if isinstance(evento.get("wallTime"), datetime):
+        momento = evento["wallTime"]
+        return momento if momento.tzinfo else momento.replace(tzinfo=timezone.utc)
+    if evento.get("clusterTime") is not None:
+        return evento["clusterTime"].as_datetime()
+    return None
+
+
+class _Registro:
+    """Consumidor registrado con sus metricas."""
+
+    def __init__(self, nombre: str, consumidor: Consumidor, operaciones: Optional[Set[str]]):
+        self.nombre = nombre
+        self.consumidor = consumidor
+        self.operaciones = operaciones
+        self.metricas: Dict[str, Any] = {
+            "procesados": 0, "lotes": 0, "errores": 0, "descartados": 0,
+            "retraso_segundos": None, "ultimo_error": None
+        }
+        # Momento del evento mas antiguo aun sin entregar (None = al dia)
+        self.pendiente_desde: Optional[datetime] = None
+
+    def retraso(self) -> Optional[float]:
+        """Segundos de retraso: desde el evento pendiente mas antiguo si lo hay."""
+        if self.pendiente_desde is not None:
+            return round((datetime.now(timezone.utc) - self.pendiente_desde).total_seconds(), 3)
+        return self.metricas["retraso_segundos"]
+
+
+class BusCambios:
+    """
+    Watcher del change stream con consumidores en paralelo.
+
+    Uso:
+        bus = db_manager.bus_cambios()
+        bus.registrar("cache", lambda lote: cache.clear())
+        bus.iniciar()
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        tokens: Collection,
+        nombre: str = "peliculas",
+        tamaño_lote: int = CHANGE_BATCH_SIZE,
+        intervalo: float = CHANGE_BATCH_SECONDS,
+        workers: int = CHANGE_WORKERS,
+        max_intentos: int = CHANGE_MAX_ATTEMPTS,
+        ruta_rechazados: str = DEAD_LETTER_PATH
+    ):
+        """
+        Args:
+            collection: Coleccion observada
+            tokens: Coleccion donde se guardan los resume tokens
+            nombre: Identificador del bus (_id de su token)
+            tamaño_lote: Eventos maximos por lote
+            intervalo: Segundos maximos que se espera para completar un lote
+            workers: Hilos del pool de entrega
+            max_intentos: Intentos de un consumidor por lote antes de
+                enviarlo al dead-letter
+            ruta_rechazados: Fichero dead-letter de esos lotes
+        """
+        self.collection = collection
+        self.tokens = tokens
+        self.nombre = nombre
+        self.tamaño_lote = tamaño_lote
+        self.intervalo = intervalo
+        self.workers = workers
+        self.max_intentos = max(1, max_intentos)
+        self.ruta_rechazados = ruta_rechazados
+        self.estadisticas = {"eventos": 0, "lotes": 0, "reconexiones": 0, "invalidaciones": 0}
+
+        self._consumidores: List[_Registro] = []
+        self._token_guardado: Any = None
+        self._guardado_en = float("-inf")
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def registrar(
+        self,
+        nombre: str,
+        consumidor: Consumidor,
+        operaciones: Optional[Set[str]] = None
+    ) -> None:
+        """
+        Registra un consumidor.
+
+        Args:
+            nombre: Nombre del consumidor en las metricas
+            consumidor: Funcion que recibe cada lote de eventos
+            operaciones: operationType que le interesan (None = todos)
+        """
+        self._consumidores.append(_Registro(nombre, consumidor, operaciones))
+
+    # ==================== CICLO DE VIDA ====================
+
+    def iniciar(self) -> None:
+        """Arranca el hilo del watcher."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"bus-{self.nombre}")
+        self._hilo = threading.Thread(target=self._bucle, name=f"bus-{self.nombre}", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: Optional[float] = None) -> None:
+        """
+        Detiene el watcher tras el lote en curso.
+
+        Si algun consumidor seguia fallando, el token no avanza y el lote
+        se entrega de nuevo al reanudar.
+        """
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "BusCambios":
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.detener()
+
+    # ==================== RESUME TOKENS ====================
+
+    def _leer_token(self) -> Dict[str, Any]:
+        return self.tokens.find_one({"_id": self.nombre}) or {}
+
+    def _guardar_token(self, token: Any, tras_invalidar: bool = False) -> None:
+        self.tokens.update_one(
+            {"_id": self.nombre},
+            {"$set": {"token": token, "tras_invalidar": tras_invalidar, "actualizado": datetime.now()}},
+            upsert=True
+        )
+        self._token_guardado = token
+        self._guardado_en = time.monotonic()
+
+    def _abrir(self):
+        """Abre el change stream desde el ultimo token guardado."""
+        guardado = self._leer_token()
+        opciones: Dict[str, Any] = {
+            "full_document": "updateLookup",
+            "max_await_time_ms": max(1, int(self.intervalo * 1000))
+        }
+        if guardado.get("token") is not None:
+            # Tras un invalidate solo se puede continuar con start_after
+            opciones["start_after" if guardado.get("tras_invalidar") else "resume_after"] = guardado["token"]
+        return self.collection.watch(**opciones)
+
+    # ==================== BUCLE ====================
+
+    def _bucle(self) -> None:
+        espera = 1.0
+        while not self._detener.is_set():
+            try:
+                with self._abrir() as stream:
+                    espera = 1.0
+                    self._seguir(stream)
+            except OperationFailure as e:
+                if e.code == _HISTORIA_PERDIDA:
+                    logger.error("Resume token de '%s' fuera del oplog; se pierden eventos y se continua desde ahora", self.nombre)
+                    try:
+                        self._guardar_token(None)
+                        continue
+                    except PyMongoError as e_token:
+                        logger.warning("No se pudo reiniciar el token de '%s': %s", self.nombre, e_token)
+                else:
+                    logger.error("Change stream '%s': %s", self.nombre, e)
+            except PyMongoError as e:
+                logger.warning("Change stream '%s' desconectado: %s", self.nombre, e)
+            else:
+                continue
+            self.estadisticas["reconexiones"] += 1
+            self._detener.wait(espera)
+            espera = min(espera * 2, CHANGE_RETRY_MAX_SECONDS)
+
+    def _seguir(self, stream) -> None:
+        """Lee lotes hasta que el stream se cierra o se pide detener."""
+        while not self._detener.is_set() and stream.alive:
+            lote = self._leer_lote(stream)
+            if not lote:
+                # Sin eventos el token avanza igualmente (postBatchResumeToken);
+                # se guarda de vez en cuando para no quedar fuera del oplog
+                token = stream.resume_token
+                if (token is not None and token != self._token_guardado
+                        and time.monotonic() - self._guardado_en >= CHANGE_TOKEN_SECONDS):
+                    self._guardar_token(token)
+                continue
+            if not self._despachar(lote):
+                # Detenido con consumidores sin completar: el token no avanza
+                # y el lote se entrega de nuevo al reanudar
+                return
+            invalidado = lote[-1]["operationType"] == "invalidate"
+            if invalidado:
+                self.estadisticas["invalidaciones"] += 1
+                logger.warning("Change stream '%s' invalidado; se reabre tras el evento", self.nombre)
+            self._guardar_token(stream.resume_token, invalidado)
+            if invalidado:
+                return
+
+    def _leer_lote(self, stream) -> List[Dict[str, Any]]:
+        """Eventos hasta completar el lote, agotar el intervalo o un invalidate."""
+        lote: List[Dict[str, Any]] = []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamaño_lote and time.monotonic() < limite and not self._detener.is_set():
+            evento = stream.try_next()
+            if evento is None:
+                if lote or not stream.alive:
+                    break
+                continue
+            lote.append(evento)
+            if evento["operationType"] == "invalidate":
+                break
+        return lote
+
+    def _despachar(self, lote: List[Dict[str, Any]]) -> bool:
+        """
+        Entrega el lote a todos los consumidores y espera a que terminen.
+
+        Los consumidores que fallan se reintentan (solo ellos) con espera
+        creciente; el que agota max_intentos envia su parte del lote al
+        dead-letter para no bloquear al resto del bus.
+
+        Returns:
+            True si todos lo procesaron o descartaron; False si se pidio
+            detener antes
+        """
+        pendientes = {}
+        for registro in self._consumidores:
+            eventos = lote if registro.operaciones is None else [
+                e for e in lote if e["operationType"] in registro.operaciones
+            ]
+            if eventos:
+                pendientes[registro.nombre] = (registro, eventos)
+                if registro.pendiente_desde is None:
+                    registro.pendiente_desde = momento_evento(eventos[0])
+        consumidores = len(pendientes)
+
+        espera = 1.0
+        intentos = 0
+        while True:
+            futuros = {
+                nombre: self._pool.submit(self._entregar, registro, eventos)
+                for nombre, (registro, eventos) in pendientes.items()
+            }
+            wait(futuros.values())
+            pendientes = {nombre: pendientes[nombre] for nombre, futuro in futuros.items() if not futuro.result()}
+            intentos += 1
+            if pendientes and intentos >= self.max_intentos:
+                for registro, eventos in pendientes.values():
+                    self._descartar(registro, eventos)
+                pendientes = {}
+            if not pendientes:
+                break
+            logger.warning(
+                "Bus '%s': reintentando el lote en %s dentro de %.0fs",
+                self.nombre, sorted(pendientes), espera
+            )
+            if self._detener.wait(espera):
+                return False
+            espera = min(espera * 2, CHANGE_RETRY_MAX_SECONDS)
+
+        self.estadisticas["eventos"] += len(lote)
+        self.estadisticas["lotes"] += 1
+        logger.info(
+            "Bus '%s': lote de %d eventos entregado a %d consumidores",
+            self.nombre, len(lote), consumidores, extra=MUESTREO
+        )
+        return True
+
+    def _entregar(self, registro: _Registro, eventos: List[Dict[str, Any]]) -> bool:
+        try:
+            registro.consumidor(eventos)
+        except Exception as e:
+            registro.metricas["errores"] += 1
+            registro.metricas["ultimo_error"] = str(e)
+            logger.exception("Error en consumidor '%s' del bus '%s'", registro.nombre, self.nombre)
+            return False
+        registro.pendiente_desde = None
+        registro.metricas["procesados"] += len(eventos)
+        registro.metricas["lotes"] += 1
+        momento = momento_evento(eventos[-1])
+        if momento is not None:
+            registro.metricas["retraso_segundos"] = round(
+                (datetime.now(timezone.utc) - momento).total_seconds(), 3
+            )
+        return True
+
+    def _descartar(self, registro: _Registro, eventos: List[Dict[str, Any]]) -> None:
+        """Envia al dead-letter los eventos que un consumidor no pudo procesar."""
+        motivo = (f"bus '{self.nombre}', consumidor '{registro.nombre}': "
+                  f"{self.max_intentos} intentos fallidos ({registro.metricas['ultimo_error']})")
+        escribir_rechazados([(evento, [motivo]) for evento in eventos], self.ruta_rechazados)
+        registro.metricas["descartados"] += len(eventos)
+        registro.pendiente_desde = None
+        logger.error("Bus '%s': %d eventos de '%s' enviados a %s",
+                     self.nombre, len(eventos), registro.nombre, self.ruta_rechazados)
+
+    # ==================== METRICAS ====================
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Estado del bus y de cada consumidor.
+
+        Mientras un consumidor tiene un lote sin entregar, retraso_segundos
+        es el tiempo desde su evento mas antiguo, de modo que un consumidor
+        atascado se ve crecer; al dia, es el tiempo entre el ultimo evento
+        entregado y el final de su procesamiento.
+
+        Returns:
+            Diccionario con activo, estadisticas y consumidores
+        """
+        return {
+            "activo": self._hilo is not None and self._hilo.is_alive(),
+            **self.estadisticas,
+            "consumidores": {
+                r.nombre: {**r.metricas, "retraso_segundos": r.retraso()} for r in self._consumidores
+            }
+        }
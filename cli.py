@@ -1,11 +1,39 @@
 """
 Interfaz de linea de comandos para el sistema de peliculas.
+
+Incluye el menu interactivo (CLI) y una interfaz no interactiva con
+subcomandos para scripts y tuberias:
+
+    python cli.py search --generos Drama --rating-min 8
+    python cli.py search --difusa "laberinto faun"
+    python cli.py top -n 10 --salida json
+    python cli.py stats generos
+    cat reviews.ndjson | python cli.py add-review --stdin
+    python cli.py import peliculas.ndjson
+    python cli.py export todas peliculas.parquet
+    python cli.py similar Inception -k 5
+    python cli.py recommend ana -n 10
+    python cli.py user-reviews ana --pagina 2
+    python cli.py actor "Leonardo DiCaprio" --coprotagonistas
+    python cli.py call queries top_por_genero 3
+
+La salida es NDJSON (un documento por linea) o JSON; los logs van a
+stderr.
 """
 
-from pymongo.errors import PyMongoError
+import argparse
+import itertools
+import json
+import sys
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, TextIO
+
+from config import DEAD_LETTER_PATH, USER_REVIEWS_PAGE_SIZE
 
-from crud import CRUDOperations
-from queries import QueryOperations
+# pymongo y los modulos de datos se importan al usarse para que cargar
+# la CLI sea inmediato
+if TYPE_CHECKING:
+    from crud import CRUDOperations
+    from queries import QueryOperations
 
 
 MENU_PRINCIPAL = """
@@ -29,6 +57,8 @@ MENU_PRINCIPAL = """
 |  15. Eliminar review                                              |
 |  16. Busqueda de texto completo                                   |
 |  17. Ver estadisticas generales                                   |
+|  18. Exportar datos (CSV/JSONL/Parquet)                           |
+|  19. Busqueda avanzada (varios criterios)                         |
 |  0.  Salir                                                        |
 +-------------------------------------------------------------------+
 """
@@ -39,7 +69,7 @@ class CLI:
     Interfaz de linea de comandos interactiva.
     """
     
-    def __init__(self, crud: CRUDOperations, queries: QueryOperations):
+    def __init__(self, crud: "CRUDOperations", queries: "QueryOperations"):
         """
         Inicializa la CLI con las operaciones disponibles.
         
@@ -52,6 +82,8 @@ class CLI:
     
     def ejecutar(self) -> None:
         """Ejecuta el bucle principal del menu."""
+        from pymongo.errors import PyMongoError
+        
         while True:
             print(MENU_PRINCIPAL)
             opcion = input("    Seleccione una opcion: ").strip()
@@ -107,6 +139,10 @@ class CLI:
             self._busqueda_texto()
         elif opcion == "17":
             self._ver_estadisticas_generales()
+        elif opcion == "18":
+            self._exportar()
+        elif opcion == "19":
+            self._busqueda_avanzada()
         else:
             print("    Opcion no valida")
     
@@ -250,3 +286,448 @@ class CLI:
         print(f"      Total reviews: {stats['total_reviews']}")
         print(f"      Generos unicos: {stats['generos_unicos']}")
         print(f"      Directores: {stats['directores']}")
+    
+    def _exportar(self) -> None:
+        """Exporta un origen de datos a fichero."""
+        from exporter import ErrorExportacion, Exportador, ORIGENES, FORMATOS
+        
+        origen = input(f"    Origen ({'/'.join(ORIGENES)}): ").strip()
+        ruta = input(f"    Fichero de destino ({'/'.join(FORMATOS)}): ").strip()
+        filtro = {}
+        if origen == "filtro":
+            filtro = json.loads(input("    Filtro JSON: ") or "{}")
+        paralelo = input("    Lectura paralela por rangos de _id? (y/n): ").strip().lower() == "y"
+        
+        exportador = Exportador(self.crud.collection)
+        try:
+            total = exportador.exportar(origen, ruta, filtro=filtro, paralelo=paralelo)
+        except ImportError as e:
+            print(f"    Formato no disponible (falta una dependencia): {e}")
+            return
+        except OSError as e:
+            print(f"    No se pudo escribir {ruta}: {e}")
+            return
+        except ErrorExportacion as e:
+            print(f"    {e}")
+            return
+        print(f"\n    {total} documentos exportados a {ruta}")
+    
+    def _busqueda_avanzada(self) -> None:
+        """Busca combinando varios criterios (Enter para omitir)."""
+        print("    (Deje en blanco los criterios que no quiera usar)")
+        titulo = input("    Titulo contiene: ").strip() or None
+        generos = [g.strip() for g in input("    Generos (separados por coma): ").split(",") if g.strip()]
+        director = input("    Director contiene: ").strip() or None
+        año_inicio = input("    Año desde: ").strip()
+        año_fin = input("    Año hasta: ").strip()
+        rating = input("    Rating minimo: ").strip()
+        disponible = input("    Solo disponibles? (y/n): ").strip().lower()
+        
+        resultados = self.crud.busqueda_avanzada(
+            titulo=titulo,
+            generos=generos or None,
+            director=director,
+            año_inicio=int(año_inicio) if año_inicio else None,
+            año_fin=int(año_fin) if año_fin else None,
+            rating_min=float(rating) if rating else None,
+            disponible=True if disponible == "y" else None
+        )
+        print(f"\n    === Busqueda avanzada: {len(resultados)} resultados ===")
+        for p in resultados:
+            print(f"      {p['rating']} - {p['titulo']} ({p['año']}) Dir: {p['director']} | {', '.join(p['generos'])}")
+
+
+
+# ==================== INTERFAZ NO INTERACTIVA ====================
+
+# Subcomando stats -> metodo de QueryOperations
+ESTADISTICAS = {
+    "generales": "estadisticas_generales",
+    "generos": "estadisticas_por_genero",
+    "rating-generos": "rating_promedio_por_genero",
+    "directores": "directores_con_mas_peliculas",
+    "reviews": "analisis_reviews",
+    "decadas": "resumen_por_decada",
+}
+
+
+def _serializable(valor: Any) -> Any:
+    """Convierte resultados (DataFrame, Pelicula) a estructuras JSON."""
+    if hasattr(valor, "to_dict") and hasattr(valor, "columns"):
+        return valor.to_dict("records")
+    if hasattr(valor, "a_dict"):
+        return valor.a_dict()
+    if isinstance(valor, list):
+        return [_serializable(v) for v in valor]
+    return valor
+
+
+def emitir(resultado: Any, formato: str = "ndjson", salida: TextIO = sys.stdout) -> None:
+    """
+    Escribe un resultado en la salida.
+
+    Args:
+        resultado: Documento, lista de documentos o valor simple
+        formato: ndjson (una linea por documento) o json
+        salida: Flujo de salida
+    """
+    resultado = _serializable(resultado)
+    if formato == "json":
+        json.dump(resultado, salida, ensure_ascii=False, default=str, indent=2)
+        salida.write("\n")
+        return
+    for documento in resultado if isinstance(resultado, list) else [resultado]:
+        salida.write(json.dumps(documento, ensure_ascii=False, default=str) + "\n")
+    salida.flush()
+
+
+def leer_documentos(flujo: TextIO) -> Iterator[Dict[str, Any]]:
+    """
+    Lee documentos de un flujo NDJSON o de un array JSON.
+
+    Las lineas NDJSON invalidas se informan en stderr y se omiten.
+    """
+    primera = flujo.readline()
+    while primera and not primera.strip():
+        primera = flujo.readline()
+    if primera.lstrip().startswith("["):
+        yield from json.loads(primera + flujo.read())
+        return
+
+    for numero, linea in enumerate(_encadenar(primera, flujo), 1):
+        if not linea.strip():
+            continue
+        try:
+            yield json.loads(linea)
+        except ValueError as e:
+            print(f"linea {numero} ignorada: {e}", file=sys.stderr)
+
+
+def _encadenar(primera: str, flujo: TextIO) -> Iterator[str]:
+    if primera:
+        yield primera
+    yield from flujo
+
+
+def _argumento(texto: str) -> Any:
+    """Interpreta un argumento como JSON si es posible; si no, como texto."""
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
+def _abrir_entrada(ruta: str) -> TextIO:
+    return sys.stdin if ruta == "-" else open(ruta, encoding="utf-8")
+
+
+# ---------- subcomandos ----------
+
+def _cmd_search(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    if args.texto:
+        return crud.busqueda_texto_completo(args.texto, limite=args.limite)
+    if args.difusa:
+        from busqueda import BusquedaDifusa
+        from config import FUZZY_COLLECTION
+
+        return BusquedaDifusa(crud.collection, crud.collection.database[FUZZY_COLLECTION]).buscar(args.difusa, args.limite)
+    return crud.busqueda_avanzada(
+        titulo=args.titulo,
+        generos=args.generos,
+        director=args.director,
+        año_inicio=args.desde,
+        año_fin=args.hasta,
+        rating_min=args.rating_min,
+        disponible=True if args.disponible else None,
+        orden=args.orden,
+        limite=args.limite
+    )
+
+
+def _cmd_top(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    if args.por_genero:
+        return queries.top_por_genero(args.n)
+    return queries.top_peliculas(args.n)
+
+
+def _cmd_stats(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    return getattr(queries, ESTADISTICAS[args.tipo])()
+
+
+def _cmd_add_review(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    if not args.stdin:
+        ok = crud.añadir_review(args.titulo, args.usuario, args.puntuacion, args.comentario)
+        return {"titulo": args.titulo, "usuario": args.usuario, "ok": ok}
+
+    # Lotes de stdin: escritura diferida agrupada por pelicula
+    from review_queue import ColaReviews
+
+    encoladas = rechazadas = 0
+    with ColaReviews(crud) as cola:
+        for r in leer_documentos(sys.stdin):
+            try:
+                ok = cola.encolar(r["titulo"], r["usuario"], int(r["puntuacion"]), r.get("comentario", ""))
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"review ignorada ({e}): {r}", file=sys.stderr)
+                ok = False
+            encoladas += ok
+            rechazadas += not ok
+    return {"encoladas": encoladas, "rechazadas": rechazadas, **cola.estadisticas}
+
+
+def _cmd_update_rating(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    if not args.stdin:
+        return {"titulo": args.titulo, "rating": args.rating, "ok": crud.actualizar_rating(args.titulo, args.rating)}
+    return _resultados_stdin(
+        lambda d: {"titulo": d["titulo"], "rating": d["rating"], "ok": crud.actualizar_rating(d["titulo"], float(d["rating"]))}
+    )
+
+
+def _resultados_stdin(operacion) -> Iterator[Dict[str, Any]]:
+    for documento in leer_documentos(sys.stdin):
+        try:
+            yield operacion(documento)
+        except (KeyError, TypeError, ValueError) as e:
+            yield {"error": str(e), "entrada": documento}
+
+
+def _cmd_import(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    # La entrada NDJSON se lee por lotes: solo hay un lote en memoria
+    totales = {"insertadas": 0, "rechazadas": 0, "errores_servidor": 0}
+    flujo = _abrir_entrada(args.fichero)
+    try:
+        documentos = leer_documentos(flujo)
+        while True:
+            lote = list(itertools.islice(documentos, args.lote))
+            if not lote:
+                break
+            resultado = crud.insertar_peliculas(lote, tamaño_lote=args.lote, ruta_rechazados=args.rechazados)
+            for clave in totales:
+                totales[clave] += resultado[clave]
+    finally:
+        if flujo is not sys.stdin:
+            flujo.close()
+    return totales
+
+
+def _cmd_export(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    from pymongo.errors import PyMongoError
+    from exporter import ErrorExportacion, Exportador
+
+    try:
+        total = Exportador(crud.collection).exportar(
+            args.origen,
+            args.ruta,
+            args.formato,
+            filtro=json.loads(args.filtro),
+            paralelo=args.paralelo
+        )
+    except (ImportError, OSError, ErrorExportacion, PyMongoError) as e:
+        print(f"Error al exportar: {e}", file=sys.stderr)
+        return {"origen": args.origen, "ruta": args.ruta, "ok": False, "error": str(e)}
+    return {"origen": args.origen, "ruta": args.ruta, "documentos": total}
+
+
+def _cmd_similar(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    from config import SIMILARES_COLLECTION
+    from recomendador import RecomendadorContenido
+
+    recomendador = RecomendadorContenido(crud.collection, crud.collection.database[SIMILARES_COLLECTION])
+    if args.calcular:
+        recomendador.crear_indices()
+        recomendador.calcular()
+    if args.id:
+        return recomendador.similares(args.pelicula, args.k)
+    return recomendador.similares_por_titulo(args.pelicula, args.k)
+
+
+def _cmd_recommend(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    from recomendador import RecomendadorColaborativo
+
+    return RecomendadorColaborativo(crud.collection).recomendar(args.usuario, args.n)
+
+
+def _cmd_user_reviews(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    from config import USER_REVIEWS_COLLECTION
+    from reviews_usuario import ReviewsUsuarioService
+
+    servicio = ReviewsUsuarioService(crud.collection, crud.collection.database[USER_REVIEWS_COLLECTION])
+    if args.resumen:
+        return servicio.resumen(args.usuario)
+    return servicio.historial(args.usuario, args.pagina, args.tamaño)["reviews"]
+
+
+def _cmd_actor(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    from actores import ActorService
+    from config import ACTORS_COLLECTION
+
+    servicio = ActorService(crud.collection, crud.collection.database[ACTORS_COLLECTION])
+    if args.director:
+        return servicio.actores_con_director(args.nombre, args.limite)
+    if args.coprotagonistas:
+        return servicio.coprotagonistas(args.nombre, args.limite or 10)
+    if args.buscar:
+        return servicio.buscar_actores(args.nombre, args.limite or 20)
+    return servicio.filmografia(args.nombre) or {"nombre": args.nombre, "ok": False}
+
+
+def _cmd_call(args: argparse.Namespace, crud: "CRUDOperations", queries: "QueryOperations") -> Any:
+    objeto = crud if args.servicio == "crud" else queries
+    if args.metodo.startswith("_") or not callable(getattr(objeto, args.metodo, None)):
+        raise SystemExit(f"Metodo desconocido: {args.servicio}.{args.metodo}")
+    return getattr(objeto, args.metodo)(*[_argumento(a) for a in args.args])
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    """Parser de la interfaz no interactiva."""
+    parser = argparse.ArgumentParser(prog="cli.py", description="Gestion de peliculas sin menu interactivo")
+    parser.add_argument("--salida", choices=["ndjson", "json"], default="ndjson", help="formato de salida")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("search", help="busqueda combinada o de texto completo")
+    p.add_argument("--titulo")
+    p.add_argument("--generos", nargs="+")
+    p.add_argument("--director")
+    p.add_argument("--desde", type=int, help="año minimo")
+    p.add_argument("--hasta", type=int, help="año maximo")
+    p.add_argument("--rating-min", type=float)
+    p.add_argument("--disponible", action="store_true")
+    p.add_argument("--texto", help="busqueda de texto completo (ignora el resto de criterios)")
+    p.add_argument("--difusa", help="busqueda tolerante a erratas por titulo o director")
+    p.add_argument("--orden", default="rating")
+    p.add_argument("--limite", type=int, default=50)
+    p.set_defaults(funcion=_cmd_search)
+
+    p = sub.add_parser("top", help="mejores peliculas")
+    p.add_argument("-n", type=int, default=5)
+    p.add_argument("--por-genero", action="store_true", help="top n de cada genero")
+    p.set_defaults(funcion=_cmd_top)
+
+    p = sub.add_parser("stats", help="estadisticas y agregaciones")
+    p.add_argument("tipo", choices=list(ESTADISTICAS), nargs="?", default="generales")
+    p.set_defaults(funcion=_cmd_stats)
+
+    p = sub.add_parser("add-review", help="añade una review o un lote NDJSON desde stdin")
+    p.add_argument("titulo", nargs="?")
+    p.add_argument("usuario", nargs="?")
+    p.add_argument("puntuacion", nargs="?", type=int)
+    p.add_argument("comentario", nargs="?", default="")
+    p.add_argument("--stdin", action="store_true", help="lee {titulo, usuario, puntuacion, comentario} por linea")
+    p.set_defaults(funcion=_cmd_add_review)
+
+    p = sub.add_parser("update-rating", help="actualiza ratings (uno o un lote NDJSON desde stdin)")
+    p.add_argument("titulo", nargs="?")
+    p.add_argument("rating", nargs="?", type=float)
+    p.add_argument("--stdin", action="store_true", help="lee {titulo, rating} por linea")
+    p.set_defaults(funcion=_cmd_update_rating)
+
+    p = sub.add_parser("import", help="inserta peliculas desde NDJSON o array JSON")
+    p.add_argument("fichero", nargs="?", default="-", help="fichero de entrada (- para stdin)")
+    p.add_argument("--lote", type=int, default=1000)
+    p.add_argument("--rechazados", default=DEAD_LETTER_PATH, help="fichero dead-letter")
+    p.set_defaults(funcion=_cmd_import)
+
+    p = sub.add_parser("export", help="exporta datos a CSV/JSONL/Parquet")
+    p.add_argument("origen", help="todas, filtro, reviews o generos")
+    p.add_argument("ruta")
+    p.add_argument("--formato", help="csv, jsonl o parquet (por defecto, la extension)")
+    p.add_argument("--filtro", default="{}", help="filtro JSON para el origen 'filtro'")
+    p.add_argument("--paralelo", action="store_true")
+    p.set_defaults(funcion=_cmd_export)
+
+    p = sub.add_parser("similar", help="peliculas parecidas por contenido (vecinos precalculados)")
+    p.add_argument("pelicula", help="titulo (o id con --id)")
+    p.add_argument("-k", type=int, default=10)
+    p.add_argument("--id", action="store_true", help="identifica la pelicula por su campo id")
+    p.add_argument("--calcular", action="store_true", help="recalcula los vecinos antes de consultar")
+    p.set_defaults(funcion=_cmd_similar)
+
+    p = sub.add_parser("recommend", help="recomendaciones colaborativas para un usuario")
+    p.add_argument("usuario")
+    p.add_argument("-n", type=int, default=10)
+    p.set_defaults(funcion=_cmd_recommend)
+
+    p = sub.add_parser("user-reviews", help="reviews de un usuario (paginadas) o su resumen")
+    p.add_argument("usuario")
+    p.add_argument("--pagina", type=int, default=1)
+    p.add_argument("--tamaño", type=int, default=USER_REVIEWS_PAGE_SIZE)
+    p.add_argument("--resumen", action="store_true", help="solo numero de reviews y puntuacion media")
+    p.set_defaults(funcion=_cmd_user_reviews)
+
+    p = sub.add_parser("actor", help="filmografia, coprotagonistas y busqueda de actores")
+    p.add_argument("nombre", help="nombre del actor (o del director con --director)")
+    grupo = p.add_mutually_exclusive_group()
+    grupo.add_argument("--buscar", action="store_true", help="actores cuyo nombre empieza por el texto")
+    grupo.add_argument("--coprotagonistas", action="store_true")
+    grupo.add_argument("--director", action="store_true", help="actores que trabajaron con el director")
+    p.add_argument("--limite", type=int, default=0)
+    p.set_defaults(funcion=_cmd_actor)
+
+    p = sub.add_parser("call", help="invoca cualquier metodo de CRUDOperations o QueryOperations")
+    p.add_argument("servicio", choices=["crud", "queries"])
+    p.add_argument("metodo")
+    p.add_argument("args", nargs="*", help="argumentos (JSON o texto)")
+    p.set_defaults(funcion=_cmd_call)
+
+    return parser
+
+
+# Contadores de los resultados de escrituras en lote que indican fallos
+_CONTADORES_FALLO = ("rechazadas", "errores_servidor", "errores")
+
+
+def _fallido(resultado: Any) -> bool:
+    """Indica si el resultado de un subcomando contiene escrituras fallidas."""
+    if not isinstance(resultado, dict):
+        return False
+    return resultado.get("ok") is False or any(
+        isinstance(resultado.get(c), int) and resultado[c] > 0 for c in _CONTADORES_FALLO
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Ejecuta un subcomando y escribe su resultado en stdout.
+
+    Returns:
+        Codigo de salida: 0 si no hubo errores, 1 si alguna escritura o
+        la base de datos fallo, 2 si la entrada no es valida
+    """
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+    if args.comando == "add-review" and not args.stdin and args.puntuacion is None:
+        parser.error("add-review necesita titulo, usuario y puntuacion (o --stdin)")
+    if args.comando == "update-rating" and not args.stdin and args.rating is None:
+        parser.error("update-rating necesita titulo y rating (o --stdin)")
+
+    from pymongo.errors import PyMongoError
+    from database import DatabaseManager
+    from main import crear_operaciones
+
+    db_manager = DatabaseManager()
+    db_manager.conectar(verificar=False)
+    try:
+        crud, queries = crear_operaciones(db_manager)
+        resultado = args.funcion(args, crud, queries)
+        if isinstance(resultado, Iterator):
+            # Resultados de lotes: se emiten segun se producen
+            errores = 0
+            for documento in resultado:
+                errores += "error" in documento or _fallido(documento)
+                emitir(documento, "ndjson")
+            return 1 if errores else 0
+        emitir(resultado, args.salida)
+        return 1 if _fallido(resultado) else 0
+    except ValueError as e:
+        # JSON de entrada o de --filtro invalido, formato u origen no soportado
+        print(f"Entrada invalida: {e}", file=sys.stderr)
+        return 2
+    except PyMongoError as e:
+        print(f"Error de base de datos: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db_manager.desconectar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Lectura columnar de cursores de MongoDB hacia pandas o Arrow.
+
+Si PyMongoArrow esta instalado, los cursores se decodifican directamente
+a buffers de Arrow. Si no, la lectura no es columnar: pymongo decodifica
+cada documento proyectado a un dict y sus campos se copian a listas por
+columna. Lo que se evita es retener la lista completa de dicts; cada dict
+se libera al pasar al siguiente documento, de modo que el pico de memoria
+es el de las columnas mas un lote del cursor (ver `python benchmarks.py
+columnar`).
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from pymongo.collection import Collection
+
+try:
+    from pymongoarrow import api as pymongoarrow_api
+except ImportError:
+    pymongoarrow_api = None
+
+
+def columnas_desde_cursor(
+    cursor: Iterable[Mapping[str, Any]],
+    campos: Sequence[str]
+) -> Dict[str, List[Any]]:
+    """
+    Vuelca un cursor en listas por columna.
+
+    Cada documento se recorre una sola vez y no se conserva.
+
+    Args:
+        cursor: Cursor o iterable de documentos
+        campos: Campos de primer nivel a extraer
+
+    Returns:
+        Diccionario campo -> lista de valores
+    """
+    listas: List[List[Any]] = [[] for _ in campos]
+    appends = [lista.append for lista in listas]
+    pares = list(zip(appends, campos))
+
+    for doc in cursor:
+        get = doc.get
+        for append, campo in pares:
+            append(get(campo))
+
+    return dict(zip(campos, listas))
+
+
+def _proyeccion(campos: Sequence[str]) -> Dict[str, int]:
+    proyeccion = {campo: 1 for campo in campos}
+    if "_id" not in proyeccion:
+        proyeccion["_id"] = 0
+    return proyeccion
+
+
+def find_dataframe(
+    collection: Collection,
+    filtro: Dict[str, Any],
+    campos: Sequence[str],
+    orden: Optional[List[tuple]] = None
+):
+    """
+    Ejecuta un find y devuelve un DataFrame columnar.
+
+    Args:
+        collection: Coleccion de MongoDB
+        filtro: Filtro de la consulta
+        campos: Columnas del resultado
+        orden: Lista de (campo, direccion) para sort
+
+    Returns:
+        pandas.DataFrame con las columnas indicadas
+    """
+    import pandas as pd
+
+    kwargs: Dict[str, Any] = {"projection": _proyeccion(campos)}
+    if orden:
+        kwargs["sort"] = orden
+
+    if pymongoarrow_api is not None:
+        df = pymongoarrow_api.find_pandas_all(collection, filtro, **kwargs)
+        return df.reindex(columns=list(campos))
+
+    columnas = columnas_desde_cursor(collection.find(filtro, **kwargs), campos)
+    return pd.DataFrame(columnas, columns=list(campos))
+
+
+def aggregate_dataframe(
+    collection: Collection,
+    pipeline: List[Dict[str, Any]],
+    campos: Sequence[str]
+):
+    """
+    Ejecuta un pipeline y devuelve un DataFrame columnar.
+
+    Args:
+        collection: Coleccion de MongoDB
+        pipeline: Pipeline de agregacion
+        campos: Columnas del resultado
+
+    Returns:
+        pandas.DataFrame con las columnas indicadas
+    """
+    import pandas as pd
+
+    if pymongoarrow_api is not None:
+        df = pymongoarrow_api.aggregate_pandas_all(collection, pipeline)
+        return df.reindex(columns=list(campos))
+
+    columnas = columnas_desde_cursor(collection.aggregate(pipeline), campos)
+    return pd.DataFrame(columnas, columns=list(campos))
+
+
+def find_arrow(
+    collection: Collection,
+    filtro: Dict[str, Any],
+    campos: Sequence[str],
+    orden: Optional[List[tuple]] = None
+):
+    """
+    Ejecuta un find y devuelve una pyarrow.Table.
+
+    Args:
+        collection: Coleccion de MongoDB
+        filtro: Filtro de la consulta
+        campos: Columnas del resultado
+        orden: Lista de (campo, direccion) para sort
+    """
+    import pyarrow as pa
+
+    kwargs: Dict[str, Any] = {"projection": _proyeccion(campos)}
+    if orden:
+        kwargs["sort"] = orden
+
+    if pymongoarrow_api is not None:
+        return pymongoarrow_api.find_arrow_all(collection, filtro, **kwargs).select(list(campos))
+
+    return pa.table(columnas_desde_cursor(collection.find(filtro, **kwargs), campos))
+
+
+def aggregate_arrow(
+    collection: Collection,
+    pipeline: List[Dict[str, Any]],
+    campos: Sequence[str]
+):
+    """
+    Ejecuta un pipeline y devuelve una pyarrow.Table.
+
+    Args:
+        collection: Coleccion de MongoDB
+        pipeline: Pipeline de agregacion
+        campos: Columnas del resultado
+    """
+    import pyarrow as pa
+
+    if pymongoarrow_api is not None:
+        return pymongoarrow_api.aggregate_arrow_all(collection, pipeline).select(list(campos))
+
+    return pa.table(columnas_desde_cursor(collection.aggregate(pipeline), campos))
@@ -2,17 +2,280 @@
 Configuracion del sistema de gestion de peliculas.
 """
 
+import atexit
+import itertools
+import json
 import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
 
 # Configuracion de MongoDB
 MONGO_URI = "mongodb://localhost:27017/"
 DB_NAME = "gestion_peliculas"
 COLLECTION_NAME = "peliculas"
+FACETS_COLLECTION = "facetas"
+
+# Coleccion time-series con el historial de ratings y reviews
+HISTORY_COLLECTION = "historial"
+HISTORY_GRANULARITY = "hours"
+
+# Archivado de peliculas no disponibles y reviews antiguas
+ARCHIVE_MOVIES_COLLECTION = "peliculas_archivo"
+ARCHIVE_REVIEWS_COLLECTION = "reviews_archivo"
+ARCHIVE_REVIEW_DAYS = 365
+ARCHIVE_BATCH_SIZE = 500
+
+# Copia de las reviews indexada por usuario y tamaño de pagina del historial
+USER_REVIEWS_COLLECTION = "reviews_usuario"
+USER_REVIEWS_PAGE_SIZE = 20
+
+# Coleccion de actores con filmografia precalculada
+ACTORS_COLLECTION = "actores"
+
+# Busqueda difusa: indice de trigramas, candidatos a reordenar y
+# puntuacion minima (0-1)
+FUZZY_COLLECTION = "trigramas"
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_SCORE = 0.3
+
+# Replica local de solo lectura (SQLite) mantenida con un change stream:
+# fichero (":memory:" para no persistir), retraso maximo en segundos
+# respecto al servidor para servir lecturas, espera de cada getMore y
+# pausa entre reintentos. Requiere replica set.
+REPLICA_ENABLED = False
+REPLICA_PATH = "replica.sqlite3"
+REPLICA_MAX_STALENESS = 5.0
+REPLICA_AWAIT_MS = 1000
+REPLICA_RETRY_SECONDS = 5.0
+
+# Bus de eventos del change stream (cambios.BusCambios): coleccion de
+# resume tokens, eventos maximos por lote, segundos maximos para
+# completar un lote, hilos de entrega, espera maxima entre reconexiones
+# o reintentos de un consumidor, segundos entre guardados del token
+# mientras no hay eventos e intentos de un consumidor antes de enviar el
+# lote al dead-letter. Requiere replica set.
+CHANGE_STREAM_ENABLED = False
+CHANGE_TOKENS_COLLECTION = "resume_tokens"
+CHANGE_BATCH_SIZE = 100
+CHANGE_BATCH_SECONDS = 0.5
+CHANGE_WORKERS = 4
+CHANGE_RETRY_MAX_SECONDS = 30.0
+CHANGE_TOKEN_SECONDS = 60.0
+CHANGE_MAX_ATTEMPTS = 5
+
+# Recomendaciones por contenido: vecinos precalculados por pelicula y
+# filas por bloque al calcular la similitud
+SIMILARES_COLLECTION = "similares"
+RECO_TOP_K = 20
+RECO_CHUNK_SIZE = 512
+
+# Segundos de validez y entradas maximas de las lecturas cacheadas en
+# la app Streamlit
+APP_CACHE_TTL = 300
+APP_CACHE_MAX_ENTRIES = 2000
+
+# Clave de shard para despliegues shardeados (ver sharding.CLAVES_SHARD)
+SHARD_KEY = "hashed_id"
+# Titulos cuyos valores de la clave de shard se recuerdan para dirigir
+# escrituras (LRU; los menos usados se vuelven a resolver con una consulta)
+SHARD_KEY_CACHE_SIZE = 10_000
+
+# Fichero dead-letter para documentos rechazados en la ingesta
+DEAD_LETTER_PATH = "rechazados.jsonl"
+
+# Exportacion: documentos por chunk y lecturas paralelas por rango de _id
+EXPORT_CHUNK_SIZE = 10_000
+EXPORT_WORKERS = 4
+
+# Rangos concurrentes en agregaciones paralelas
+AGGREGATION_WORKERS = 4
+
+# Cola de reviews con escritura diferida; las reviews de una pelicula
+# que falla REVIEW_QUEUE_MAX_ATTEMPTS volcados seguidos van al dead-letter
+REVIEW_QUEUE_CAPACITY = 10_000
+REVIEW_QUEUE_BATCH_SIZE = 500
+REVIEW_QUEUE_FLUSH_SECONDS = 1.0
+REVIEW_QUEUE_WAL_PATH = "reviews.wal"
+REVIEW_QUEUE_MAX_ATTEMPTS = 5
 
 # Configuracion de logging
 LOG_LEVEL = logging.INFO
 LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOG_JSON = True
+
+# Niveles por modulo (nombre del logger -> nivel)
+LOG_LEVELS: Dict[str, int] = {
+    "crud": logging.INFO,
+    "database": logging.INFO,
+    "queries": logging.INFO,
+    "pymongo": logging.WARNING,
+}
+
+# Solo 1 de cada N mensajes de exito de alta frecuencia se registra
+LOG_SAMPLE_RATE = 100
+
+# Marca para mensajes muestreables: logger.info(..., extra=MUESTREO)
+MUESTREO = {"muestreo": True}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como una linea JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entrada = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "nivel": record.levelname,
+            "modulo": record.name,
+            "mensaje": record.getMessage(),
+        }
+        if record.exc_info:
+            entrada["error"] = self.formatException(record.exc_info)
+        return json.dumps(entrada, ensure_ascii=False, default=str)
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar 1 de cada `tasa` registros marcados con MUESTREO.
+
+    Los registros sin marca (errores, avisos) pasan siempre. Los loggers
+    del sistema consultan admitir() antes de crear el registro (ver
+    LoggerMuestreado); como filtro de handler sirve para otros loggers.
+    """
+
+    def __init__(self, tasa: int = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.tasa = max(1, tasa)
+        self._contador = itertools.count()
+
+    def admitir(self) -> bool:
+        """Avanza el contador y dice si el siguiente mensaje marcado se registra."""
+        return next(self._contador) % self.tasa == 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "muestreo", False):
+            return True
+        return self.admitir()
+
+
+_muestreo = FiltroMuestreo()
+
+# Marcos de LoggerMuestreado._log a saltar para que findCaller apunte a
+# quien llamo a logger.info (desde 3.11 solo cuentan los marcos ajenos a
+# logging)
+_MARCOS_PROPIOS = 1 if sys.version_info >= (3, 11) else 2
+
+
+class LoggerMuestreado(logging.Logger):
+    """
+    Logger que descarta los mensajes marcados con MUESTREO antes de crear el LogRecord.
+
+    Un mensaje descartado solo cuesta la comprobacion de nivel y el
+    contador: no se construye el registro, ni se fusiona `extra`, ni se
+    busca el marco que llamo.
+    """
+
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        if extra is not None and extra.get("muestreo") and not _muestreo.admitir():
+            return
+        super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel + _MARCOS_PROPIOS)
+
+
+logging.setLoggerClass(LoggerMuestreado)
+
+# Argumentos que pueden cambiar entre el encolado y el formateo
+_ARGS_MUTABLES = (dict, list, set, bytearray)
+
+
+class _QueueHandlerDiferido(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo que emite.
+
+    El formateo (incluido el merge de args) ocurre en el hilo del
+    QueueListener, de modo que el camino de escritura solo encola. Los
+    registros con argumentos mutables (filtros, listas de titulos) se
+    formatean al encolar, como hace QueueHandler.prepare, para que el
+    mensaje refleje su valor en el momento de la llamada.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if isinstance(args, dict) or any(isinstance(a, _ARGS_MUTABLES) for a in args or ()):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configurar_logging(
+    nivel: int = LOG_LEVEL,
+    json_output: bool = LOG_JSON,
+    tasa_muestreo: int = LOG_SAMPLE_RATE
+) -> None:
+    """
+    Configura el logging raiz con escritura en segundo plano.
+
+    Los registros se encolan en un QueueHandler y un QueueListener
+    los formatea y escribe desde su propio hilo.
+
+    Args:
+        nivel: Nivel del logger raiz
+        json_output: Si True, emite lineas JSON; si no, usa LOG_FORMAT
+        tasa_muestreo: Tasa de muestreo de mensajes marcados con MUESTREO
+    """
+    global _listener
+
+    if _listener is not None:
+        return
+
+    salida = logging.StreamHandler()
+    salida.setFormatter(JsonFormatter() if json_output else logging.Formatter(LOG_FORMAT))
+
+    cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = _QueueHandlerDiferido(cola)
+    _muestreo.tasa = max(1, tasa_muestreo)
+
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    raiz.addHandler(handler)
+
+    for nombre, nivel_modulo in LOG_LEVELS.items():
+        logging.getLogger(nombre).setLevel(nivel_modulo)
+
+    _listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener_logging)
+
+
+def detener_logging() -> None:
+    """Vacia la cola de logging y detiene el hilo escritor."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(nombre: str) -> logging.Logger:
+    """
+    Obtiene el logger de un modulo aplicando su nivel configurado.
+
+    Args:
+        nombre: Nombre del modulo (normalmente __name__)
+
+    Returns:
+        Logger del modulo
+    """
+    log = logging.getLogger(nombre)
+    if nombre in LOG_LEVELS:
+        log.setLevel(LOG_LEVELS[nombre])
+    return log
+
 
 # Configurar logger
-logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+configurar_logging()
 logger = logging.getLogger(__name__)
@@ -2,13 +2,84 @@
 Operaciones CRUD para la coleccion de peliculas.
 """
 
+from collections import OrderedDict
+
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import UpdateOne
 from pymongo.collection import Collection
-from pymongo.errors import PyMongoError, WriteError
+from pymongo.errors import PyMongoError, WriteError, BulkWriteError
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Set
+import random
+import time
 import uuid
 
-from config import logger
+import columnar
+from archivo import ArchivoService
+from config import DEAD_LETTER_PATH, SHARD_KEY_CACHE_SIZE, get_logger, MUESTREO
+from models import Pelicula
+from query_builder import ConsultaPeliculas
+from replica import ReplicaLocal
+from sharding import campos_clave, es_dirigida, valores_clave
+from validator import VALIDADOR_PELICULAS, escribir_rechazados
+
+logger = get_logger(__name__)
+
+# Observador de escrituras: (evento, datos) -> None
+Observador = Callable[[str, Dict[str, Any]], None]
+
+
+def campos_control(pelicula: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Campos de control de una pelicula nueva.
+    
+    version se usa para actualizaciones optimistas (compare-and-set) y
+    num_reviews/suma_puntuaciones son contadores mantenidos con $inc.
+    """
+    puntuaciones = [r.get("puntuacion", 0) for r in pelicula.get("reviews") or []]
+    return {
+        "version": 0,
+        "num_reviews": len(puntuaciones),
+        "suma_puntuaciones": sum(puntuaciones)
+    }
+
+
+def nueva_review_doc(usuario: str, puntuacion: int, comentario: str) -> Dict[str, Any]:
+    """Construye el subdocumento de una review nueva."""
+    ahora = datetime.now()
+    return {
+        "usuario": usuario,
+        "puntuacion": puntuacion,
+        "comentario": comentario,
+        "fecha": ahora.strftime("%Y-%m-%d"),
+        "createdAt": ahora
+    }
+
+
+def titulos_fallidos(error: BulkWriteError, titulos: List[str]) -> Set[str]:
+    """
+    Titulos cuyas operaciones fallaron en un bulk_write por titulo.
+
+    Args:
+        error: Error del bulk_write
+        titulos: Titulos en el mismo orden que las operaciones
+    """
+    return {titulos[e["index"]] for e in error.details.get("writeErrors", [])}
+
+
+def _sin_id(peliculas: List[Dict]) -> List[Dict]:
+    """Quita el campo id añadido a la proyeccion para deduplicar."""
+    for p in peliculas:
+        p.pop("id", None)
+    return peliculas
+
+
+def _filtro_version(version: int) -> Dict[str, Any]:
+    """Filtro de compare-and-set; version 0 incluye documentos sin el campo."""
+    if version == 0:
+        return {"$or": [{"version": 0}, {"version": {"$exists": False}}]}
+    return {"version": version}
 
 
 class CRUDOperations:
@@ -16,14 +87,148 @@ class CRUDOperations:
     Operaciones Create, Read, Update, Delete para peliculas.
     """
     
-    def __init__(self, collection: Collection):
+    def __init__(
+        self,
+        collection: Collection,
+        clave_shard: Optional[Dict[str, Any]] = None,
+        archivo: Optional[ArchivoService] = None,
+        replica: Optional[ReplicaLocal] = None
+    ):
         """
         Inicializa con la coleccion de MongoDB.
         
         Args:
             collection: Coleccion de peliculas
+            clave_shard: Clave de shard de la coleccion (None si no esta
+                shardeada; ver DatabaseManager.clave_shard)
+            archivo: Archivo consultado cuando la coleccion principal no
+                completa una busqueda (None para no usarlo)
+            replica: Replica local que sirve las lecturas mientras este
+                vigente (None para leer siempre de MongoDB)
         """
         self.collection = collection
+        self.archivo = archivo
+        self.replica = replica
+        self.observadores: List[Observador] = []
+        self.clave_shard = clave_shard
+        # Titulo -> valores de la clave de shard, para dirigir escrituras
+        # (LRU acotada a SHARD_KEY_CACHE_SIZE titulos)
+        self._claves_por_titulo: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        if archivo is not None:
+            archivo.registrar_observador(self._aplicar_movimiento)
+    
+    def registrar_observador(self, observador: Observador) -> None:
+        """
+        Registra un observador que se notifica tras cada escritura.
+        
+        Eventos:
+            - insertar: {"peliculas": [documentos insertados]}
+            - eliminar: {"peliculas": [documentos eliminados]}
+            - reviews: {"reviews": {titulo: [reviews añadidas]}}
+            - eliminar_review: {"reviews": {titulo: [usuarios]}}
+            - rating: {"ratings": {titulo: nuevo rating}}
+            - archivar_reviews: {"reviews": {titulo: [reviews movidas al archivo]}}
+        
+        Args:
+            observador: Funcion (evento, datos)
+        """
+        self.observadores.append(observador)
+    
+    def _notificar(self, evento: str, datos: Dict[str, Any]) -> None:
+        """Notifica un evento a los observadores; sus errores solo se registran."""
+        if self.replica is not None:
+            # Las lecturas siguientes no deben servirse sin esta escritura
+            self.replica.registrar_escritura()
+        for observador in self.observadores:
+            try:
+                observador(evento, datos)
+            except Exception:
+                logger.exception("Error en observador de '%s'", evento)
+    
+    def _aplicar_movimiento(self, evento: str, datos: Dict[str, Any]) -> None:
+        """Movimientos del archivo: peliculas (eliminar/insertar) y archivar_reviews."""
+        if evento == "eliminar":
+            self._olvidar_claves(*(p["titulo"] for p in datos["peliculas"]))
+        elif evento == "insertar":
+            self._recordar_claves(datos["peliculas"])
+        self._notificar(evento, datos)
+    
+    # ==================== ENRUTAMIENTO ====================
+    
+    def _registrar_ruta(self, operacion: str, filtro: Dict[str, Any]) -> None:
+        """Marca en el log las operaciones que no incluyen la clave de shard."""
+        if self.clave_shard and not es_dirigida(filtro, self.clave_shard):
+            logger.info("Scatter-gather en %s: %s", operacion, filtro, extra=MUESTREO)
+    
+    def _recordar_claves(self, peliculas: List[Dict[str, Any]]) -> None:
+        """Guarda los valores de la clave de shard de peliculas conocidas."""
+        if self.clave_shard:
+            for p in peliculas:
+                self._claves_por_titulo[p["titulo"]] = valores_clave(p, self.clave_shard)
+                self._claves_por_titulo.move_to_end(p["titulo"])
+            while len(self._claves_por_titulo) > SHARD_KEY_CACHE_SIZE:
+                self._claves_por_titulo.popitem(last=False)
+    
+    def _filtros_titulo(self, titulos: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Filtros por titulo que incluyen la clave de shard si es posible.
+        
+        Los titulos aun no vistos se resuelven con una sola consulta; a
+        partir de ahi las escrituras sobre ellos van a un unico shard.
+        """
+        if not self.clave_shard:
+            return {titulo: {"titulo": titulo} for titulo in titulos}
+        
+        pendientes = []
+        for titulo in titulos:
+            if titulo in self._claves_por_titulo:
+                self._claves_por_titulo.move_to_end(titulo)
+            else:
+                pendientes.append(titulo)
+        if pendientes:
+            proyeccion = {campo: 1 for campo in campos_clave(self.clave_shard)}
+            proyeccion.update({"_id": 0, "titulo": 1})
+            self._registrar_ruta("resolver titulos", {"titulo": {"$in": pendientes}})
+            self._recordar_claves(list(self.collection.find({"titulo": {"$in": pendientes}}, proyeccion)))
+        
+        return {
+            titulo: {"titulo": titulo, **self._claves_por_titulo.get(titulo, {})}
+            for titulo in titulos
+        }
+    
+    def _filtro_titulo(self, titulo: str) -> Dict[str, Any]:
+        """Filtro dirigido para una sola pelicula."""
+        return self._filtros_titulo([titulo])[titulo]
+    
+    def _olvidar_claves(self, *titulos: str) -> None:
+        """Descarta claves cacheadas (pelicula eliminada o clave obsoleta)."""
+        for titulo in titulos:
+            self._claves_por_titulo.pop(titulo, None)
+    
+    def _update_dirigido(self, titulo: str, filtro: Dict[str, Any], update: Any):
+        """
+        update_one con filtro dirigido.
+        
+        Si no hay coincidencias y el filtro usaba una clave cacheada,
+        esta puede estar obsoleta: se descarta y se reintenta una vez.
+        Si la pelicula sigue en la clave cacheada (p. ej. un conflicto de
+        version), no se vuelve a resolver: la comprobacion va al mismo
+        shard y evita un scatter-gather por conflicto.
+        """
+        resultado = self.collection.update_one(filtro, update)
+        if resultado.matched_count or titulo not in self._claves_por_titulo:
+            return resultado
+        
+        claves_previas = self._claves_por_titulo[titulo]
+        if self.collection.find_one({"titulo": titulo, **claves_previas}, {"_id": 1}) is not None:
+            return resultado
+        
+        del self._claves_por_titulo[titulo]
+        nuevas = self._filtro_titulo(titulo)
+        if titulo not in self._claves_por_titulo or nuevas == {"titulo": titulo, **claves_previas}:
+            return resultado
+        resto = {campo: valor for campo, valor in filtro.items() if campo not in claves_previas}
+        return self.collection.update_one({**resto, **nuevas}, update)
     
     # ==================== CREATE ====================
     
@@ -37,59 +242,287 @@ class CRUDOperations:
         Returns:
             ID de la pelicula insertada o None si hay error
         """
+        errores = VALIDADOR_PELICULAS.errores(pelicula)
+        if errores:
+            logger.error("Pelicula '%s' rechazada: %s", pelicula.get("titulo"), errores)
+            return None
+        
         try:
             pelicula["id"] = str(uuid.uuid4())
             pelicula["createdAt"] = datetime.now()
             pelicula["updatedAt"] = datetime.now()
+            pelicula.update(campos_control(pelicula))
             
             resultado = self.collection.insert_one(pelicula)
-            logger.info(f"Pelicula '{pelicula.get('titulo')}' insertada")
+            logger.info("Pelicula '%s' insertada", pelicula.get("titulo"), extra=MUESTREO)
+            self._recordar_claves([pelicula])
+            self._notificar("insertar", {"peliculas": [pelicula]})
             return str(resultado.inserted_id)
         except WriteError as e:
-            logger.error(f"Error de validacion: {e.details}")
+            logger.error("Error de validacion: %s", e.details)
             return None
         except PyMongoError as e:
-            logger.error(f"Error al insertar: {e}")
+            logger.error("Error al insertar: %s", e)
             return None
     
+    def insertar_peliculas(
+        self,
+        peliculas: List[Dict[str, Any]],
+        tamaño_lote: int = 1000,
+        ruta_rechazados: str = DEAD_LETTER_PATH
+    ) -> Dict[str, int]:
+        """
+        Inserta peliculas en bloque con pre-validacion en cliente.
+        
+        Los documentos que no cumplen el esquema se escriben en el
+        fichero dead-letter y no llegan al servidor.
+        
+        Args:
+            peliculas: Lista de peliculas a insertar
+            tamaño_lote: Documentos por insert_many
+            ruta_rechazados: Fichero dead-letter para los rechazados
+            
+        Returns:
+            Diccionario con insertadas, rechazadas y errores de servidor
+        """
+        validas, rechazadas = VALIDADOR_PELICULAS.filtrar(peliculas)
+        escribir_rechazados(rechazadas, ruta_rechazados)
+        
+        ahora = datetime.now()
+        insertadas = 0
+        errores_servidor = 0
+        
+        for inicio in range(0, len(validas), tamaño_lote):
+            lote = validas[inicio:inicio + tamaño_lote]
+            for pelicula in lote:
+                pelicula["id"] = str(uuid.uuid4())
+                pelicula["createdAt"] = ahora
+                pelicula["updatedAt"] = ahora
+                pelicula.update(campos_control(pelicula))
+            try:
+                resultado = self.collection.insert_many(lote, ordered=False)
+                insertadas += len(resultado.inserted_ids)
+                self._recordar_claves(lote)
+                self._notificar("insertar", {"peliculas": lote})
+            except BulkWriteError as e:
+                fallidos = {err["index"] for err in e.details.get("writeErrors", [])}
+                insertadas += e.details.get("nInserted", 0)
+                errores_servidor += len(fallidos)
+                logger.error("Errores en lote de insercion: %s", e.details.get("writeErrors"))
+                correctas = [p for i, p in enumerate(lote) if i not in fallidos]
+                self._recordar_claves(correctas)
+                self._notificar("insertar", {"peliculas": correctas})
+            except PyMongoError as e:
+                errores_servidor += len(lote)
+                logger.error("Error al insertar lote: %s", e)
+        
+        logger.info("%d peliculas insertadas, %d rechazadas", insertadas, len(rechazadas))
+        return {
+            "insertadas": insertadas,
+            "rechazadas": len(rechazadas),
+            "errores_servidor": errores_servidor
+        }
+    
     # ==================== READ ====================
     
-    def obtener_todas(self) -> List[Dict]:
+    def _leer_local(
+        self,
+        filtro: Dict[str, Any],
+        proyeccion: Dict[str, Any],
+        limite: int = 0,
+        orden: Optional[List[tuple]] = None
+    ) -> Optional[List[Dict]]:
+        """Lectura desde la replica local; None si hay que ir a MongoDB."""
+        if self.replica is None:
+            return None
+        return self.replica.find(filtro, proyeccion, limite, orden)
+    
+    def obtener_todas(self, limite: int = 0) -> List[Dict]:
         """Obtiene todas las peliculas ordenadas por rating."""
-        return list(self.collection.find(
+        proyeccion = {"_id": 0, "titulo": 1, "año": 1, "rating": 1, "director": 1}
+        locales = self._leer_local({}, proyeccion, limite, [("rating", -1)])
+        if locales is not None:
+            return locales
+        return list(self.collection.find({}, proyeccion).sort("rating", -1).limit(limite))
+    
+    def obtener_todas_df(self):
+        """
+        Obtiene todas las peliculas ordenadas por rating como DataFrame.
+        
+        Decodifica el cursor por columnas en lugar de construir una
+        lista de dicts.
+        """
+        return columnar.find_dataframe(
+            self.collection,
             {},
-            {"_id": 0, "titulo": 1, "año": 1, "rating": 1, "director": 1}
-        ).sort("rating", -1))
+            ["titulo", "año", "rating", "director"],
+            orden=[("rating", -1)]
+        )
+    
+    def obtener_peliculas(
+        self,
+        filtro: Optional[Dict[str, Any]] = None,
+        limite: int = 0
+    ) -> List[Pelicula]:
+        """
+        Obtiene peliculas completas como objetos tipados.
+        
+        El cursor devuelve RawBSONDocument y cada documento se convierte
+        directamente a Pelicula, sin mantener el dict intermedio.
+        
+        Args:
+            filtro: Filtro de MongoDB (todas si es None)
+            limite: Maximo de documentos (0 = sin limite)
+            
+        Returns:
+            Lista de Pelicula
+        """
+        coleccion_raw = self.collection.with_options(
+            codec_options=CodecOptions(document_class=RawBSONDocument)
+        )
+        self._registrar_ruta("obtener_peliculas", filtro or {})
+        cursor = coleccion_raw.find(filtro or {}).limit(limite)
+        return [Pelicula.desde_bson(doc) for doc in cursor]
     
-    def buscar_por_titulo(self, titulo: str) -> List[Dict]:
+    def _buscar(
+        self,
+        operacion: str,
+        filtro: Dict[str, Any],
+        proyeccion: Dict[str, Any],
+        limite: int = 0,
+        orden: Optional[List[tuple]] = None,
+        incluir_archivo: bool = False
+    ) -> List[Dict]:
+        """
+        find sobre la coleccion principal con respaldo en el archivo.
+        
+        El archivo solo se consulta si se pide con incluir_archivo o si
+        la coleccion principal no devuelve nada; en el primer caso se
+        completa hasta el limite con peliculas archivadas (respetando el
+        orden pedido). Una pelicula presente en ambos niveles (caida entre
+        la copia y el borrado, o recarga de datos) se devuelve una sola vez.
+        La coleccion principal se lee de la replica local si esta vigente.
+        """
+        # id identifica la pelicula en ambos niveles; si la proyeccion no
+        # lo incluye se pide y se quita al final
+        añadir_id = self.archivo is not None and any(
+            v for k, v in proyeccion.items() if k != "_id"
+        ) and not proyeccion.get("id")
+        if añadir_id:
+            proyeccion = {**proyeccion, "id": 1}
+        
+        resultados = self._leer_local(filtro, proyeccion, limite, orden)
+        if resultados is None:
+            self._registrar_ruta(operacion, filtro)
+            cursor = self.collection.find(filtro, proyeccion).limit(limite)
+            if orden:
+                cursor = cursor.sort(orden)
+            resultados = list(cursor)
+        
+        if (self.archivo is None or (resultados and not incluir_archivo)
+                or (limite and len(resultados) >= limite)):
+            return _sin_id(resultados) if añadir_id else resultados
+        
+        # Se piden hasta `limite` archivadas: las duplicadas se descartan
+        # antes de recortar
+        vistas = {p["id"] for p in resultados if p.get("id") is not None}
+        archivadas = [
+            p for p in self.archivo.buscar_peliculas(filtro, proyeccion, limite, orden)
+            if p.get("id") is None or p["id"] not in vistas
+        ]
+        if archivadas:
+            resultados += archivadas
+            # Como en MongoDB, los campos ausentes o nulos van primero en
+            # orden ascendente y al final en descendente
+            for campo, direccion in reversed(orden or []):
+                resultados.sort(key=lambda p: (p.get(campo) is not None, p.get(campo)), reverse=direccion < 0)
+            if limite:
+                resultados = resultados[:limite]
+        return _sin_id(resultados) if añadir_id else resultados
+    
+    def buscar_por_titulo(self, titulo: str, limite: int = 0, incluir_archivo: bool = False) -> List[Dict]:
         """Busca peliculas que contengan el texto en el titulo."""
-        return list(self.collection.find(
+        return self._buscar(
+            "buscar_por_titulo",
             {"titulo": {"$regex": titulo, "$options": "i"}},
-            {"_id": 0, "titulo": 1, "año": 1, "director": 1, "rating": 1}
-        ))
+            {"_id": 0, "titulo": 1, "año": 1, "director": 1, "rating": 1},
+            limite,
+            incluir_archivo=incluir_archivo
+        )
     
-    def buscar_por_genero(self, genero: str) -> List[Dict]:
+    def buscar_por_genero(self, genero: str, limite: int = 0, incluir_archivo: bool = False) -> List[Dict]:
         """Busca peliculas por genero."""
-        return list(self.collection.find(
+        return self._buscar(
+            "buscar_por_genero",
             {"generos": genero},
-            {"_id": 0, "titulo": 1, "año": 1, "generos": 1, "rating": 1}
-        ))
+            {"_id": 0, "titulo": 1, "año": 1, "generos": 1, "rating": 1},
+            limite,
+            incluir_archivo=incluir_archivo
+        )
     
-    def buscar_por_director(self, director: str) -> List[Dict]:
+    def buscar_por_director(self, director: str, limite: int = 0, incluir_archivo: bool = False) -> List[Dict]:
         """Busca peliculas por director."""
-        return list(self.collection.find(
+        return self._buscar(
+            "buscar_por_director",
             {"director": {"$regex": director, "$options": "i"}},
-            {"_id": 0, "titulo": 1, "año": 1, "director": 1, "rating": 1}
-        ))
+            {"_id": 0, "titulo": 1, "año": 1, "director": 1, "rating": 1},
+            limite,
+            incluir_archivo=incluir_archivo
+        )
+    
+    def buscar_por_actor(self, actor: str, limite: int = 0, incluir_archivo: bool = False) -> List[Dict]:
+        """Busca peliculas en las que participa un actor (nombre exacto)."""
+        return self._buscar(
+            "buscar_por_actor",
+            {"actores.nombre": actor},
+            {"_id": 0, "titulo": 1, "año": 1, "director": 1, "rating": 1, "actores.$": 1},
+            limite,
+            orden=[("año", -1)],
+            incluir_archivo=incluir_archivo
+        )
     
-    def buscar_por_rating_minimo(self, rating_min: float) -> List[Dict]:
+    def buscar_por_rating_minimo(self, rating_min: float, limite: int = 0, incluir_archivo: bool = False) -> List[Dict]:
         """Busca peliculas con rating mayor o igual al especificado."""
-        return list(self.collection.find(
+        return self._buscar(
+            "buscar_por_rating_minimo",
             {"rating": {"$gte": rating_min}},
-            {"_id": 0, "titulo": 1, "rating": 1, "director": 1}
-        ).sort("rating", -1))
+            {"_id": 0, "titulo": 1, "rating": 1, "director": 1},
+            limite,
+            orden=[("rating", -1)],
+            incluir_archivo=incluir_archivo
+        )
     
-    def buscar_por_palabra_clave(self, palabra: str) -> List[Dict]:
+    def obtener_reviews(self, titulo: str, limite: int = 0) -> List[Dict]:
+        """
+        Reviews de una pelicula, incluidas las archivadas.
+        
+        Args:
+            titulo: Titulo de la pelicula
+            limite: Maximo de reviews (0 = todas), de la mas reciente a la mas antigua
+            
+        Returns:
+            Lista de reviews
+        """
+        proyeccion = {"_id": 0, "id": 1, "reviews": 1}
+        locales = self._leer_local({"titulo": titulo}, proyeccion, 1)
+        if locales is not None:
+            pelicula = locales[0] if locales else None
+        else:
+            pelicula = self.collection.find_one(self._filtro_titulo(titulo), proyeccion)
+        if pelicula is None and self.archivo is not None:
+            archivadas = self.archivo.buscar_peliculas({"titulo": titulo}, proyeccion, 1)
+            pelicula = archivadas[0] if archivadas else None
+        if pelicula is None:
+            logger.warning("Pelicula '%s' no encontrada", titulo)
+            return []
+        
+        reviews = sorted(pelicula.get("reviews") or [], key=lambda r: r.get("fecha", ""), reverse=True)
+        if self.archivo is not None and (not limite or len(reviews) < limite):
+            restantes = limite - len(reviews) if limite else 0
+            reviews += self.archivo.reviews_archivadas(pelicula.get("id"), restantes)
+        return reviews[:limite] if limite else reviews
+    
+    def buscar_por_palabra_clave(self, palabra: str, limite: int = 0) -> List[Dict]:
         """Busca en titulo y comentarios de reviews."""
         return list(self.collection.find(
             {"$or": [
@@ -97,24 +530,93 @@ class CRUDOperations:
                 {"reviews.comentario": {"$regex": palabra, "$options": "i"}}
             ]},
             {"_id": 0, "titulo": 1, "reviews.comentario": 1, "rating": 1}
-        ))
+        ).limit(limite))
     
-    def busqueda_texto_completo(self, texto: str) -> List[Dict]:
+    def busqueda_texto_completo(self, texto: str, limite: int = 0) -> List[Dict]:
         """Realiza busqueda de texto completo usando indice."""
         return list(self.collection.find(
             {"$text": {"$search": texto}},
             {"_id": 0, "score": {"$meta": "textScore"}, "titulo": 1, "director": 1, "rating": 1}
-        ).sort([("score", {"$meta": "textScore"})]))
+        ).sort([("score", {"$meta": "textScore"})]).limit(limite))
+    
+    def busqueda_avanzada(
+        self,
+        titulo: Optional[str] = None,
+        generos: Optional[List[str]] = None,
+        director: Optional[str] = None,
+        año_inicio: Optional[int] = None,
+        año_fin: Optional[int] = None,
+        rating_min: Optional[float] = None,
+        disponible: Optional[bool] = None,
+        orden: str = "rating",
+        limite: int = 50,
+        incluir_archivo: bool = False
+    ) -> List[Dict]:
+        """
+        Busca combinando varios criterios en una sola consulta.
+        
+        Los criterios omitidos (None) no filtran. Se lee como el resto de
+        busquedas: replica local si esta vigente y archivo como respaldo.
+        
+        Args:
+            titulo: Texto contenido en el titulo
+            generos: Generos que debe tener la pelicula (todos)
+            director: Texto contenido en el nombre del director
+            año_inicio: Año minimo
+            año_fin: Año maximo
+            rating_min: Rating minimo
+            disponible: Filtrar por disponibilidad
+            orden: Campo de orden (titulo y director A-Z, el resto descendente)
+            limite: Maximo de resultados (0 = sin limite)
+            incluir_archivo: Si True, completa con peliculas archivadas
+            
+        Returns:
+            Lista de peliculas que cumplen todos los criterios
+        """
+        consulta = ConsultaPeliculas()
+        if titulo:
+            consulta.titulo(titulo)
+        if generos:
+            consulta.generos(*generos)
+        if director:
+            consulta.director(director)
+        if año_inicio is not None or año_fin is not None:
+            consulta.años(año_inicio, año_fin)
+        if rating_min is not None:
+            consulta.rating_minimo(rating_min)
+        if disponible is not None:
+            consulta.disponible(disponible)
+        consulta.ordenar(orden).limite(limite)
+        
+        argumentos = consulta.construir()
+        return self._buscar(
+            "busqueda_avanzada",
+            argumentos["filter"],
+            argumentos["projection"],
+            limite,
+            orden=argumentos.get("sort"),
+            incluir_archivo=incluir_archivo
+        )
     
     # ==================== UPDATE ====================
     
-    def actualizar_rating(self, titulo: str, nuevo_rating: float) -> bool:
+    def actualizar_rating(
+        self,
+        titulo: str,
+        nuevo_rating: float,
+        version: Optional[int] = None
+    ) -> bool:
         """
         Actualiza el rating de una pelicula.
         
+        Cada actualizacion incrementa el campo version. Si se indica
+        `version`, la escritura solo se aplica si la pelicula sigue en esa
+        version (compare-and-set).
+        
         Args:
             titulo: Titulo de la pelicula
             nuevo_rating: Nuevo valor de rating (0-10)
+            version: Version esperada (None para no comprobarla)
             
         Returns:
             True si se actualizo correctamente
@@ -123,18 +625,69 @@ class CRUDOperations:
             logger.error("Rating debe estar entre 0 y 10")
             return False
         
-        resultado = self.collection.update_one(
-            {"titulo": titulo},
-            {"$set": {"rating": nuevo_rating, "updatedAt": datetime.now()}}
+        filtro = self._filtro_titulo(titulo)
+        if version is not None:
+            filtro.update(_filtro_version(version))
+        
+        resultado = self._update_dirigido(
+            titulo,
+            filtro,
+            {
+                "$set": {"rating": nuevo_rating, "updatedAt": datetime.now()},
+                "$inc": {"version": 1}
+            }
         )
         
         if resultado.modified_count > 0:
-            logger.info(f"Rating de '{titulo}' actualizado a {nuevo_rating}")
+            logger.info("Rating de '%s' actualizado a %s", titulo, nuevo_rating, extra=MUESTREO)
+            self._notificar("rating", {"ratings": {titulo: nuevo_rating}})
             return True
         
-        logger.warning(f"Pelicula '{titulo}' no encontrada")
+        if version is not None:
+            logger.debug("Conflicto de version en '%s' (esperada %d)", titulo, version)
+        else:
+            logger.warning("Pelicula '%s' no encontrada", titulo)
         return False
     
+    def modificar_rating(
+        self,
+        titulo: str,
+        funcion: Callable[[float], float],
+        reintentos: int = 10
+    ) -> Optional[float]:
+        """
+        Lee, transforma y escribe el rating con control optimista.
+        
+        Si otra escritura cambia la pelicula entre la lectura y la
+        escritura, se vuelve a leer y se reintenta.
+        
+        Args:
+            titulo: Titulo de la pelicula
+            funcion: Calcula el nuevo rating a partir del actual
+            reintentos: Intentos maximos ante conflictos
+            
+        Returns:
+            Rating escrito, o None si no existe, el rating calculado esta
+            fuera de rango o se agotaron los reintentos
+        """
+        for intento in range(reintentos):
+            actual = self.collection.find_one(self._filtro_titulo(titulo), {"_id": 0, "rating": 1, "version": 1})
+            if actual is None:
+                logger.warning("Pelicula '%s' no encontrada", titulo)
+                return None
+            
+            nuevo = funcion(actual["rating"])
+            # Un valor invalido no es un conflicto: reintentar no lo corrige
+            if not 0 <= nuevo <= 10:
+                logger.error("Rating debe estar entre 0 y 10 (calculado %s para '%s')", nuevo, titulo)
+                return None
+            if self.actualizar_rating(titulo, nuevo, version=actual.get("version", 0)):
+                return nuevo
+            time.sleep(random.uniform(0, 0.005 * (intento + 1)))
+        
+        logger.error("Reintentos agotados al modificar el rating de '%s'", titulo)
+        return None
+    
     def añadir_review(
         self,
         titulo: str,
@@ -158,29 +711,84 @@ class CRUDOperations:
             logger.error("Puntuacion debe estar entre 1 y 10")
             return False
         
-        nueva_review = {
-            "usuario": usuario,
-            "puntuacion": puntuacion,
-            "comentario": comentario,
-            "fecha": datetime.now().strftime("%Y-%m-%d"),
-            "createdAt": datetime.now()
-        }
+        nueva_review = nueva_review_doc(usuario, puntuacion, comentario)
         
-        resultado = self.collection.update_one(
-            {"titulo": titulo},
+        resultado = self._update_dirigido(
+            titulo,
+            self._filtro_titulo(titulo),
             {
                 "$push": {"reviews": nueva_review},
-                "$set": {"updatedAt": datetime.now()}
+                "$set": {"updatedAt": datetime.now()},
+                "$inc": {"num_reviews": 1, "suma_puntuaciones": puntuacion, "version": 1}
             }
         )
         
         if resultado.modified_count > 0:
-            logger.info(f"Review añadida a '{titulo}' por {usuario}")
+            logger.info("Review añadida a '%s' por %s", titulo, usuario, extra=MUESTREO)
+            self._notificar("reviews", {"reviews": {titulo: [nueva_review]}})
             return True
         
-        logger.warning(f"Pelicula '{titulo}' no encontrada")
+        logger.warning("Pelicula '%s' no encontrada", titulo)
         return False
     
+    def añadir_reviews_lote(self, reviews_por_titulo: Dict[str, List[Dict[str, Any]]]) -> int:
+        """
+        Añade varias reviews agrupadas por pelicula en un solo bulk_write.
+        
+        Cada pelicula recibe un unico $push con $each. Si alguna
+        operacion falla se lanza BulkWriteError; las demas quedan
+        aplicadas y titulos_fallidos indica cuales reintentar.
+        
+        Args:
+            reviews_por_titulo: Titulo -> lista de subdocumentos de review
+            
+        Returns:
+            Numero de peliculas modificadas
+        """
+        if not reviews_por_titulo:
+            return 0
+        
+        ahora = datetime.now()
+        filtros = self._filtros_titulo(list(reviews_por_titulo))
+        operaciones = [
+            UpdateOne(
+                filtros[titulo],
+                {
+                    "$push": {"reviews": {"$each": reviews}},
+                    "$set": {"updatedAt": ahora},
+                    "$inc": {
+                        "num_reviews": len(reviews),
+                        "suma_puntuaciones": sum(r["puntuacion"] for r in reviews),
+                        "version": 1
+                    }
+                }
+            )
+            for titulo, reviews in reviews_por_titulo.items()
+        ]
+        try:
+            resultado = self.collection.bulk_write(operaciones, ordered=False)
+        except BulkWriteError as e:
+            # Las operaciones sin error ya estan aplicadas: se notifican y
+            # el llamante reintenta solo las fallidas (titulos_fallidos)
+            fallidos = titulos_fallidos(e, list(reviews_por_titulo))
+            aplicadas = {t: r for t, r in reviews_por_titulo.items() if t not in fallidos}
+            if aplicadas:
+                self._notificar("reviews", {"reviews": aplicadas})
+            raise
+        
+        if resultado.matched_count < len(operaciones):
+            logger.warning("%d peliculas del lote no encontradas", len(operaciones) - resultado.matched_count)
+            self._olvidar_claves(*reviews_por_titulo)
+            # Solo se notifican las que existen: los observadores crearian
+            # entradas para titulos inexistentes
+            existentes = {p["titulo"] for p in self.collection.find(
+                {"titulo": {"$in": list(reviews_por_titulo)}}, {"_id": 0, "titulo": 1}
+            )}
+            reviews_por_titulo = {t: r for t, r in reviews_por_titulo.items() if t in existentes}
+        if reviews_por_titulo:
+            self._notificar("reviews", {"reviews": reviews_por_titulo})
+        return resultado.modified_count
+    
     # ==================== DELETE ====================
     
     def eliminar_review(self, titulo: str, usuario: str) -> bool:
@@ -194,16 +802,35 @@ class CRUDOperations:
         Returns:
             True si se elimino correctamente
         """
-        resultado = self.collection.update_one(
-            {"titulo": titulo},
-            {
-                "$pull": {"reviews": {"usuario": usuario}},
-                "$set": {"updatedAt": datetime.now()}
-            }
+        # Update con pipeline: quitar las reviews y descontarlas de los
+        # contadores ocurre atomicamente sobre el mismo documento. Los
+        # contadores se decrementan (no se recalculan) porque tambien
+        # cuentan las reviews archivadas.
+        resultado = self._update_dirigido(
+            titulo,
+            {**self._filtro_titulo(titulo), "reviews.usuario": usuario},
+            [
+                {"$set": {"_quitadas": {"$filter": {
+                    "input": "$reviews",
+                    "cond": {"$eq": ["$$this.usuario", usuario]}
+                }}}},
+                {"$set": {
+                    "reviews": {"$filter": {
+                        "input": "$reviews",
+                        "cond": {"$ne": ["$$this.usuario", usuario]}
+                    }},
+                    "num_reviews": {"$subtract": ["$num_reviews", {"$size": "$_quitadas"}]},
+                    "suma_puntuaciones": {"$subtract": ["$suma_puntuaciones", {"$sum": "$_quitadas.puntuacion"}]},
+                    "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+                    "updatedAt": "$$NOW"
+                }},
+                {"$unset": "_quitadas"}
+            ]
         )
         
         if resultado.modified_count > 0:
-            logger.info(f"Review de '{usuario}' eliminada de '{titulo}'")
+            logger.info("Review de '%s' eliminada de '%s'", usuario, titulo, extra=MUESTREO)
+            self._notificar("eliminar_review", {"reviews": {titulo: [usuario]}})
             return True
         
         logger.warning("Review no encontrada")
@@ -219,11 +846,16 @@ class CRUDOperations:
         Returns:
             True si se elimino correctamente
         """
-        resultado = self.collection.delete_one({"titulo": titulo})
+        eliminada = self.collection.find_one_and_delete(self._filtro_titulo(titulo))
+        if eliminada is None and titulo in self._claves_por_titulo:
+            self._olvidar_claves(titulo)
+            eliminada = self.collection.find_one_and_delete(self._filtro_titulo(titulo))
+        self._olvidar_claves(titulo)
         
-        if resultado.deleted_count > 0:
-            logger.info(f"Pelicula '{titulo}' eliminada")
+        if eliminada is not None:
+            logger.info("Pelicula '%s' eliminada", titulo)
+            self._notificar("eliminar", {"peliculas": [eliminada]})
             return True
         
-        logger.warning(f"Pelicula '{titulo}' no encontrada")
+        logger.warning("Pelicula '%s' no encontrada", titulo)
         return False
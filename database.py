@@ -7,11 +7,26 @@ from pymongo.errors import PyMongoError
 from pymongo.collection import Collection
 from pymongo.database import Database
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 import uuid
 
-from config import MONGO_URI, DB_NAME, COLLECTION_NAME, logger
+from cambios import BusCambios
+from config import MONGO_URI, DB_NAME, COLLECTION_NAME, SHARD_KEY, CHANGE_TOKENS_COLLECTION, get_logger
 from models import PELICULAS_INICIALES, SCHEMA_VALIDATOR
+from sharding import CLAVES_SHARD
+
+logger = get_logger(__name__)
+
+# Indices simples de la coleccion de peliculas: (campos, nombre)
+INDICES_PELICULAS = [
+    ([("titulo", ASCENDING)], "idx_titulo"),
+    ([("año", DESCENDING)], "idx_año"),
+    ([("generos", ASCENDING)], "idx_generos"),
+    ([("rating", DESCENDING)], "idx_rating"),
+    ([("director", ASCENDING)], "idx_director"),
+    ([("reviews.usuario", ASCENDING)], "idx_reviews_usuario"),
+    ([("actores.nombre", ASCENDING)], "idx_actores"),
+]
 
 
 class DatabaseManager:
@@ -42,28 +57,37 @@ class DatabaseManager:
         self.client: Optional[MongoClient] = None
         self.db: Optional[Database] = None
         self.collection: Optional[Collection] = None
+        self.buses: List[BusCambios] = []
     
-    def conectar(self) -> bool:
+    def conectar(self, verificar: bool = True) -> bool:
         """
         Establece conexion con MongoDB.
         
+        Args:
+            verificar: Si True, hace ping al servidor. Si False, el
+                cliente no conecta hasta la primera operacion
+        
         Returns:
             True si la conexion fue exitosa
         """
         try:
-            self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
-            self.client.admin.command('ping')
+            self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000, connect=verificar)
+            if verificar:
+                self.client.admin.command('ping')
             self.db = self.client[self.db_name]
             self.collection = self.db[self.collection_name]
-            logger.info(f"Conectado a MongoDB: {self.uri}")
-            logger.info(f"Base de datos: {self.db_name} | Coleccion: {self.collection_name}")
+            logger.info("Conectado a MongoDB: %s", self.uri)
+            logger.info("Base de datos: %s | Coleccion: %s", self.db_name, self.collection_name)
             return True
         except PyMongoError as e:
-            logger.error(f"Error de conexion: {e}")
+            logger.error("Error de conexion: %s", e)
             return False
     
     def desconectar(self) -> None:
-        """Cierra la conexion a MongoDB."""
+        """Cierra la conexion a MongoDB (detiene antes los buses de cambios)."""
+        for bus in self.buses:
+            bus.detener()
+        self.buses = []
         if self.client:
             self.client.close()
             logger.info("Conexion cerrada")
@@ -94,9 +118,28 @@ class DatabaseManager:
         
         resultado = self.collection.insert_many(peliculas)
         count = len(resultado.inserted_ids)
-        logger.info(f"{count} peliculas insertadas")
+        logger.info("%d peliculas insertadas", count)
+        self.inicializar_contadores()
         return count
     
+    def inicializar_contadores(self) -> int:
+        """
+        Añade version y contadores de reviews a peliculas que no los tienen.
+        
+        Returns:
+            Numero de peliculas actualizadas
+        """
+        resultado = self.collection.update_many(
+            {"num_reviews": {"$exists": False}},
+            [{"$set": {
+                "version": {"$ifNull": ["$version", 0]},
+                "num_reviews": {"$size": {"$ifNull": ["$reviews", []]}},
+                "suma_puntuaciones": {"$sum": {"$ifNull": ["$reviews.puntuacion", []]}}
+            }}]
+        )
+        logger.info("Contadores inicializados en %d peliculas", resultado.modified_count)
+        return resultado.modified_count
+    
     def crear_indices(self) -> List[str]:
         """
         Crea indices para optimizar consultas.
@@ -104,22 +147,14 @@ class DatabaseManager:
         Returns:
             Lista de nombres de indices creados
         """
-        indices_config = [
-            ([("titulo", ASCENDING)], "idx_titulo"),
-            ([("año", DESCENDING)], "idx_año"),
-            ([("generos", ASCENDING)], "idx_generos"),
-            ([("rating", DESCENDING)], "idx_rating"),
-            ([("director", ASCENDING)], "idx_director"),
-        ]
-        
         indices_creados = []
         
-        for campos, nombre in indices_config:
+        for campos, nombre in INDICES_PELICULAS:
             try:
                 self.collection.create_index(campos, name=nombre)
                 indices_creados.append(nombre)
             except PyMongoError as e:
-                logger.warning(f"Indice {nombre}: {e}")
+                logger.warning("Indice %s: %s", nombre, e)
         
         # Indice de texto completo
         try:
@@ -132,7 +167,7 @@ class DatabaseManager:
         except PyMongoError:
             logger.warning("Indice de texto ya existe")
         
-        logger.info(f"Indices creados: {indices_creados}")
+        logger.info("Indices creados: %s", indices_creados)
         return indices_creados
     
     def aplicar_validacion(self) -> bool:
@@ -152,9 +187,70 @@ class DatabaseManager:
             logger.info("Validacion de esquema aplicada")
             return True
         except PyMongoError as e:
-            logger.error(f"Error en validacion: {e}")
+            logger.error("Error en validacion: %s", e)
             return False
     
+    def configurar_sharding(self, clave: str = SHARD_KEY) -> bool:
+        """
+        Habilita sharding en la base de datos y shardea la coleccion.
+        
+        Requiere conexion a un mongos. Crea antes el indice que respalda
+        la clave de shard.
+        
+        Args:
+            clave: Nombre de la clave en sharding.CLAVES_SHARD
+            
+        Returns:
+            True si la coleccion quedo shardeada
+        """
+        clave_shard = CLAVES_SHARD[clave]
+        try:
+            self.collection.create_index(list(clave_shard.items()), name="idx_shard")
+            self.client.admin.command("enableSharding", self.db_name)
+            self.client.admin.command(
+                "shardCollection",
+                f"{self.db_name}.{self.collection_name}",
+                key=clave_shard
+            )
+            logger.info("Coleccion shardeada con clave %s", clave_shard)
+            return True
+        except PyMongoError as e:
+            logger.error("Error al configurar sharding: %s", e)
+            return False
+    
+    def clave_shard(self) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve la clave de shard de la coleccion.
+        
+        Returns:
+            Clave de shard, o None si la coleccion no esta shardeada
+        """
+        try:
+            info = self.client.config.collections.find_one(
+                {"_id": f"{self.db_name}.{self.collection_name}"}, {"key": 1}
+            )
+        except PyMongoError:
+            return None
+        return dict(info["key"]) if info else None
+    
+    def bus_cambios(self, nombre: str = "peliculas", **opciones) -> BusCambios:
+        """
+        Crea un bus de eventos sobre el change stream de la coleccion.
+        
+        Los resume tokens se guardan en CHANGE_TOKENS_COLLECTION bajo el
+        nombre del bus. El bus se detiene al desconectar.
+        
+        Args:
+            nombre: Identificador del bus
+            **opciones: tamaño_lote, intervalo o workers de BusCambios
+            
+        Returns:
+            Bus sin iniciar
+        """
+        bus = BusCambios(self.collection, self.db[CHANGE_TOKENS_COLLECTION], nombre, **opciones)
+        self.buses.append(bus)
+        return bus
+    
     def listar_indices(self) -> List[dict]:
         """Lista todos los indices de la coleccion."""
         return list(self.collection.list_indexes())
@@ -0,0 +1,341 @@
+"""
+Exportacion de catalogos y reportes a CSV, JSONL o Parquet.
+
+Los documentos se leen del cursor y se escriben por chunks, de modo que
+la memoria usada no depende del tamaño de la coleccion. Las lecturas
+por filtro pueden repartirse en rangos de _id leidos en paralelo.
+"""
+
+import csv
+import json
+import os
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import bson
+from bson import ObjectId
+from pymongo.collection import Collection
+
+from config import EXPORT_CHUNK_SIZE, EXPORT_WORKERS, get_logger
+from partitioning import calcular_rangos, filtro_rango
+from queries import QueryOperations
+
+logger = get_logger(__name__)
+
+FORMATOS = ("csv", "jsonl", "parquet")
+
+# Origenes basados en find: (filtro, proyeccion, orden)
+_ORIGENES_FIND = {
+    "todas": ({}, {"_id": 0, "titulo": 1, "año": 1, "rating": 1, "director": 1}, [("rating", -1)]),
+    "filtro": ({}, {"_id": 0}, None),
+}
+
+# Origenes basados en agregacion: nombre del metodo de QueryOperations
+_ORIGENES_PIPELINE = {
+    "reviews": "pipeline_analisis_reviews",
+    "generos": "pipeline_estadisticas_por_genero",
+}
+
+ORIGENES = tuple(_ORIGENES_FIND) + tuple(_ORIGENES_PIPELINE)
+
+
+class ErrorExportacion(Exception):
+    """Los documentos no se pueden escribir en el formato pedido."""
+
+
+def _normalizar(valor: Any) -> Any:
+    """Convierte tipos BSON a tipos serializables."""
+    if isinstance(valor, ObjectId):
+        return str(valor)
+    if isinstance(valor, dict):
+        return {k: _normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_normalizar(v) for v in valor]
+    return valor
+
+
+class _EscritorJSONL:
+    """Escribe documentos como lineas JSON."""
+
+    def __init__(self, ruta: str):
+        self._f = open(ruta, "w", encoding="utf-8")
+
+    def escribir(self, chunk: List[Dict[str, Any]]) -> None:
+        self._f.writelines(
+            json.dumps(doc, ensure_ascii=False, default=str) + "\n" for doc in chunk
+        )
+
+    def cerrar(self) -> None:
+        self._f.close()
+
+
+class _EscritorDiferido:
+    """
+    Base de los formatos tabulares, cuyas columnas dependen de todos los documentos.
+
+    Los chunks se vuelcan a un fichero temporal BSON mientras se
+    acumulan las columnas; al cerrar se relee el temporal por chunks y se
+    escribe el fichero final, de modo que un campo ausente en el primer
+    documento no se pierde y la memoria sigue acotada a un chunk. BSON
+    conserva los tipos (fechas, enteros, decimales) con los que se
+    infirieron las columnas.
+    """
+
+    def __init__(self, ruta: str):
+        self._ruta = ruta
+        self._tamaño_chunk = 0
+        self._temporal = tempfile.TemporaryFile("w+b")
+
+    def escribir(self, chunk: List[Dict[str, Any]]) -> None:
+        self._tamaño_chunk = max(self._tamaño_chunk, len(chunk))
+        self._acumular(chunk)
+        self._temporal.writelines(bson.encode(doc) for doc in chunk)
+
+    def cerrar(self) -> None:
+        try:
+            self._temporal.seek(0)
+            self._volcar(_chunks(bson.decode_file_iter(self._temporal), self._tamaño_chunk or 1))
+        finally:
+            self._temporal.close()
+
+    def _acumular(self, chunk: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def _volcar(self, chunks: Iterator[List[Dict[str, Any]]]) -> None:
+        raise NotImplementedError
+
+
+class _EscritorCSV(_EscritorDiferido):
+    """Escribe documentos como CSV; los valores anidados se guardan en JSON."""
+
+    def __init__(self, ruta: str):
+        super().__init__(ruta)
+        # dict como conjunto ordenado: columnas en orden de aparicion
+        self._columnas: Dict[str, None] = {}
+
+    def _acumular(self, chunk: List[Dict[str, Any]]) -> None:
+        for doc in chunk:
+            self._columnas.update(dict.fromkeys(doc))
+
+    def _volcar(self, chunks: Iterator[List[Dict[str, Any]]]) -> None:
+        with open(self._ruta, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(self._columnas))
+            writer.writeheader()
+            for chunk in chunks:
+                writer.writerows(
+                    {k: json.dumps(v, ensure_ascii=False, default=str) if isinstance(v, (dict, list)) else v
+                     for k, v in doc.items()}
+                    for doc in chunk
+                )
+
+
+class _EscritorParquet(_EscritorDiferido):
+    """
+    Escribe documentos como row groups de Parquet (requiere pyarrow).
+
+    El esquema se unifica con el de cada chunk: las columnas nuevas se
+    añaden y los tipos nulos o distintos se promocionan.
+    """
+
+    def __init__(self, ruta: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        super().__init__(ruta)
+        self._pa = pa
+        self._pq = pq
+        self._esquema = None
+
+    def _acumular(self, chunk: List[Dict[str, Any]]) -> None:
+        # from_pylist solo toma las claves del primer documento
+        columnas: Dict[str, None] = {}
+        for doc in chunk:
+            columnas.update(dict.fromkeys(doc))
+        try:
+            esquema = self._pa.table({k: [doc.get(k) for doc in chunk] for k in columnas}).schema
+            if self._esquema is not None:
+                esquema = self._pa.unify_schemas([self._esquema, esquema], promote_options="permissive")
+        except self._pa.ArrowException as e:
+            raise ErrorExportacion(f"Columnas no convertibles a Parquet: {e}") from e
+        self._esquema = esquema
+
+    def _volcar(self, chunks: Iterator[List[Dict[str, Any]]]) -> None:
+        if self._esquema is None:
+            return
+        with self._pq.ParquetWriter(self._ruta, self._esquema) as writer:
+            for chunk in chunks:
+                try:
+                    tabla = self._pa.Table.from_pylist(chunk, schema=self._esquema)
+                except self._pa.ArrowException as e:
+                    raise ErrorExportacion(f"Documentos no convertibles a Parquet: {e}") from e
+                writer.write_table(tabla)
+
+
+_ESCRITORES = {
+    "csv": _EscritorCSV,
+    "jsonl": _EscritorJSONL,
+    "parquet": _EscritorParquet,
+}
+
+
+def _chunks(cursor: Iterable[Dict[str, Any]], tamaño: int) -> Iterator[List[Dict[str, Any]]]:
+    """Agrupa un cursor en listas de `tamaño` documentos normalizados."""
+    chunk = []
+    for doc in cursor:
+        chunk.append(_normalizar(doc))
+        if len(chunk) >= tamaño:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Exportador:
+    """
+    Exporta origenes de datos a fichero por chunks.
+
+    Origenes:
+        - todas: listado de obtener_todas
+        - reviews: analisis_reviews
+        - generos: estadisticas_por_genero
+        - filtro: documentos que cumplen un filtro arbitrario
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        tamaño_chunk: int = EXPORT_CHUNK_SIZE,
+        workers: int = EXPORT_WORKERS
+    ):
+        """
+        Inicializa el exportador.
+
+        Args:
+            collection: Coleccion de peliculas
+            tamaño_chunk: Documentos por chunk escrito
+            workers: Lectores paralelos para exportaciones particionadas
+        """
+        self.collection = collection
+        self.queries = QueryOperations(collection)
+        self.tamaño_chunk = tamaño_chunk
+        self.workers = workers
+
+    def exportar(
+        self,
+        origen: str,
+        ruta: str,
+        formato: Optional[str] = None,
+        filtro: Optional[Dict[str, Any]] = None,
+        paralelo: bool = False
+    ) -> int:
+        """
+        Exporta un origen a fichero.
+
+        Args:
+            origen: Uno de ORIGENES
+            ruta: Fichero de destino
+            formato: csv, jsonl o parquet (por defecto, la extension de ruta)
+            filtro: Filtro adicional para origenes basados en find
+            paralelo: Si True, lee rangos de _id en paralelo (no conserva el orden)
+
+        Returns:
+            Numero de documentos exportados
+        """
+        formato = (formato or os.path.splitext(ruta)[1].lstrip(".")).lower()
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+        if origen not in ORIGENES:
+            raise ValueError(f"Origen no soportado: {origen}")
+
+        inicio = datetime.now()
+        escritor = _ESCRITORES[formato](ruta)
+        total = 0
+        try:
+            for chunk in self._leer(origen, filtro, paralelo):
+                escritor.escribir(chunk)
+                total += len(chunk)
+        finally:
+            escritor.cerrar()
+
+        logger.info("Exportados %d documentos de '%s' a %s en %s",
+                    total, origen, ruta, datetime.now() - inicio)
+        return total
+
+    def _leer(
+        self,
+        origen: str,
+        filtro: Optional[Dict[str, Any]],
+        paralelo: bool
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Devuelve los chunks del origen indicado."""
+        if origen in _ORIGENES_PIPELINE:
+            pipeline = getattr(self.queries, _ORIGENES_PIPELINE[origen])()
+            if filtro:
+                pipeline = [{"$match": filtro}] + pipeline
+            cursor = self.collection.aggregate(pipeline, batchSize=self.tamaño_chunk)
+            return _chunks(cursor, self.tamaño_chunk)
+
+        filtro_base, proyeccion, orden = _ORIGENES_FIND[origen]
+        filtro_total = {**filtro_base, **(filtro or {})}
+
+        if paralelo and self.workers > 1:
+            return self._leer_particionado(filtro_total, proyeccion)
+
+        cursor = self.collection.find(filtro_total, proyeccion, batch_size=self.tamaño_chunk)
+        if orden:
+            cursor = cursor.sort(orden)
+        return _chunks(cursor, self.tamaño_chunk)
+
+    def _leer_particionado(
+        self,
+        filtro: Dict[str, Any],
+        proyeccion: Dict[str, Any]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lee rangos de _id en paralelo y entrega los chunks en un solo hilo.
+
+        La cola acotada limita los chunks en memoria a dos por lector.
+        """
+        rangos = calcular_rangos(self.collection, self.workers, "_id", filtro)
+        cola: "queue.Queue[Any]" = queue.Queue(maxsize=self.workers * 2)
+        cancelado = threading.Event()
+        fin = object()
+
+        def poner(item) -> bool:
+            while not cancelado.is_set():
+                try:
+                    cola.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def leer_rango(rango):
+            try:
+                cursor = self.collection.find(
+                    filtro_rango(rango, "_id", filtro), proyeccion, batch_size=self.tamaño_chunk
+                )
+                for chunk in _chunks(cursor, self.tamaño_chunk):
+                    if not poner(chunk):
+                        return
+            finally:
+                poner(fin)
+
+        with ThreadPoolExecutor(max_workers=len(rangos)) as pool:
+            futuros = [pool.submit(leer_rango, rango) for rango in rangos]
+            try:
+                pendientes = len(rangos)
+                while pendientes:
+                    item = cola.get()
+                    if item is fin:
+                        pendientes -= 1
+                    else:
+                        yield item
+            finally:
+                cancelado.set()
+            for futuro in futuros:
+                futuro.result()
@@ -0,0 +1,219 @@
+"""
+Conteos de facetas (genero, director, decada, idioma) para busquedas.
+
+Los conteos globales se guardan en una coleccion auxiliar y se
+actualizan con $inc a partir de los eventos de escritura de
+CRUDOperations, por lo que consultarlos no recorre las peliculas.
+"""
+
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.collection import Collection
+
+from config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _decada(p: Dict[str, Any]) -> List[Any]:
+    año = p.get("año")
+    return [año - año % 10] if isinstance(año, int) else []
+
+
+def _idioma(p: Dict[str, Any]) -> List[Any]:
+    idioma = (p.get("metadata") or {}).get("idioma_original")
+    return [idioma] if idioma else []
+
+
+# Tipo de faceta -> valores de una pelicula
+EXTRACTORES: Dict[str, Callable[[Dict[str, Any]], List[Any]]] = {
+    "genero": lambda p: list(set(p.get("generos") or [])),
+    "director": lambda p: [p["director"]] if p.get("director") else [],
+    "decada": _decada,
+    "idioma": _idioma,
+}
+
+# Tipo de faceta -> expresion de agrupacion en MongoDB
+_EXPRESIONES = {
+    "genero": "$generos",
+    "director": "$director",
+    "decada": {"$subtract": ["$año", {"$mod": ["$año", 10]}]},
+    "idioma": "$metadata.idioma_original",
+}
+
+
+def _rama_conteo(tipo: str) -> List[Dict[str, Any]]:
+    """Etapas que cuentan peliculas por valor de una faceta."""
+    etapas: List[Dict[str, Any]] = [{"$unwind": "$generos"}] if tipo == "genero" else []
+    etapas += [
+        {"$group": {"_id": _EXPRESIONES[tipo], "cantidad": {"$sum": 1}}},
+        {"$match": {"_id": {"$ne": None}}}
+    ]
+    return etapas
+
+
+class FacetService:
+    """
+    Servicio de facetas con conteos incrementales.
+    """
+
+    def __init__(self, collection: Collection, facetas: Collection):
+        """
+        Inicializa el servicio.
+
+        Args:
+            collection: Coleccion de peliculas
+            facetas: Coleccion donde se guardan los conteos
+        """
+        self.collection = collection
+        self.facetas = facetas
+
+    # ==================== MANTENIMIENTO ====================
+
+    def aplicar_evento(self, evento: str, datos: Dict[str, Any]) -> None:
+        """
+        Observador para CRUDOperations.registrar_observador.
+
+        Args:
+            evento: Nombre del evento de escritura
+            datos: Datos del evento
+        """
+        if evento == "insertar":
+            self._incrementar(datos["peliculas"], 1)
+        elif evento == "eliminar":
+            self._incrementar(datos["peliculas"], -1)
+
+    def _incrementar(self, peliculas: List[Dict[str, Any]], signo: int) -> None:
+        """Aplica los deltas de un grupo de peliculas en un solo bulk_write."""
+        deltas: Counter = Counter()
+        for p in peliculas:
+            for tipo, extraer in EXTRACTORES.items():
+                for valor in extraer(p):
+                    deltas[(tipo, valor)] += signo
+
+        operaciones = [
+            UpdateOne(
+                {"_id": f"{tipo}:{valor}"},
+                {"$inc": {"cantidad": delta}, "$setOnInsert": {"tipo": tipo, "valor": valor}},
+                upsert=True
+            )
+            for (tipo, valor), delta in deltas.items() if delta
+        ]
+        if not operaciones:
+            return
+
+        self.facetas.bulk_write(operaciones, ordered=False)
+        if signo < 0:
+            self.facetas.delete_many({"cantidad": {"$lte": 0}})
+
+    def reconstruir(self) -> int:
+        """
+        Recalcula todos los conteos desde la coleccion de peliculas.
+
+        Returns:
+            Numero de valores de faceta almacenados
+        """
+        pipeline = [{"$facet": {tipo: _rama_conteo(tipo) for tipo in _EXPRESIONES}}]
+        resultado = next(self.collection.aggregate(pipeline))
+
+        documentos = [
+            {"_id": f"{tipo}:{g['_id']}", "tipo": tipo, "valor": g["_id"], "cantidad": g["cantidad"]}
+            for tipo, grupos in resultado.items()
+            for g in grupos
+        ]
+
+        self.facetas.delete_many({})
+        if documentos:
+            self.facetas.insert_many(documentos)
+        self.facetas.create_index([("tipo", ASCENDING), ("cantidad", DESCENDING)], name="idx_tipo_cantidad")
+
+        logger.info("Facetas reconstruidas: %d valores", len(documentos))
+        return len(documentos)
+
+    # ==================== CONSULTA ====================
+
+    def conteos(self, tipo: str, limite: int = 0) -> List[Dict[str, Any]]:
+        """
+        Conteos globales de un tipo de faceta, de mayor a menor.
+
+        Args:
+            tipo: genero, director, decada o idioma
+            limite: Maximo de valores (0 = todos)
+
+        Returns:
+            Lista de {"valor", "cantidad"}
+        """
+        return list(self.facetas.find(
+            {"tipo": tipo},
+            {"_id": 0, "valor": 1, "cantidad": 1}
+        ).sort("cantidad", DESCENDING).limit(limite))
+
+    def filtro(
+        self,
+        generos: Optional[List[str]] = None,
+        decada: Optional[int] = None,
+        rating_min: Optional[float] = None,
+        director: Optional[str] = None,
+        idioma: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Construye el filtro de MongoDB para una seleccion de facetas."""
+        filtro: Dict[str, Any] = {}
+        if generos:
+            filtro["generos"] = {"$all": list(generos)}
+        if decada is not None:
+            filtro["año"] = {"$gte": decada, "$lt": decada + 10}
+        if rating_min is not None:
+            filtro["rating"] = {"$gte": rating_min}
+        if director:
+            filtro["director"] = director
+        if idioma:
+            filtro["metadata.idioma_original"] = idioma
+        return filtro
+
+    def buscar(
+        self,
+        generos: Optional[List[str]] = None,
+        decada: Optional[int] = None,
+        rating_min: Optional[float] = None,
+        director: Optional[str] = None,
+        idioma: Optional[str] = None,
+        limite: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Busqueda facetada: resultados y conteos dentro de la seleccion.
+
+        Sin filtros, los conteos salen directamente de la coleccion de
+        facetas. Con filtros, una sola agregacion $facet devuelve los
+        resultados y los conteos restringidos al subconjunto filtrado.
+
+        Returns:
+            {"total", "resultados", "facetas": {tipo: [{"valor", "cantidad"}]}}
+        """
+        filtro = self.filtro(generos, decada, rating_min, director, idioma)
+        proyeccion = {"_id": 0, "titulo": 1, "año": 1, "director": 1, "generos": 1, "rating": 1}
+
+        if not filtro:
+            return {
+                "total": self.collection.estimated_document_count(),
+                "resultados": list(self.collection.find({}, proyeccion).sort("rating", DESCENDING).limit(limite)),
+                "facetas": {tipo: self.conteos(tipo) for tipo in EXTRACTORES}
+            }
+
+        ramas: Dict[str, List[Dict[str, Any]]] = {
+            "total": [{"$count": "n"}],
+            "resultados": [{"$sort": {"rating": DESCENDING}}, {"$limit": limite}, {"$project": proyeccion}],
+        }
+        for tipo in _EXPRESIONES:
+            ramas[tipo] = _rama_conteo(tipo) + [
+                {"$sort": {"cantidad": DESCENDING}},
+                {"$project": {"_id": 0, "valor": "$_id", "cantidad": 1}}
+            ]
+
+        resultado = next(self.collection.aggregate([{"$match": filtro}, {"$facet": ramas}]))
+        return {
+            "total": resultado["total"][0]["n"] if resultado["total"] else 0,
+            "resultados": resultado["resultados"],
+            "facetas": {tipo: resultado[tipo] for tipo in EXTRACTORES}
+        }
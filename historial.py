@@ -0,0 +1,285 @@
+"""
+Historial de ratings y actividad de reviews en una coleccion time-series.
+
+Cada cambio de rating y cada review añadida o eliminada se guarda como
+una medida con metaField = id de la pelicula, de modo que MongoDB agrupa
+las medidas de cada pelicula en buckets por tiempo y las consultas por
+rango de fechas solo leen los buckets afectados.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo.collection import Collection
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from config import HISTORY_GRANULARITY, get_logger
+
+logger = get_logger(__name__)
+
+# Documentos por insert_many al importar el historial existente
+_TAMAÑO_LOTE = 1000
+
+
+def _rango_fechas(desde: Optional[datetime], hasta: Optional[datetime]) -> Dict[str, Any]:
+    rango: Dict[str, Any] = {}
+    if desde is not None:
+        rango["$gte"] = desde
+    if hasta is not None:
+        rango["$lt"] = hasta
+    return rango
+
+
+class HistorialService:
+    """
+    Registro y consulta del historial de ratings y reviews.
+    """
+
+    def __init__(self, collection: Collection, historial: Collection):
+        """
+        Inicializa el servicio.
+
+        Args:
+            collection: Coleccion de peliculas
+            historial: Coleccion time-series del historial
+        """
+        self.collection = collection
+        self.historial = historial
+        self._ids: Dict[str, str] = {}
+
+    def crear_coleccion(self, granularidad: str = HISTORY_GRANULARITY) -> bool:
+        """
+        Crea la coleccion time-series si no existe.
+
+        Args:
+            granularidad: seconds, minutes u hours
+
+        Returns:
+            True si se creo la coleccion
+        """
+        try:
+            self.historial.database.create_collection(
+                self.historial.name,
+                timeseries={"timeField": "ts", "metaField": "pelicula", "granularity": granularidad}
+            )
+        except CollectionInvalid:
+            return False
+        except OperationFailure as e:
+            logger.error("Error al crear la coleccion time-series: %s", e)
+            return False
+        logger.info("Coleccion time-series '%s' creada", self.historial.name)
+        return True
+
+    # ==================== REGISTRO ====================
+
+    def aplicar_evento(self, evento: str, datos: Dict[str, Any]) -> None:
+        """
+        Observador para CRUDOperations.registrar_observador.
+
+        archivar_reviews se ignora: las reviews archivadas siguen en el
+        historial.
+
+        Args:
+            evento: Nombre del evento de escritura
+            datos: Datos del evento
+        """
+        ahora = datetime.now()
+        if evento == "insertar":
+            for p in datos["peliculas"]:
+                self._ids[p["titulo"]] = p["id"]
+            self._registrar(
+                {"ts": ahora, "pelicula": p["id"], "tipo": "rating", "rating": p["rating"]}
+                for p in datos["peliculas"] if "rating" in p
+            )
+        elif evento == "eliminar":
+            for p in datos["peliculas"]:
+                self._ids.pop(p["titulo"], None)
+        elif evento == "rating":
+            ids = self._resolver(datos["ratings"])
+            self._registrar(
+                {"ts": ahora, "pelicula": ids[titulo], "tipo": "rating", "rating": rating}
+                for titulo, rating in datos["ratings"].items() if titulo in ids
+            )
+        elif evento == "reviews":
+            ids = self._resolver(datos["reviews"])
+            self._registrar(
+                {
+                    "ts": r.get("createdAt", ahora),
+                    "pelicula": ids[titulo],
+                    "tipo": "review",
+                    "usuario": r["usuario"],
+                    "puntuacion": r["puntuacion"]
+                }
+                for titulo, reviews in datos["reviews"].items() if titulo in ids
+                for r in reviews
+            )
+        elif evento == "eliminar_review":
+            ids = self._resolver(datos["reviews"])
+            self._registrar(
+                {"ts": ahora, "pelicula": ids[titulo], "tipo": "review_eliminada", "usuario": usuario}
+                for titulo, usuarios in datos["reviews"].items() if titulo in ids
+                for usuario in usuarios
+            )
+
+    def _resolver(self, titulos: Iterable[str]) -> Dict[str, str]:
+        """Titulo -> id de pelicula, consultando solo los no cacheados."""
+        titulos = list(titulos)
+        pendientes = [t for t in titulos if t not in self._ids]
+        if pendientes:
+            for p in self.collection.find({"titulo": {"$in": pendientes}}, {"_id": 0, "titulo": 1, "id": 1}):
+                self._ids[p["titulo"]] = p["id"]
+        return {t: self._ids[t] for t in titulos if t in self._ids}
+
+    def _registrar(self, medidas: Iterable[Dict[str, Any]]) -> int:
+        """Inserta medidas en el historial."""
+        medidas = list(medidas)
+        if medidas:
+            self.historial.insert_many(medidas, ordered=False)
+        return len(medidas)
+
+    def importar_existentes(self) -> int:
+        """
+        Vuelca al historial el rating actual y las reviews ya guardadas.
+
+        Pensado para ejecutarse una vez tras crear la coleccion (ver
+        reconstruir); las reviews sin createdAt usan su campo fecha.
+
+        Returns:
+            Numero de medidas insertadas
+        """
+        pipeline = [
+            {"$unwind": "$reviews"},
+            {"$project": {
+                "_id": 0,
+                "ts": {"$ifNull": [
+                    "$reviews.createdAt",
+                    {"$dateFromString": {"dateString": "$reviews.fecha", "onError": "$$NOW"}}
+                ]},
+                "pelicula": "$id",
+                "tipo": "review",
+                "usuario": "$reviews.usuario",
+                "puntuacion": "$reviews.puntuacion"
+            }}
+        ]
+        ahora = datetime.now()
+        total = self._registrar(
+            {"ts": p.get("updatedAt", ahora), "pelicula": p["id"], "tipo": "rating", "rating": p["rating"]}
+            for p in self.collection.find({"id": {"$exists": True}}, {"_id": 0, "id": 1, "rating": 1, "updatedAt": 1})
+        )
+
+        lote: List[Dict[str, Any]] = []
+        for medida in self.collection.aggregate(pipeline):
+            lote.append(medida)
+            if len(lote) >= _TAMAÑO_LOTE:
+                total += self._registrar(lote)
+                lote = []
+        total += self._registrar(lote)
+
+        logger.info("%d medidas importadas al historial", total)
+        return total
+
+    def reconstruir(self, granularidad: str = HISTORY_GRANULARITY) -> int:
+        """
+        Vacia el historial y lo importa de nuevo desde las peliculas.
+
+        Debe llamarse tras recargar los datos iniciales: inicializar_datos
+        genera ids nuevos, y las medidas anteriores quedarian apuntando a
+        peliculas que ya no existen.
+
+        Returns:
+            Numero de medidas importadas
+        """
+        self.historial.drop()
+        self._ids.clear()
+        self.crear_coleccion(granularidad)
+        return self.importar_existentes()
+
+    # ==================== CONSULTA ====================
+
+    def rating_en_el_tiempo(
+        self,
+        titulo: str,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        unidad: str = "day"
+    ) -> List[Dict[str, Any]]:
+        """
+        Evolucion del rating de una pelicula.
+
+        Args:
+            titulo: Titulo de la pelicula
+            desde: Inicio del rango (incluido)
+            hasta: Fin del rango (excluido)
+            unidad: Tamaño del intervalo (hour, day, week, month...)
+
+        Returns:
+            Lista de {"fecha", "rating", "minimo", "maximo", "cambios"}
+            donde rating es el ultimo valor del intervalo
+        """
+        ids = self._resolver([titulo])
+        if titulo not in ids:
+            logger.warning("Pelicula '%s' no encontrada", titulo)
+            return []
+
+        filtro: Dict[str, Any] = {"pelicula": ids[titulo], "tipo": "rating"}
+        rango = _rango_fechas(desde, hasta)
+        if rango:
+            filtro["ts"] = rango
+
+        pipeline = [
+            {"$match": filtro},
+            {"$sort": {"ts": 1}},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": "$ts", "unit": unidad}},
+                "rating": {"$last": "$rating"},
+                "minimo": {"$min": "$rating"},
+                "maximo": {"$max": "$rating"},
+                "cambios": {"$sum": 1}
+            }},
+            {"$sort": {"_id": 1}},
+            {"$project": {"_id": 0, "fecha": "$_id", "rating": 1, "minimo": 1, "maximo": 1, "cambios": 1}}
+        ]
+        return list(self.historial.aggregate(pipeline))
+
+    def reviews_por_dia(
+        self,
+        dias: int = 30,
+        titulo: Optional[str] = None,
+        hasta: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Reviews añadidas por dia en una ventana de tiempo.
+
+        Args:
+            dias: Tamaño de la ventana en dias
+            titulo: Restringir a una pelicula (None = todas)
+            hasta: Fin de la ventana (por defecto, ahora)
+
+        Returns:
+            Lista de {"fecha", "cantidad", "puntuacion_media"}
+        """
+        hasta = hasta or datetime.now()
+        filtro: Dict[str, Any] = {"tipo": "review", "ts": _rango_fechas(hasta - timedelta(days=dias), hasta)}
+        if titulo is not None:
+            ids = self._resolver([titulo])
+            if titulo not in ids:
+                logger.warning("Pelicula '%s' no encontrada", titulo)
+                return []
+            filtro["pelicula"] = ids[titulo]
+
+        pipeline = [
+            {"$match": filtro},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": "$ts", "unit": "day"}},
+                "cantidad": {"$sum": 1},
+                "puntuacion_media": {"$avg": "$puntuacion"}
+            }},
+            {"$sort": {"_id": 1}},
+            {"$project": {
+                "_id": 0,
+                "fecha": "$_id",
+                "cantidad": 1,
+                "puntuacion_media": {"$round": ["$puntuacion_media", 2]}
+            }}
+        ]
+        return list(self.historial.aggregate(pipeline))
@@ -6,16 +6,38 @@ Asignatura: MD003 - Estructuras de datos y su almacenamiento
 Universidad: La Salle - Ramon Llull
 
 Punto de entrada principal del sistema.
+
+Uso:
+    python main.py                 Demostraciones y menu opcional
+    python main.py --menu          Menu interactivo directamente
+    python main.py --inicializar   Recarga datos, indices y validacion
 """
 
-from database import DatabaseManager
-from crud import CRUDOperations
-from queries import QueryOperations
-from cli import CLI
-from config import logger
+import argparse
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from config import (
+    ACTORS_COLLECTION,
+    ARCHIVE_MOVIES_COLLECTION,
+    ARCHIVE_REVIEWS_COLLECTION,
+    FACETS_COLLECTION,
+    FUZZY_COLLECTION,
+    HISTORY_COLLECTION,
+    REPLICA_ENABLED,
+    USER_REVIEWS_COLLECTION,
+    logger,
+)
+
+# pymongo y los modulos de datos se importan dentro de las funciones para
+# que el arranque no pague su coste hasta que se usan
+if TYPE_CHECKING:
+    from crud import CRUDOperations
+    from database import DatabaseManager
+    from queries import QueryOperations
+    from replica import ReplicaLocal
 
 
-def demo_crud(crud: CRUDOperations) -> None:
+def demo_crud(crud: "CRUDOperations") -> None:
     """Demuestra operaciones CRUD."""
     print("\n" + "=" * 60)
     print("DEMOSTRACION: Operaciones CRUD")
@@ -35,7 +57,7 @@ def demo_crud(crud: CRUDOperations) -> None:
         print(f"  {p['titulo']} ({p['año']})")
     
     print("\n--- Busqueda por genero 'Drama' (primeros 3) ---")
-    for p in crud.buscar_por_genero("Drama")[:3]:
+    for p in crud.buscar_por_genero("Drama", limite=3):
         print(f"  {p['titulo']} ({p['año']})")
     
     print("\n--- Busqueda por director 'Nolan' ---")
@@ -47,7 +69,7 @@ def demo_crud(crud: CRUDOperations) -> None:
         print(f"  {p['titulo']} - Rating: {p['rating']}")
 
 
-def demo_consultas(queries: QueryOperations) -> None:
+def demo_consultas(queries: "QueryOperations") -> None:
     """Demuestra consultas avanzadas."""
     print("\n" + "=" * 60)
     print("DEMOSTRACION: Consultas Avanzadas")
@@ -66,7 +88,7 @@ def demo_consultas(queries: QueryOperations) -> None:
         print(f"  {d['director']}: {d['cantidad']} peliculas")
 
 
-def demo_agregaciones(queries: QueryOperations) -> None:
+def demo_agregaciones(queries: "QueryOperations") -> None:
     """Demuestra agregaciones."""
     print("\n" + "=" * 60)
     print("DEMOSTRACION: Agregaciones")
@@ -81,11 +103,12 @@ def demo_agregaciones(queries: QueryOperations) -> None:
         print(f"  {p['titulo']}: {p['num_reviews']} reviews (prom: {p['promedio_puntuacion']})")
     
     print("\n--- Reporte por decada ---")
-    for d in queries.reporte_por_decada():
-        print(f"  {d['decada']}: {d['cantidad']} peliculas (rating prom: {d['rating_promedio']})")
+    for d in queries.resumen_por_decada(top_k=1):
+        mejor = d['top'][0]['titulo'] if d['top'] else '-'
+        print(f"  {d['decada']}: {d['cantidad']} peliculas (rating prom: {d['rating_promedio']}) - Mejor: {mejor}")
 
 
-def demo_bonus(db_manager: DatabaseManager, crud: CRUDOperations) -> None:
+def demo_bonus(db_manager: "DatabaseManager", crud: "CRUDOperations") -> None:
     """Demuestra funcionalidades bonus."""
     print("\n" + "=" * 60)
     print("DEMOSTRACION: Funcionalidades Bonus")
@@ -133,46 +156,147 @@ Bonus (10 pts extra)
     """)
 
 
-def main():
+def configurar_base_datos(db_manager: "DatabaseManager") -> None:
+    """Carga los datos iniciales y crea indices, validacion y colecciones auxiliares."""
+    from actores import ActorService
+    from archivo import ArchivoService
+    from busqueda import BusquedaDifusa
+    from facets import FacetService
+    from historial import HistorialService
+    from reviews_usuario import ReviewsUsuarioService
+    
+    db_manager.inicializar_datos()
+    db_manager.crear_indices()
+    db_manager.aplicar_validacion()
+    ArchivoService(
+        db_manager.collection,
+        db_manager.db[ARCHIVE_MOVIES_COLLECTION],
+        db_manager.db[ARCHIVE_REVIEWS_COLLECTION]
+    ).crear_colecciones()
+    FacetService(db_manager.collection, db_manager.db[FACETS_COLLECTION]).reconstruir()
+    HistorialService(db_manager.collection, db_manager.db[HISTORY_COLLECTION]).reconstruir()
+    ReviewsUsuarioService(db_manager.collection, db_manager.db[USER_REVIEWS_COLLECTION]).reconstruir()
+    ActorService(db_manager.collection, db_manager.db[ACTORS_COLLECTION]).reconstruir()
+    BusquedaDifusa(db_manager.collection, db_manager.db[FUZZY_COLLECTION]).reconstruir()
+
+
+def crear_servicios(
+    db_manager: "DatabaseManager",
+    replica: Optional["ReplicaLocal"] = None
+) -> Dict[str, Any]:
+    """
+    Crea las operaciones CRUD y de consulta y los servicios auxiliares.
+    
+    Los servicios quedan registrados como observadores de crud, que los
+    mantiene al dia con cada escritura.
+    
+    Returns:
+        Diccionario con crud, queries, facetas, historial,
+        reviews_usuario, actores y busqueda
+    """
+    from actores import ActorService
+    from archivo import ArchivoService
+    from busqueda import BusquedaDifusa
+    from crud import CRUDOperations
+    from facets import FacetService
+    from historial import HistorialService
+    from queries import QueryOperations
+    from reviews_usuario import ReviewsUsuarioService
+    
+    archivo = ArchivoService(
+        db_manager.collection,
+        db_manager.db[ARCHIVE_MOVIES_COLLECTION],
+        db_manager.db[ARCHIVE_REVIEWS_COLLECTION]
+    )
+    crud = CRUDOperations(db_manager.collection, db_manager.clave_shard(), archivo, replica)
+    
+    # Indices auxiliares mantenidos con cada escritura
+    servicios: Dict[str, Any] = {
+        "facetas": FacetService(db_manager.collection, db_manager.db[FACETS_COLLECTION]),
+        "historial": HistorialService(db_manager.collection, db_manager.db[HISTORY_COLLECTION]),
+        "reviews_usuario": ReviewsUsuarioService(db_manager.collection, db_manager.db[USER_REVIEWS_COLLECTION]),
+        "actores": ActorService(db_manager.collection, db_manager.db[ACTORS_COLLECTION]),
+        "busqueda": BusquedaDifusa(db_manager.collection, db_manager.db[FUZZY_COLLECTION]),
+    }
+    for servicio in servicios.values():
+        crud.registrar_observador(servicio.aplicar_evento)
+    
+    return {"crud": crud, "queries": QueryOperations(db_manager.collection), **servicios}
+
+
+def crear_operaciones(
+    db_manager: "DatabaseManager",
+    replica: Optional["ReplicaLocal"] = None
+) -> Tuple["CRUDOperations", "QueryOperations"]:
+    """Crea las operaciones CRUD y de consulta con sus observadores."""
+    servicios = crear_servicios(db_manager, replica)
+    return servicios["crud"], servicios["queries"]
+
+
+def parsear_argumentos(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Argumentos de linea de comandos."""
+    parser = argparse.ArgumentParser(description="Sistema de gestion de peliculas con MongoDB")
+    parser.add_argument(
+        "--inicializar", action="store_true",
+        help="recarga los datos iniciales y crea indices, validacion y colecciones auxiliares"
+    )
+    parser.add_argument("--menu", action="store_true", help="abre el menu interactivo sin demostraciones")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
     """Funcion principal del programa."""
+    args = parsear_argumentos(argv)
+    
     print("\n" + "=" * 60)
     print("SISTEMA DE GESTION DE PELICULAS CON MONGODB")
     print("Autor: Paulina Peralta y Katherine Soto | MD003 - La Salle")
     print("=" * 60)
     
-    # Inicializar gestor de base de datos
-    db_manager = DatabaseManager()
+    from database import DatabaseManager
+    from pymongo.errors import PyMongoError
     
-    if not db_manager.conectar():
-        logger.error("No se pudo conectar a MongoDB")
-        return
+    # La conexion se establece con la primera operacion
+    db_manager = DatabaseManager()
+    db_manager.conectar(verificar=False)
+    replica = None
     
     try:
-        # Configuracion inicial
-        db_manager.inicializar_datos()
-        db_manager.crear_indices()
-        db_manager.aplicar_validacion()
+        # Configuracion inicial solo si se pide o la coleccion esta vacia
+        if args.inicializar or db_manager.collection.estimated_document_count() == 0:
+            configurar_base_datos(db_manager)
         
-        # Crear operaciones
-        crud = CRUDOperations(db_manager.collection)
-        queries = QueryOperations(db_manager.collection)
+        if REPLICA_ENABLED:
+            from replica import ReplicaLocal
+            replica = ReplicaLocal(db_manager.collection)
+            replica.iniciar()
         
-        # Ejecutar demostraciones
-        demo_crud(crud)
-        demo_consultas(queries)
-        demo_agregaciones(queries)
-        demo_bonus(db_manager, crud)
+        crud, queries = crear_operaciones(db_manager, replica)
         
-        # Resumen
-        imprimir_resumen()
+        if not args.menu:
+            # Ejecutar demostraciones
+            demo_crud(crud)
+            demo_consultas(queries)
+            demo_agregaciones(queries)
+            demo_bonus(db_manager, crud)
+            
+            # Resumen
+            imprimir_resumen()
+            
+            # Preguntar si ejecutar CLI
+            respuesta = input("\nDesea ejecutar el menu interactivo? (y/n): ").strip().lower()
+            if respuesta != 'y':
+                return
         
-        # Preguntar si ejecutar CLI
-        respuesta = input("\nDesea ejecutar el menu interactivo? (y/n): ").strip().lower()
-        if respuesta == 'y':
-            cli = CLI(crud, queries)
-            cli.ejecutar()
+        from cli import CLI
+        CLI(crud, queries).ejecutar()
+    
+    except PyMongoError as e:
+        logger.error("Error de MongoDB: %s", e)
     
     finally:
+        if replica is not None:
+            replica.detener()
         db_manager.desconectar()
 
 
@@ -2,7 +2,11 @@
 Modelos de datos y esquema de validacion para peliculas.
 """
 
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Mapping, Optional, Tuple, Union
+
+import bson
+from bson.raw_bson import RawBSONDocument
 
 
 PELICULAS_INICIALES: List[Dict[str, Any]] = [
@@ -258,6 +262,9 @@ SCHEMA_VALIDATOR: Dict[str, Any] = {
                 }
             },
             "disponible": {"bsonType": "bool"},
+            "version": {"bsonType": ["int", "long"], "minimum": 0},
+            "num_reviews": {"bsonType": ["int", "long"], "minimum": 0},
+            "suma_puntuaciones": {"bsonType": ["int", "long"], "minimum": 0},
             "metadata": {
                 "bsonType": "object",
                 "properties": {
@@ -269,3 +276,250 @@ SCHEMA_VALIDATOR: Dict[str, Any] = {
         }
     }
 }
+
+
+# ==================== MODELOS TIPADOS ====================
+#
+# Representaciones compactas con __slots__: sin __dict__ por instancia y
+# con listas almacenadas como tuplas. Se construyen desde documentos de
+# MongoDB (dict, RawBSONDocument o bytes BSON) y se vuelven a convertir
+# a dict/BSON para escribir.
+
+
+class Actor:
+    """Actor de una pelicula."""
+    
+    __slots__ = ("nombre", "rol")
+    
+    def __init__(self, nombre: str, rol: str):
+        self.nombre = nombre
+        self.rol = rol
+    
+    @classmethod
+    def desde_dict(cls, doc: Mapping[str, Any]) -> "Actor":
+        """Crea un actor desde un subdocumento."""
+        return cls(doc["nombre"], doc["rol"])
+    
+    def a_dict(self) -> Dict[str, Any]:
+        """Convierte el actor a subdocumento."""
+        return {"nombre": self.nombre, "rol": self.rol}
+    
+    def __repr__(self) -> str:
+        return f"Actor({self.nombre!r}, {self.rol!r})"
+
+
+class Review:
+    """Review de un usuario sobre una pelicula."""
+    
+    __slots__ = ("usuario", "puntuacion", "comentario", "fecha", "createdAt")
+    
+    def __init__(
+        self,
+        usuario: str,
+        puntuacion: int,
+        comentario: str,
+        fecha: str,
+        createdAt: Optional[datetime] = None
+    ):
+        self.usuario = usuario
+        self.puntuacion = puntuacion
+        self.comentario = comentario
+        self.fecha = fecha
+        self.createdAt = createdAt
+    
+    @classmethod
+    def desde_dict(cls, doc: Mapping[str, Any]) -> "Review":
+        """Crea una review desde un subdocumento."""
+        return cls(
+            doc["usuario"],
+            doc["puntuacion"],
+            doc["comentario"],
+            doc["fecha"],
+            doc.get("createdAt")
+        )
+    
+    def a_dict(self) -> Dict[str, Any]:
+        """Convierte la review a subdocumento."""
+        doc = {
+            "usuario": self.usuario,
+            "puntuacion": self.puntuacion,
+            "comentario": self.comentario,
+            "fecha": self.fecha
+        }
+        if self.createdAt is not None:
+            doc["createdAt"] = self.createdAt
+        return doc
+    
+    def __repr__(self) -> str:
+        return f"Review({self.usuario!r}, {self.puntuacion})"
+
+
+class Metadata:
+    """Metadatos tecnicos de una pelicula."""
+    
+    __slots__ = ("duracion_minutos", "idioma_original", "presupuesto")
+    
+    def __init__(
+        self,
+        duracion_minutos: Optional[int] = None,
+        idioma_original: Optional[str] = None,
+        presupuesto: Optional[int] = None
+    ):
+        self.duracion_minutos = duracion_minutos
+        self.idioma_original = idioma_original
+        self.presupuesto = presupuesto
+    
+    @classmethod
+    def desde_dict(cls, doc: Mapping[str, Any]) -> "Metadata":
+        """Crea los metadatos desde un subdocumento."""
+        return cls(
+            doc.get("duracion_minutos"),
+            doc.get("idioma_original"),
+            doc.get("presupuesto")
+        )
+    
+    def a_dict(self) -> Dict[str, Any]:
+        """Convierte los metadatos a subdocumento (omite campos vacios)."""
+        return {
+            campo: valor
+            for campo in self.__slots__
+            if (valor := getattr(self, campo)) is not None
+        }
+    
+    def __repr__(self) -> str:
+        return f"Metadata({self.duracion_minutos}, {self.idioma_original!r}, {self.presupuesto})"
+
+
+class Pelicula:
+    """
+    Pelicula con representacion compacta.
+    
+    Los campos ausentes en el documento original quedan en None y no se
+    escriben al convertir de vuelta a dict/BSON.
+    """
+    
+    __slots__ = (
+        "_id", "id", "titulo", "año", "director", "generos", "rating",
+        "actores", "reviews", "disponible", "metadata", "createdAt", "updatedAt",
+        "version", "num_reviews", "suma_puntuaciones"
+    )
+    
+    def __init__(
+        self,
+        titulo: str,
+        año: int,
+        director: str,
+        generos: Tuple[str, ...],
+        rating: float,
+        actores: Tuple[Actor, ...] = (),
+        reviews: Tuple[Review, ...] = (),
+        disponible: Optional[bool] = None,
+        metadata: Optional[Metadata] = None,
+        id: Optional[str] = None,
+        createdAt: Optional[datetime] = None,
+        updatedAt: Optional[datetime] = None,
+        _id: Any = None,
+        version: Optional[int] = None,
+        num_reviews: Optional[int] = None,
+        suma_puntuaciones: Optional[float] = None
+    ):
+        self._id = _id
+        self.id = id
+        self.titulo = titulo
+        self.año = año
+        self.director = director
+        self.generos = tuple(generos)
+        self.rating = rating
+        self.actores = tuple(actores)
+        self.reviews = tuple(reviews)
+        self.disponible = disponible
+        self.metadata = metadata
+        self.createdAt = createdAt
+        self.updatedAt = updatedAt
+        # Campos de control: version para compare-and-set y contadores de reviews
+        self.version = version
+        self.num_reviews = num_reviews
+        self.suma_puntuaciones = suma_puntuaciones
+    
+    @classmethod
+    def desde_dict(cls, doc: Mapping[str, Any]) -> "Pelicula":
+        """
+        Crea una pelicula desde un documento de MongoDB.
+        
+        Args:
+            doc: dict o RawBSONDocument
+            
+        Returns:
+            Pelicula tipada
+        """
+        metadata = doc.get("metadata")
+        return cls(
+            doc.get("titulo"),
+            doc.get("año"),
+            doc.get("director"),
+            doc.get("generos") or (),
+            doc.get("rating"),
+            tuple(map(Actor.desde_dict, doc.get("actores") or ())),
+            tuple(map(Review.desde_dict, doc.get("reviews") or ())),
+            doc.get("disponible"),
+            Metadata.desde_dict(metadata) if metadata is not None else None,
+            doc.get("id"),
+            doc.get("createdAt"),
+            doc.get("updatedAt"),
+            doc.get("_id"),
+            doc.get("version"),
+            doc.get("num_reviews"),
+            doc.get("suma_puntuaciones")
+        )
+    
+    @classmethod
+    def desde_bson(cls, data: Union[bytes, RawBSONDocument]) -> "Pelicula":
+        """
+        Crea una pelicula desde BSON crudo.
+        
+        Args:
+            data: Bytes BSON o RawBSONDocument (p.ej. de un cursor con
+                document_class=RawBSONDocument)
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = bson.decode(data)
+        return cls.desde_dict(data)
+    
+    def a_dict(self) -> Dict[str, Any]:
+        """Convierte la pelicula a documento (omite campos None)."""
+        doc: Dict[str, Any] = {}
+        if self._id is not None:
+            doc["_id"] = self._id
+        if self.id is not None:
+            doc["id"] = self.id
+        doc["titulo"] = self.titulo
+        doc["año"] = self.año
+        doc["director"] = self.director
+        doc["generos"] = list(self.generos)
+        doc["rating"] = self.rating
+        if self.actores:
+            doc["actores"] = [a.a_dict() for a in self.actores]
+        if self.reviews:
+            doc["reviews"] = [r.a_dict() for r in self.reviews]
+        if self.disponible is not None:
+            doc["disponible"] = self.disponible
+        if self.metadata is not None:
+            doc["metadata"] = self.metadata.a_dict()
+        if self.createdAt is not None:
+            doc["createdAt"] = self.createdAt
+        if self.updatedAt is not None:
+            doc["updatedAt"] = self.updatedAt
+        if self.version is not None:
+            doc["version"] = self.version
+        if self.num_reviews is not None:
+            doc["num_reviews"] = self.num_reviews
+        if self.suma_puntuaciones is not None:
+            doc["suma_puntuaciones"] = self.suma_puntuaciones
+        return doc
+    
+    def a_bson(self) -> bytes:
+        """Codifica la pelicula como BSON."""
+        return bson.encode(self.a_dict())
+    
+    def __repr__(self) -> str:
+        return f"Pelicula({self.titulo!r}, {self.año}, {self.director!r})"
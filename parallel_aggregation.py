@@ -0,0 +1,139 @@
+"""
+Agregaciones paralelas por rangos con combinacion en cliente.
+
+Cada rango de la coleccion ejecuta un $group parcial en un hilo del
+pool; los resultados parciales se combinan en cliente. Solo se admiten
+metricas combinables: count, sum, min, max, avg (como suma + conteo) y
+push (concatenacion).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.collection import Collection
+
+from config import AGGREGATION_WORKERS, get_logger
+from partitioning import calcular_rangos, filtro_rango
+
+logger = get_logger(__name__)
+
+# Metrica: (operacion, expresion). Operaciones: count, sum, min, max, avg, push
+Metrica = Tuple[str, Any]
+
+OPERACIONES = ("count", "sum", "min", "max", "avg", "push")
+
+
+def _grupo_parcial(clave: Any, metricas: Dict[str, Metrica]) -> Dict[str, Any]:
+    """Construye el $group parcial para las metricas indicadas."""
+    grupo: Dict[str, Any] = {"_id": clave}
+    for nombre, (op, expr) in metricas.items():
+        if op == "count":
+            grupo[nombre] = {"$sum": 1}
+        elif op == "sum":
+            grupo[nombre] = {"$sum": expr}
+        elif op in ("min", "max", "push"):
+            grupo[nombre] = {f"${op}": expr}
+        elif op == "avg":
+            grupo[f"{nombre}__s"] = {"$sum": expr}
+            grupo[f"{nombre}__n"] = {"$sum": {"$cond": [{"$isNumber": expr}, 1, 0]}}
+        else:
+            raise ValueError(f"Operacion no combinable: {op}")
+    return grupo
+
+
+def _combinar(acumulado: Dict[str, Any], parcial: Dict[str, Any], metricas: Dict[str, Metrica]) -> None:
+    """Combina un resultado parcial sobre el acumulado de su clave."""
+    for nombre, (op, _) in metricas.items():
+        if op in ("count", "sum"):
+            acumulado[nombre] = acumulado.get(nombre, 0) + (parcial.get(nombre) or 0)
+        elif op in ("min", "max"):
+            valor = parcial.get(nombre)
+            actual = acumulado.get(nombre)
+            if valor is None:
+                continue
+            if actual is None:
+                acumulado[nombre] = valor
+            else:
+                acumulado[nombre] = min(actual, valor) if op == "min" else max(actual, valor)
+        elif op == "avg":
+            for sufijo in ("__s", "__n"):
+                campo = nombre + sufijo
+                acumulado[campo] = acumulado.get(campo, 0) + (parcial.get(campo) or 0)
+        elif op == "push":
+            acumulado.setdefault(nombre, []).extend(parcial.get(nombre) or [])
+
+
+def _finalizar(acumulado: Dict[str, Any], metricas: Dict[str, Metrica]) -> Dict[str, Any]:
+    """Convierte sumas y conteos de promedios en el valor final."""
+    resultado = {"_id": acumulado["_id"]}
+    for nombre, (op, _) in metricas.items():
+        if op == "avg":
+            n = acumulado.get(f"{nombre}__n", 0)
+            resultado[nombre] = acumulado.get(f"{nombre}__s", 0) / n if n else None
+        else:
+            resultado[nombre] = acumulado.get(nombre)
+    return resultado
+
+
+class AgregacionParalela:
+    """
+    Ejecuta un $group repartido en rangos de un campo indexado.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        workers: int = AGGREGATION_WORKERS,
+        campo: str = "_id"
+    ):
+        """
+        Inicializa la agregacion paralela.
+
+        Args:
+            collection: Coleccion de peliculas
+            workers: Rangos (y consultas concurrentes) a usar
+            campo: Campo de particionado (_id o año)
+        """
+        self.collection = collection
+        self.workers = workers
+        self.campo = campo
+
+    def agrupar(
+        self,
+        clave: Any,
+        metricas: Dict[str, Metrica],
+        prefijo: Optional[List[Dict[str, Any]]] = None,
+        filtro: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Agrupa por `clave` combinando los resultados de cada rango.
+
+        Args:
+            clave: Expresion de agrupacion ($group._id)
+            metricas: Nombre -> (operacion, expresion)
+            prefijo: Etapas previas al $group (p.ej. $unwind, $addFields)
+            filtro: Filtro base aplicado en cada rango
+
+        Returns:
+            Lista de grupos con _id y las metricas finales (sin ordenar)
+        """
+        rangos = calcular_rangos(self.collection, self.workers, self.campo, filtro)
+        grupo = _grupo_parcial(clave, metricas)
+
+        def ejecutar_rango(rango) -> List[Dict[str, Any]]:
+            pipeline = [{"$match": filtro_rango(rango, self.campo, filtro)}]
+            pipeline += prefijo or []
+            pipeline.append({"$group": grupo})
+            return list(self.collection.aggregate(pipeline))
+
+        with ThreadPoolExecutor(max_workers=len(rangos)) as pool:
+            parciales = list(pool.map(ejecutar_rango, rangos))
+
+        acumulados: Dict[Any, Dict[str, Any]] = {}
+        for resultados in parciales:
+            for parcial in resultados:
+                acumulado = acumulados.setdefault(parcial["_id"], {"_id": parcial["_id"]})
+                _combinar(acumulado, parcial, metricas)
+
+        logger.debug("Agregacion paralela: %d rangos, %d grupos", len(rangos), len(acumulados))
+        return [_finalizar(a, metricas) for a in acumulados.values()]
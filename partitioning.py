@@ -0,0 +1,111 @@
+"""
+Particionado de la coleccion por rangos de un campo indexado.
+
+Los limites se estiman a partir de una muestra ($sample), de modo que
+calcular las particiones no recorre la coleccion completa. El primer
+rango incluye los documentos sin el campo, con null o con valores de
+otro tipo, que ninguna comparacion $gte/$lt seleccionaria.
+"""
+
+from collections import Counter
+from numbers import Number
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.collection import Collection
+
+# Rango semiabierto [inicio, fin); None indica sin limite
+Rango = Tuple[Optional[Any], Optional[Any]]
+
+# Documentos muestreados por particion para estimar los limites
+MUESTRAS_POR_PARTICION = 20
+
+
+def _tipo(valor: Any) -> Any:
+    """Grupo de tipos comparables entre si en MongoDB (los numeros juntos)."""
+    return Number if isinstance(valor, Number) and not isinstance(valor, bool) else type(valor)
+
+
+def calcular_rangos(
+    collection: Collection,
+    particiones: int,
+    campo: str = "_id",
+    filtro: Optional[Dict[str, Any]] = None
+) -> List[Rango]:
+    """
+    Divide la coleccion en rangos aproximadamente iguales de `campo`.
+
+    Args:
+        collection: Coleccion a particionar
+        particiones: Numero de rangos deseado
+        campo: Campo de particionado (debe estar indexado)
+        filtro: Filtro opcional aplicado antes de muestrear
+
+    Returns:
+        Lista de rangos (inicio, fin) que cubren todo el dominio
+    """
+    if particiones <= 1:
+        return [(None, None)]
+
+    pipeline: List[Dict[str, Any]] = []
+    if filtro:
+        pipeline.append({"$match": filtro})
+    pipeline += [
+        {"$sample": {"size": particiones * MUESTRAS_POR_PARTICION}},
+        {"$match": {campo: {"$exists": True, "$ne": None}}},
+        {"$project": {"_id": 0, "v": f"${campo}"}},
+        {"$sort": {"v": 1}}
+    ]
+    valores = [doc["v"] for doc in collection.aggregate(pipeline)]
+    if not valores:
+        return [(None, None)]
+    # Limites de un solo tipo: $gte/$lt no comparan entre tipos distintos y
+    # los documentos del tipo minoritario caen en el primer rango
+    dominante = Counter(_tipo(v) for v in valores).most_common(1)[0][0]
+    valores = [v for v in valores if _tipo(v) is dominante]
+
+    paso = len(valores) / particiones
+    limites = []
+    for i in range(1, particiones):
+        valor = valores[int(i * paso)]
+        if not limites or valor != limites[-1]:
+            limites.append(valor)
+
+    inicios = [None] + limites
+    fines = limites + [None]
+    return list(zip(inicios, fines))
+
+
+def filtro_rango(
+    rango: Rango,
+    campo: str = "_id",
+    filtro: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Combina un filtro con la condicion de un rango.
+
+    El rango inicial se expresa como "no >= fin" en lugar de "< fin":
+    asi tambien cubre los documentos sin el campo, con null o con un
+    valor de otro tipo, y la union de los rangos es toda la coleccion.
+
+    Args:
+        rango: Rango (inicio, fin) semiabierto
+        campo: Campo del rango
+        filtro: Filtro base
+
+    Returns:
+        Filtro de MongoDB para el rango
+    """
+    inicio, fin = rango
+    condicion: Dict[str, Any] = {}
+    if inicio is not None:
+        condicion["$gte"] = inicio
+        if fin is not None:
+            condicion["$lt"] = fin
+    elif fin is not None:
+        condicion["$not"] = {"$gte": fin}
+
+    if not condicion:
+        return dict(filtro or {})
+    if not filtro:
+        return {campo: condicion}
+    return {"$and": [filtro, {campo: condicion}]}
@@ -4,7 +4,19 @@ Consultas avanzadas y agregaciones para peliculas.
 
 from pymongo.collection import Collection
 from pymongo import ASCENDING, DESCENDING
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+import columnar
+from parallel_aggregation import AgregacionParalela
+
+
+# Limites de $bucket por decada segun el rango de año del esquema (1888-2030)
+LIMITES_DECADAS = list(range(1880, 2041, 10))
+
+
+def _redondear(valor: Optional[float], decimales: int) -> Optional[float]:
+    """Redondea como $round, respetando valores nulos."""
+    return round(valor, decimales) if valor is not None else None
 
 
 class QueryOperations:
@@ -63,12 +75,17 @@ class QueryOperations:
         ]
         return list(self.collection.aggregate(pipeline))
     
-    def directores_con_mas_peliculas(self, limite: int = 5) -> List[Dict]:
+    def directores_con_mas_peliculas(self, limite: int = 5, max_titulos: int = 10) -> List[Dict]:
         """
         Lista directores ordenados por cantidad de peliculas.
         
+        Cada grupo guarda como maximo `max_titulos` titulos (los de mayor
+        rating) mediante $topN, de modo que la memoria por director no
+        crece con el catalogo.
+        
         Args:
             limite: Numero maximo de directores a retornar
+            max_titulos: Titulos por director a incluir
             
         Returns:
             Lista de directores con sus peliculas
@@ -77,7 +94,11 @@ class QueryOperations:
             {"$group": {
                 "_id": "$director",
                 "cantidad": {"$sum": 1},
-                "peliculas": {"$push": "$titulo"},
+                "peliculas": {"$topN": {
+                    "n": max_titulos,
+                    "sortBy": {"rating": DESCENDING},
+                    "output": "$titulo"
+                }},
                 "rating_promedio": {"$avg": "$rating"}
             }},
             {"$sort": {"cantidad": DESCENDING, "rating_promedio": DESCENDING}},
@@ -92,16 +113,45 @@ class QueryOperations:
         ]
         return list(self.collection.aggregate(pipeline))
     
-    # ==================== AGREGACIONES ====================
-    
-    def estadisticas_por_genero(self) -> List[Dict]:
+    def top_por_genero(self, n: int = 3) -> List[Dict]:
         """
-        Calcula estadisticas completas por genero.
+        Obtiene las N peliculas con mejor rating de cada genero.
         
+        Usa $setWindowFields para numerar las peliculas dentro de cada
+        genero y se queda con las N primeras.
+        
+        Args:
+            n: Peliculas por genero
+            
         Returns:
-            Lista con estadisticas por genero
+            Lista ordenada por genero y posicion
         """
         pipeline = [
+            {"$unwind": "$generos"},
+            {"$setWindowFields": {
+                "partitionBy": "$generos",
+                "sortBy": {"rating": DESCENDING},
+                "output": {"posicion": {"$documentNumber": {}}}
+            }},
+            {"$match": {"posicion": {"$lte": n}}},
+            {"$sort": {"generos": ASCENDING, "posicion": ASCENDING}},
+            {"$project": {
+                "_id": 0,
+                "genero": "$generos",
+                "posicion": 1,
+                "titulo": 1,
+                "director": 1,
+                "año": 1,
+                "rating": 1
+            }}
+        ]
+        return list(self.collection.aggregate(pipeline))
+    
+    # ==================== AGREGACIONES ====================
+    
+    def pipeline_estadisticas_por_genero(self) -> List[Dict]:
+        """Construye el pipeline de estadisticas por genero."""
+        return [
             {"$unwind": "$generos"},
             {"$group": {
                 "_id": "$generos",
@@ -124,13 +174,49 @@ class QueryOperations:
                 "duracion_promedio": {"$round": ["$duracion_promedio", 0]}
             }}
         ]
-        return list(self.collection.aggregate(pipeline))
+    
+    def estadisticas_por_genero(self, paralelo: bool = False) -> List[Dict]:
+        """
+        Calcula estadisticas completas por genero.
+        
+        Args:
+            paralelo: Si True, agrega por rangos de _id en paralelo
+            
+        Returns:
+            Lista con estadisticas por genero
+        """
+        if not paralelo:
+            return list(self.collection.aggregate(self.pipeline_estadisticas_por_genero()))
+        
+        grupos = AgregacionParalela(self.collection).agrupar(
+            "$generos",
+            {
+                "cantidad": ("count", None),
+                "rating_promedio": ("avg", "$rating"),
+                "rating_max": ("max", "$rating"),
+                "rating_min": ("min", "$rating"),
+                "presupuesto_total": ("sum", "$metadata.presupuesto"),
+                "duracion_promedio": ("avg", "$metadata.duracion_minutos")
+            },
+            prefijo=[{"$unwind": "$generos"}]
+        )
+        grupos.sort(key=lambda g: g["cantidad"], reverse=True)
+        return [{
+            "genero": g["_id"],
+            "cantidad": g["cantidad"],
+            "rating_promedio": _redondear(g["rating_promedio"], 2),
+            "rating_max": g["rating_max"],
+            "rating_min": g["rating_min"],
+            "presupuesto_total": g["presupuesto_total"],
+            "duracion_promedio": _redondear(g["duracion_promedio"], 0)
+        } for g in grupos]
     
     def top_peliculas(self, n: int = 5) -> List[Dict]:
         """
         Obtiene las top N peliculas mejor valoradas.
         
-        Combina rating oficial con promedio de reviews.
+        Combina rating oficial con promedio de reviews. La seleccion se
+        hace con $topN, que solo mantiene N documentos en memoria.
         
         Args:
             n: Numero de peliculas a retornar
@@ -147,29 +233,30 @@ class QueryOperations:
                     "$avg": ["$rating", {"$ifNull": ["$promedio_reviews", "$rating"]}]
                 }
             }},
-            {"$sort": {"score_combinado": DESCENDING}},
-            {"$limit": n},
-            {"$project": {
-                "_id": 0,
-                "titulo": 1,
-                "director": 1,
-                "año": 1,
-                "rating": 1,
-                "promedio_reviews": {"$round": [{"$ifNull": ["$promedio_reviews", 0]}, 2]},
-                "score_combinado": {"$round": ["$score_combinado", 2]},
-                "generos": 1
-            }}
+            {"$group": {
+                "_id": None,
+                "top": {"$topN": {
+                    "n": n,
+                    "sortBy": {"score_combinado": DESCENDING},
+                    "output": {
+                        "titulo": "$titulo",
+                        "director": "$director",
+                        "año": "$año",
+                        "rating": "$rating",
+                        "promedio_reviews": {"$round": [{"$ifNull": ["$promedio_reviews", 0]}, 2]},
+                        "score_combinado": {"$round": ["$score_combinado", 2]},
+                        "generos": "$generos"
+                    }
+                }}
+            }},
+            {"$unwind": "$top"},
+            {"$replaceRoot": {"newRoot": "$top"}}
         ]
         return list(self.collection.aggregate(pipeline))
     
-    def analisis_reviews(self) -> List[Dict]:
-        """
-        Analiza las reviews de cada pelicula.
-        
-        Returns:
-            Lista con analisis de reviews por pelicula
-        """
-        pipeline = [
+    def pipeline_analisis_reviews(self) -> List[Dict]:
+        """Construye el pipeline de analisis de reviews."""
+        return [
             {"$project": {
                 "_id": 0,
                 "titulo": 1,
@@ -190,42 +277,164 @@ class QueryOperations:
                 "min_puntuacion": 1
             }}
         ]
-        return list(self.collection.aggregate(pipeline))
     
-    def reporte_por_decada(self) -> List[Dict]:
+    def analisis_reviews(self) -> List[Dict]:
+        """
+        Analiza las reviews de cada pelicula.
+        
+        Returns:
+            Lista con analisis de reviews por pelicula
+        """
+        return list(self.collection.aggregate(self.pipeline_analisis_reviews()))
+    
+    def _etapa_decada(self) -> Dict:
+        """Etapa que calcula la decada ("1990s") de cada pelicula."""
+        return {"$addFields": {
+            "decada": {
+                "$concat": [
+                    {"$toString": {"$multiply": [{"$floor": {"$divide": ["$año", 10]}}, 10]}},
+                    "s"
+                ]
+            }
+        }}
+    
+    def pipeline_reporte_por_decada(self, incluir_peliculas: bool = True) -> List[Dict]:
+        """Construye el pipeline del reporte por decada."""
+        grupo = {
+            "_id": "$decada",
+            "cantidad": {"$sum": 1},
+            "rating_promedio": {"$avg": "$rating"},
+            "presupuesto_promedio": {"$avg": "$metadata.presupuesto"}
+        }
+        proyeccion = {
+            "_id": 0,
+            "decada": "$_id",
+            "cantidad": 1,
+            "rating_promedio": {"$round": ["$rating_promedio", 2]},
+            "presupuesto_promedio": {"$round": ["$presupuesto_promedio", 0]}
+        }
+        if incluir_peliculas:
+            grupo["peliculas"] = {"$push": {"titulo": "$titulo", "año": "$año", "rating": "$rating"}}
+            proyeccion["peliculas"] = 1
+        
+        return [
+            self._etapa_decada(),
+            {"$group": grupo},
+            {"$sort": {"_id": ASCENDING}},
+            {"$project": proyeccion}
+        ]
+    
+    def reporte_por_decada(self, paralelo: bool = False) -> List[Dict]:
         """
         Genera reporte de peliculas agrupadas por decada.
         
+        Args:
+            paralelo: Si True, agrega por rangos de año en paralelo
+            
         Returns:
             Lista con estadisticas por decada
         """
-        pipeline = [
-            {"$addFields": {
-                "decada": {
-                    "$concat": [
-                        {"$toString": {"$multiply": [{"$floor": {"$divide": ["$año", 10]}}, 10]}},
-                        "s"
-                    ]
-                }
-            }},
-            {"$group": {
-                "_id": "$decada",
-                "cantidad": {"$sum": 1},
-                "peliculas": {"$push": {"titulo": "$titulo", "año": "$año", "rating": "$rating"}},
-                "rating_promedio": {"$avg": "$rating"},
-                "presupuesto_promedio": {"$avg": "$metadata.presupuesto"}
+        if not paralelo:
+            return list(self.collection.aggregate(self.pipeline_reporte_por_decada()))
+        
+        grupos = AgregacionParalela(self.collection, campo="año").agrupar(
+            "$decada",
+            {
+                "cantidad": ("count", None),
+                "peliculas": ("push", {"titulo": "$titulo", "año": "$año", "rating": "$rating"}),
+                "rating_promedio": ("avg", "$rating"),
+                "presupuesto_promedio": ("avg", "$metadata.presupuesto")
+            },
+            prefijo=[self._etapa_decada()]
+        )
+        # Sin año la decada es null, que MongoDB ordena primero
+        grupos.sort(key=lambda g: (g["_id"] is not None, g["_id"]))
+        return [{
+            "decada": g["_id"],
+            "cantidad": g["cantidad"],
+            "peliculas": g["peliculas"],
+            "rating_promedio": _redondear(g["rating_promedio"], 2),
+            "presupuesto_promedio": _redondear(g["presupuesto_promedio"], 0)
+        } for g in grupos]
+    
+    def pipeline_resumen_por_decada(
+        self,
+        top_k: int = 3,
+        incluir_peliculas: bool = False
+    ) -> List[Dict]:
+        """
+        Construye el pipeline del resumen por decada con $bucket.
+        
+        Agrupa directamente sobre el entero año con limites fijos por
+        decada, sin calcular ni agrupar por una clave de texto.
+        
+        Args:
+            top_k: Mejores peliculas por decada ($topN); 0 para omitirlas
+            incluir_peliculas: Si True, incluye la lista completa por decada
+        """
+        salida = {
+            "cantidad": {"$sum": 1},
+            "rating_promedio": {"$avg": "$rating"},
+            "presupuesto_promedio": {"$avg": "$metadata.presupuesto"}
+        }
+        proyeccion = {
+            "_id": 0,
+            "decada": {"$cond": [
+                {"$isNumber": "$_id"},
+                {"$concat": [{"$toString": "$_id"}, "s"]},
+                "$_id"
+            ]},
+            "cantidad": 1,
+            "rating_promedio": {"$round": ["$rating_promedio", 2]},
+            "presupuesto_promedio": {"$round": ["$presupuesto_promedio", 0]}
+        }
+        pelicula = {"titulo": "$titulo", "año": "$año", "rating": "$rating"}
+        if top_k > 0:
+            salida["top"] = {"$topN": {"n": top_k, "sortBy": {"rating": DESCENDING}, "output": pelicula}}
+            proyeccion["top"] = 1
+        if incluir_peliculas:
+            salida["peliculas"] = {"$push": pelicula}
+            proyeccion["peliculas"] = 1
+        
+        return [
+            {"$bucket": {
+                "groupBy": "$año",
+                "boundaries": LIMITES_DECADAS,
+                "default": "otros",
+                "output": salida
             }},
-            {"$sort": {"_id": ASCENDING}},
-            {"$project": {
-                "_id": 0,
-                "decada": "$_id",
-                "cantidad": 1,
-                "peliculas": 1,
-                "rating_promedio": {"$round": ["$rating_promedio", 2]},
-                "presupuesto_promedio": {"$round": ["$presupuesto_promedio", 0]}
-            }}
+            {"$project": proyeccion}
         ]
-        return list(self.collection.aggregate(pipeline))
+    
+    def resumen_por_decada(self, top_k: int = 3, incluir_peliculas: bool = False) -> List[Dict]:
+        """
+        Resume las peliculas por decada sin devolver todas las peliculas.
+        
+        Args:
+            top_k: Mejores peliculas por rating a incluir en cada decada
+            incluir_peliculas: Si True, incluye tambien la lista completa
+            
+        Returns:
+            Lista con decada, cantidad, promedios y top (ordenada por decada)
+        """
+        return list(self.collection.aggregate(
+            self.pipeline_resumen_por_decada(top_k, incluir_peliculas)
+        ))
+    
+    def reporte_por_decada_df(self):
+        """
+        Genera el reporte por decada como DataFrame columnar.
+        
+        No incluye la lista de peliculas de cada decada.
+        
+        Returns:
+            pandas.DataFrame con decada, cantidad, rating y presupuesto promedio
+        """
+        return columnar.aggregate_dataframe(
+            self.collection,
+            self.pipeline_resumen_por_decada(top_k=0),
+            ["decada", "cantidad", "rating_promedio", "presupuesto_promedio"]
+        )
     
     def estadisticas_generales(self) -> Dict[str, Any]:
         """
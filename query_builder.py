@@ -0,0 +1,223 @@
+"""
+Constructor de consultas combinadas sobre peliculas.
+
+Combina en un unico find los criterios que antes requerian varias
+busquedas (titulo, genero, director, años, rating, disponibilidad). Por
+defecto el indice lo elige el planificador de MongoDB, que conoce la
+selectividad real de cada predicado; con_hint fuerza uno si se pide.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
+
+from config import get_logger
+from database import INDICES_PELICULAS
+
+logger = get_logger(__name__)
+
+# Campo -> nombre del indice simple que lo cubre
+_INDICE_POR_CAMPO = {campos[0][0]: nombre for campos, nombre in INDICES_PELICULAS}
+
+# Prioridad de cada criterio para con_hint() sin indice (menor = suele
+# ser mas selectivo)
+_PRIORIDAD = {
+    "director": 1,
+    "generos": 2,
+    "titulo": 3,
+    "año": 4,
+    "rating": 5,
+}
+
+PROYECCION_DEFECTO = ("titulo", "año", "director", "generos", "rating")
+
+# Campos de texto: por defecto se ordenan de forma ascendente (A-Z)
+_CAMPOS_TEXTO = {"titulo", "director"}
+
+
+class ConsultaPeliculas:
+    """
+    Constructor fluido de consultas de peliculas.
+
+    Ejemplo:
+        ConsultaPeliculas().generos("Drama").años(2000, 2010) \\
+            .rating_minimo(8).ordenar("rating").ejecutar(collection)
+    """
+
+    def __init__(self):
+        self._filtro: Dict[str, Any] = {}
+        self._indexables: Dict[str, bool] = {}
+        self._orden: List[Tuple[str, int]] = []
+        self._campos: Tuple[str, ...] = PROYECCION_DEFECTO
+        self._limite = 0
+        # None: sin hint; "": hint automatico; otro valor: indice forzado
+        self._hint: Optional[str] = None
+
+    # ==================== CRITERIOS ====================
+
+    def titulo(self, texto: str, prefijo: bool = False) -> "ConsultaPeliculas":
+        """
+        Filtra por titulo.
+
+        Args:
+            texto: Texto a buscar
+            prefijo: Si True, busca titulos que empiezan por `texto`
+                respetando mayusculas (puede usar idx_titulo)
+        """
+        if prefijo:
+            self._filtro["titulo"] = {"$regex": f"^{re.escape(texto)}"}
+        else:
+            self._filtro["titulo"] = {"$regex": re.escape(texto), "$options": "i"}
+        self._indexables["titulo"] = prefijo
+        return self
+
+    def generos(self, *generos: str) -> "ConsultaPeliculas":
+        """Filtra peliculas que tienen todos los generos indicados."""
+        if len(generos) == 1:
+            self._filtro["generos"] = generos[0]
+        elif generos:
+            self._filtro["generos"] = {"$all": list(generos)}
+        self._indexables["generos"] = bool(generos)
+        return self
+
+    def director(self, nombre: str, exacto: bool = False) -> "ConsultaPeliculas":
+        """
+        Filtra por director.
+
+        Args:
+            nombre: Nombre o parte del nombre
+            exacto: Si True, compara por igualdad (usa idx_director)
+        """
+        if exacto:
+            self._filtro["director"] = nombre
+        else:
+            self._filtro["director"] = {"$regex": re.escape(nombre), "$options": "i"}
+        self._indexables["director"] = exacto
+        return self
+
+    def años(self, inicio: Optional[int] = None, fin: Optional[int] = None) -> "ConsultaPeliculas":
+        """Filtra por rango de años (extremos incluidos)."""
+        rango = {}
+        if inicio is not None:
+            rango["$gte"] = inicio
+        if fin is not None:
+            rango["$lte"] = fin
+        if rango:
+            self._filtro["año"] = rango
+            self._indexables["año"] = True
+        return self
+
+    def rating_minimo(self, rating: float) -> "ConsultaPeliculas":
+        """Filtra por rating mayor o igual al indicado."""
+        self._filtro["rating"] = {"$gte": rating}
+        self._indexables["rating"] = True
+        return self
+
+    def disponible(self, disponible: bool = True) -> "ConsultaPeliculas":
+        """Filtra por disponibilidad."""
+        self._filtro["disponible"] = disponible
+        return self
+
+    # ==================== RESULTADO ====================
+
+    def ordenar(self, campo: str, descendente: Optional[bool] = None) -> "ConsultaPeliculas":
+        """
+        Añade un criterio de orden.
+
+        Args:
+            campo: Campo de orden
+            descendente: Sentido del orden; por defecto ascendente en los
+                campos de texto y descendente en los numericos
+        """
+        if descendente is None:
+            descendente = campo not in _CAMPOS_TEXTO
+        self._orden.append((campo, DESCENDING if descendente else ASCENDING))
+        return self
+
+    def campos(self, *campos: str) -> "ConsultaPeliculas":
+        """Define los campos devueltos."""
+        self._campos = campos
+        return self
+
+    def limite(self, n: int) -> "ConsultaPeliculas":
+        """Limita el numero de resultados (0 = sin limite)."""
+        self._limite = n
+        return self
+
+    def con_hint(self, indice: Optional[str] = None) -> "ConsultaPeliculas":
+        """
+        Fuerza un indice en lugar de dejar decidir al planificador.
+
+        Un hint fijo sobre un campo poco selectivo puede ser peor que el
+        plan que elige MongoDB; usar solo cuando se conoce la consulta.
+
+        Args:
+            indice: Nombre del indice; None lo elige hint()
+        """
+        self._hint = indice or ""
+        return self
+
+    def hint(self) -> Optional[str]:
+        """
+        Indice que usaria con_hint() sin argumento.
+
+        Prefiere el criterio indexable con mayor prioridad; si no hay
+        ninguno, usa el indice del primer campo de orden para evitar
+        ordenar en memoria.
+
+        Returns:
+            Nombre del indice o None si ninguno aplica
+        """
+        candidatos = [
+            campo for campo, indexable in self._indexables.items()
+            if indexable and campo in _INDICE_POR_CAMPO
+        ]
+        if candidatos:
+            return _INDICE_POR_CAMPO[min(candidatos, key=_PRIORIDAD.__getitem__)]
+        if self._orden and self._orden[0][0] in _INDICE_POR_CAMPO:
+            return _INDICE_POR_CAMPO[self._orden[0][0]]
+        return None
+
+    def construir(self) -> Dict[str, Any]:
+        """
+        Devuelve los argumentos de find para la consulta.
+
+        Returns:
+            Diccionario con filter, projection, sort, limit y, si se
+            pidio con con_hint, hint
+        """
+        proyeccion = {campo: 1 for campo in self._campos}
+        proyeccion.setdefault("_id", 0)
+        consulta: Dict[str, Any] = {
+            "filter": dict(self._filtro),
+            "projection": proyeccion,
+            "limit": self._limite
+        }
+        if self._orden:
+            consulta["sort"] = list(self._orden)
+        indice = self._hint or (self.hint() if self._hint == "" else None)
+        if indice:
+            consulta["hint"] = indice
+        return consulta
+
+    def ejecutar(self, collection: Collection) -> List[Dict]:
+        """
+        Ejecuta la consulta sobre la coleccion.
+
+        Si el indice elegido no existe, repite la consulta sin hint.
+        """
+        consulta = self.construir()
+        try:
+            return list(collection.find(**consulta))
+        except OperationFailure as e:
+            if "hint" not in consulta:
+                raise
+            logger.warning("Hint %s no valido (%s); consulta sin hint", consulta.pop("hint"), e)
+            return list(collection.find(**consulta))
+
+    def explicar(self, collection: Collection) -> Dict[str, Any]:
+        """Devuelve el plan de ejecucion de la consulta."""
+        return collection.find(**self.construir()).explain()
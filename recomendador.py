@@ -0,0 +1,595 @@
+"""
+Recomendaciones de peliculas: similares por contenido y colaborativas.
+
+Cada pelicula se codifica en un vector disperso (one-hot de generos,
+director, actores e idioma, y año/duracion/rating normalizados). Un
+trabajo por lotes calcula la similitud coseno por bloques de filas con
+productos de matrices y guarda los k vecinos de cada pelicula en una
+coleccion auxiliar, de modo que similares(id, k) es una lectura por _id.
+
+RecomendadorColaborativo construye la matriz usuario x pelicula de las
+reviews y recomienda por similitud item-item, actualizandose con las
+reviews que escribe CRUDOperations.
+
+NumPy y SciPy se importan al calcular; servir recomendaciones por
+contenido no los necesita.
+
+Ejecutar:
+    python recomendador.py [k]
+"""
+
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from pymongo import ReplaceOne
+from pymongo.collection import Collection
+
+from config import MUESTREO, RECO_CHUNK_SIZE, RECO_TOP_K, get_logger
+
+logger = get_logger(__name__)
+
+# Peso de cada bloque de caracteristicas en la similitud
+PESOS_CONTENIDO = {
+    "generos": 1.0,
+    "director": 0.6,
+    "actores": 0.6,
+    "idioma": 0.3,
+    "numericas": 0.5,
+}
+
+PROYECCION_CONTENIDO = {
+    "_id": 0, "id": 1, "titulo": 1, "año": 1, "rating": 1, "director": 1, "generos": 1,
+    "actores.nombre": 1, "metadata.idioma_original": 1, "metadata.duracion_minutos": 1,
+}
+
+# Documentos por bulk_write al guardar los vecinos
+_TAMAÑO_LOTE = 1000
+
+
+def _categorias(p: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Valores categoricos de una pelicula por bloque."""
+    metadata = p.get("metadata") or {}
+    return {
+        "generos": list(set(p.get("generos") or [])),
+        "director": [p["director"]] if p.get("director") else [],
+        "actores": list({a["nombre"] for a in p.get("actores") or [] if a.get("nombre")}),
+        "idioma": [metadata["idioma_original"]] if metadata.get("idioma_original") else [],
+    }
+
+
+def _numericas(p: Dict[str, Any]) -> Tuple[float, float, float]:
+    """Año, duracion y rating (NaN si faltan)."""
+    metadata = p.get("metadata") or {}
+    nan = float("nan")
+    return (
+        float(p.get("año") or nan),
+        float(metadata.get("duracion_minutos") or nan),
+        float(p["rating"]) if p.get("rating") is not None else nan,
+    )
+
+
+def vectorizar(peliculas: Iterable[Dict[str, Any]], pesos: Dict[str, float] = PESOS_CONTENIDO):
+    """
+    Codifica peliculas en una matriz dispersa de filas de norma 1.
+
+    Cada bloque one-hot se normaliza por fila y se multiplica por su
+    peso, de modo que una pelicula con muchos actores no pesa mas que
+    una con pocos. Las numericas se escalan a [0, 1] (los valores
+    ausentes toman la media).
+
+    Args:
+        peliculas: Documentos con PROYECCION_CONTENIDO
+        pesos: Peso de cada bloque
+
+    Returns:
+        (ids, titulos, matriz CSR de n_peliculas x n_caracteristicas)
+    """
+    import numpy as np
+    from scipy import sparse
+
+    ids: List[str] = []
+    titulos: List[str] = []
+    vocabulario: Dict[Tuple[str, Any], int] = {}
+    filas: List[int] = []
+    columnas: List[int] = []
+    valores: List[float] = []
+    numericas: List[Tuple[float, float, float]] = []
+
+    for i, p in enumerate(peliculas):
+        ids.append(p["id"])
+        titulos.append(p.get("titulo"))
+        numericas.append(_numericas(p))
+        for bloque, vals in _categorias(p).items():
+            if not vals:
+                continue
+            valor = pesos[bloque] / np.sqrt(len(vals))
+            for v in vals:
+                filas.append(i)
+                columnas.append(vocabulario.setdefault((bloque, v), len(vocabulario)))
+                valores.append(valor)
+
+    n = len(ids)
+    categoricas = sparse.csr_matrix(
+        (np.asarray(valores, dtype=np.float32), (filas, columnas)),
+        shape=(n, len(vocabulario))
+    )
+
+    num = np.asarray(numericas, dtype=np.float32).reshape(n, 3)
+    if n:
+        medias = np.nanmean(num, axis=0)
+        num = np.where(np.isnan(num), np.nan_to_num(medias), num)
+        minimos, maximos = num.min(axis=0), num.max(axis=0)
+        num = (num - minimos) / np.where(maximos > minimos, maximos - minimos, 1)
+    num *= pesos["numericas"] / np.sqrt(3)
+
+    matriz = sparse.hstack([categoricas, sparse.csr_matrix(num)], format="csr")
+    normas = np.sqrt(matriz.multiply(matriz).sum(axis=1)).A1
+    matriz = sparse.diags(1 / np.where(normas > 0, normas, 1)).dot(matriz).tocsr()
+    return ids, titulos, matriz.astype(np.float32)
+
+
+def vecinos_mas_cercanos(
+    matriz,
+    k: int,
+    tamaño_chunk: int = RECO_CHUNK_SIZE,
+    filas: Optional[Sequence[int]] = None
+) -> Iterator[Tuple[int, Any, Any]]:
+    """
+    Top-k por similitud coseno, procesando bloques de filas.
+
+    Cada bloque se multiplica contra la matriz completa y se seleccionan
+    los k mayores con argpartition, sin materializar la matriz n x n.
+
+    Args:
+        matriz: Matriz dispersa con filas de norma 1
+        k: Vecinos por fila
+        tamaño_chunk: Filas por bloque
+        filas: Filas a calcular (None = todas)
+
+    Yields:
+        (fila, indices de vecinos, similitudes) en orden descendente
+    """
+    import numpy as np
+
+    n = matriz.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return
+    filas = np.arange(n) if filas is None else np.asarray(filas, dtype=np.int64)
+    traspuesta = matriz.T.tocsc()
+
+    for inicio in range(0, len(filas), tamaño_chunk):
+        bloque = filas[inicio:inicio + tamaño_chunk]
+        similitudes = (matriz[bloque] @ traspuesta).toarray()
+        similitudes[np.arange(len(bloque)), bloque] = -np.inf
+
+        candidatos = np.argpartition(-similitudes, k - 1, axis=1)[:, :k]
+        puntuaciones = np.take_along_axis(similitudes, candidatos, axis=1)
+        orden = np.argsort(-puntuaciones, axis=1)
+        candidatos = np.take_along_axis(candidatos, orden, axis=1)
+        puntuaciones = np.take_along_axis(puntuaciones, orden, axis=1)
+
+        for j, fila in enumerate(bloque):
+            yield int(fila), candidatos[j], puntuaciones[j]
+
+
+class RecomendadorContenido:
+    """
+    Peliculas similares precalculadas por contenido.
+    """
+
+    def __init__(self, collection: Collection, vecinos: Collection):
+        """
+        Inicializa el recomendador.
+
+        Args:
+            collection: Coleccion de peliculas
+            vecinos: Coleccion con los vecinos precalculados (_id = id de pelicula)
+        """
+        self.collection = collection
+        self.vecinos = vecinos
+
+    def crear_indices(self) -> None:
+        """Crea el indice por titulo de la coleccion de vecinos."""
+        self.vecinos.create_index("titulo", name="idx_titulo")
+
+    def calcular(self, k: int = RECO_TOP_K, tamaño_chunk: int = RECO_CHUNK_SIZE) -> int:
+        """
+        Recalcula y guarda los k vecinos de cada pelicula.
+
+        Las entradas de peliculas que ya no existen se eliminan al final.
+
+        Args:
+            k: Vecinos guardados por pelicula
+            tamaño_chunk: Filas por bloque de similitud
+
+        Returns:
+            Numero de peliculas procesadas
+        """
+        inicio = datetime.now()
+        ids, titulos, matriz = vectorizar(
+            self.collection.find({"id": {"$exists": True}}, PROYECCION_CONTENIDO)
+        )
+        logger.info("Matriz de contenido: %d peliculas x %d caracteristicas", *matriz.shape)
+
+        lote: List[ReplaceOne] = []
+        for fila, indices, puntuaciones in vecinos_mas_cercanos(matriz, k, tamaño_chunk):
+            lote.append(ReplaceOne(
+                {"_id": ids[fila]},
+                {
+                    "titulo": titulos[fila],
+                    "vecinos": [
+                        {"id": ids[j], "titulo": titulos[j], "score": round(float(s), 4)}
+                        for j, s in zip(indices, puntuaciones)
+                    ],
+                    "calculado": inicio
+                },
+                upsert=True
+            ))
+            if len(lote) >= _TAMAÑO_LOTE:
+                self.vecinos.bulk_write(lote, ordered=False)
+                lote = []
+        if lote:
+            self.vecinos.bulk_write(lote, ordered=False)
+
+        self.vecinos.delete_many({"calculado": {"$lt": inicio}})
+        logger.info("Vecinos calculados para %d peliculas (k=%d)", len(ids), k)
+        return len(ids)
+
+    def similares(self, id_pelicula: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Peliculas mas parecidas a una dada.
+
+        Args:
+            id_pelicula: Campo id de la pelicula
+            k: Numero de recomendaciones (como maximo el k del calculo)
+
+        Returns:
+            Lista de {"id", "titulo", "score"} de mayor a menor similitud
+        """
+        doc = self.vecinos.find_one({"_id": id_pelicula}, {"vecinos": {"$slice": k}})
+        return doc["vecinos"] if doc else []
+
+    def similares_por_titulo(self, titulo: str, k: int = 10) -> List[Dict[str, Any]]:
+        """Como similares, identificando la pelicula por titulo."""
+        doc = self.vecinos.find_one({"titulo": titulo}, {"vecinos": {"$slice": k}})
+        return doc["vecinos"] if doc else []
+
+
+class RecomendadorColaborativo:
+    """
+    Recomendaciones por usuario a partir de la matriz usuario x pelicula.
+
+    Modelo item-item: la matriz de reviews se extrae con una agregacion
+    en streaming, se centra por la media de cada usuario y se guardan
+    los k vecinos (coseno ajustado) de cada pelicula. La prediccion para
+    un usuario es la media ponderada de sus puntuaciones centradas sobre
+    los vecinos de las peliculas que ya valoro.
+
+    Como observador de CRUDOperations acumula las reviews nuevas o
+    eliminadas; antes de recomendar se aplican a la matriz y solo se
+    recalculan los vecinos de las peliculas cuya similitud puede haber
+    cambiado, con el mismo resultado que un entrenamiento completo. Para
+    promediar las reviews repetidas igual que el entrenamiento se guardan
+    la suma y el numero de reviews de cada celda.
+    """
+
+    def __init__(self, collection: Collection, k: int = RECO_TOP_K, tamaño_chunk: int = RECO_CHUNK_SIZE):
+        """
+        Inicializa el recomendador (el modelo se entrena al primer uso).
+
+        Args:
+            collection: Coleccion de peliculas
+            k: Vecinos guardados por pelicula
+            tamaño_chunk: Filas por bloque de similitud
+        """
+        self.collection = collection
+        self.k = k
+        self.tamaño_chunk = tamaño_chunk
+        self._lock = threading.RLock()
+        self._usuarios: Dict[str, int] = {}
+        self._titulos: Dict[str, int] = {}
+        self._nombres: List[str] = []
+        self._sumas = None
+        self._cuentas = None
+        self._puntuaciones = None
+        self._centradas = None
+        self._medias = None
+        self._vecinos: List[Any] = []
+        self._similitudes: List[Any] = []
+        # Celda -> [suma, reviews, vaciar]: vaciar descarta antes lo que
+        # hubiera en la celda (review eliminada)
+        self._pendientes: Dict[Tuple[int, int], List[Any]] = {}
+        self._afectadas: Set[int] = set()
+        self._eliminadas: Set[int] = set()
+        self._cache: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+
+    # ==================== ENTRENAMIENTO ====================
+
+    def _indice(self, indices: Dict[str, int], clave: str, nombres: Optional[List[str]] = None) -> int:
+        if clave not in indices:
+            indices[clave] = len(indices)
+            if nombres is not None:
+                nombres.append(clave)
+        return indices[clave]
+
+    def extraer_matriz(self, tamaño_lote: int = _TAMAÑO_LOTE):
+        """
+        Lee las reviews como matriz dispersa usuarios x peliculas.
+
+        La agregacion solo proyecta (titulo, usuario, puntuacion) y se
+        consume por lotes del cursor; las reviews repetidas de un mismo
+        usuario y pelicula se promedian. Las sumas y cuentas por celda
+        quedan guardadas para la actualizacion incremental.
+
+        Returns:
+            Matriz CSR de puntuaciones
+        """
+        from array import array
+
+        import numpy as np
+        from scipy import sparse
+
+        pipeline = [
+            {"$match": {"reviews.0": {"$exists": True}}},
+            {"$project": {"_id": 0, "titulo": 1, "reviews.usuario": 1, "reviews.puntuacion": 1}},
+            {"$unwind": "$reviews"},
+            {"$project": {"titulo": 1, "usuario": "$reviews.usuario", "puntuacion": "$reviews.puntuacion"}}
+        ]
+        self._usuarios, self._titulos, self._nombres = {}, {}, []
+        filas, columnas, valores = array("i"), array("i"), array("f")
+
+        for r in self.collection.aggregate(pipeline, allowDiskUse=True, batchSize=tamaño_lote):
+            if r.get("usuario") is None or r.get("puntuacion") is None:
+                continue
+            filas.append(self._indice(self._usuarios, r["usuario"]))
+            columnas.append(self._indice(self._titulos, r["titulo"], self._nombres))
+            valores.append(r["puntuacion"])
+
+        forma = (len(self._usuarios), len(self._titulos))
+        coordenadas = (np.frombuffer(filas, dtype=np.int32), np.frombuffer(columnas, dtype=np.int32))
+        self._sumas = sparse.csr_matrix((np.frombuffer(valores, dtype=np.float32), coordenadas), shape=forma)
+        self._cuentas = sparse.csr_matrix((np.ones(len(valores), dtype=np.float32), coordenadas), shape=forma)
+        return self._promediar()
+
+    def _promediar(self):
+        """Media de cada celda a partir de sumas y cuentas (misma estructura)."""
+        for matriz in (self._sumas, self._cuentas):
+            matriz.eliminate_zeros()
+            matriz.sort_indices()
+        media = self._sumas.copy()
+        media.data /= self._cuentas.data
+        return media
+
+    def _centrar(self) -> None:
+        """Centra las puntuaciones por la media de cada usuario."""
+        import numpy as np
+
+        matriz = self._puntuaciones
+        cuenta = np.diff(matriz.indptr)
+        self._medias = np.asarray(matriz.sum(axis=1)).ravel() / np.maximum(cuenta, 1)
+        self._centradas = matriz.copy()
+        self._centradas.data -= np.repeat(self._medias, cuenta).astype(np.float32)
+
+    def _calcular_vecinos(self, peliculas: Optional[Sequence[int]] = None) -> None:
+        """Vecinos (similitud > 0) de las peliculas indicadas o de todas."""
+        import numpy as np
+        from scipy import sparse
+
+        columnas = self._centradas.T.tocsr()
+        normas = np.sqrt(np.asarray(columnas.multiply(columnas).sum(axis=1)).ravel())
+        columnas = sparse.diags(1 / np.where(normas > 0, normas, 1)).dot(columnas).tocsr()
+
+        faltan = len(self._nombres) - len(self._vecinos)
+        self._vecinos.extend([np.empty(0, dtype=np.int64)] * faltan)
+        self._similitudes.extend([np.empty(0, dtype=np.float32)] * faltan)
+        for fila, indices, similitudes in vecinos_mas_cercanos(columnas, self.k, self.tamaño_chunk, peliculas):
+            positivas = similitudes > 0
+            self._vecinos[fila] = indices[positivas]
+            self._similitudes[fila] = similitudes[positivas].astype(np.float32)
+
+    def entrenar(self) -> Dict[str, int]:
+        """
+        Entrena el modelo completo desde la coleccion.
+
+        Returns:
+            Diccionario con usuarios, peliculas y puntuaciones
+        """
+        with self._lock:
+            self._puntuaciones = self.extraer_matriz()
+            self._vecinos, self._similitudes = [], []
+            self._pendientes.clear()
+            self._afectadas.clear()
+            self._eliminadas.clear()
+            self._cache.clear()
+            self._centrar()
+            self._calcular_vecinos()
+            resumen = {
+                "usuarios": self._puntuaciones.shape[0],
+                "peliculas": self._puntuaciones.shape[1],
+                "puntuaciones": self._puntuaciones.nnz
+            }
+        logger.info("Modelo colaborativo entrenado: %s", resumen)
+        return resumen
+
+    # ==================== ACTUALIZACION INCREMENTAL ====================
+
+    def aplicar_evento(self, evento: str, datos: Dict[str, Any]) -> None:
+        """
+        Observador para CRUDOperations.registrar_observador.
+
+        Los eventos anteriores al primer entrenamiento se ignoran (el
+        entrenamiento ya los lee de la coleccion).
+        """
+        with self._lock:
+            if self._puntuaciones is None:
+                return
+            if evento == "reviews":
+                reviews = datos["reviews"]
+            elif evento == "insertar":
+                reviews = {p["titulo"]: p["reviews"] for p in datos["peliculas"] if p.get("reviews")}
+            elif evento == "archivar_reviews":
+                # Fuera de la coleccion principal, como en un entrenamiento
+                for titulo, lista in datos["reviews"].items():
+                    columna = self._indice(self._titulos, titulo, self._nombres)
+                    for r in lista:
+                        fila = self._indice(self._usuarios, r["usuario"])
+                        celda = self._pendientes.setdefault((fila, columna), [0.0, 0, False])
+                        celda[0] -= float(r["puntuacion"])
+                        celda[1] -= 1
+                        self._afectadas.add(columna)
+                return
+            elif evento == "eliminar_review":
+                # Se eliminan todas las reviews del usuario en la pelicula
+                for titulo, usuarios in datos["reviews"].items():
+                    columna = self._indice(self._titulos, titulo, self._nombres)
+                    for usuario in usuarios:
+                        fila = self._indice(self._usuarios, usuario)
+                        self._pendientes[(fila, columna)] = [0.0, 0, True]
+                        self._afectadas.add(columna)
+                return
+            elif evento == "eliminar":
+                self._eliminadas.update(self._titulos[p["titulo"]] for p in datos["peliculas"] if p["titulo"] in self._titulos)
+                self._cache.clear()
+                return
+            else:
+                return
+
+            for titulo, lista in reviews.items():
+                columna = self._indice(self._titulos, titulo, self._nombres)
+                self._eliminadas.discard(columna)
+                for r in lista:
+                    fila = self._indice(self._usuarios, r["usuario"])
+                    celda = self._pendientes.setdefault((fila, columna), [0.0, 0, False])
+                    celda[0] += float(r["puntuacion"])
+                    celda[1] += 1
+                    self._afectadas.add(columna)
+
+    def refrescar(self) -> int:
+        """
+        Aplica las reviews pendientes sin reentrenar.
+
+        Suma las reviews nuevas a las sumas y cuentas de cada celda (o
+        vacia las de reviews eliminadas), vuelve a promediar y centrar la
+        matriz (coste lineal en el numero de reviews) y recalcula los
+        vecinos de las peliculas afectadas. Al cambiar la media de un usuario cambian
+        todas las columnas que valoro, y como la similitud es simetrica
+        tambien cambian las filas de cualquier pelicula que comparta
+        usuarios con ellas; se recalculan todas para que el resultado sea
+        el de un entrenamiento completo (en matrices densas, todo el
+        modelo).
+
+        Returns:
+            Numero de peliculas recalculadas
+        """
+        import numpy as np
+        from scipy import sparse
+
+        with self._lock:
+            if not self._pendientes:
+                return 0
+            forma = (len(self._usuarios), len(self._titulos))
+            self._sumas.resize(forma)
+            self._cuentas.resize(forma)
+
+            filas, columnas = (np.asarray(c) for c in zip(*self._pendientes))
+            cambios = list(self._pendientes.values())
+            sumas = np.array([c[0] for c in cambios], dtype=np.float32)
+            cuentas = np.array([c[1] for c in cambios], dtype=np.float32)
+            vaciar = np.array([c[2] for c in cambios], dtype=np.float32)
+            mascara = sparse.csr_matrix((vaciar, (filas, columnas)), shape=forma)
+            self._sumas = (self._sumas - self._sumas.multiply(mascara)
+                           + sparse.csr_matrix((sumas, (filas, columnas)), shape=forma)).tocsr()
+            self._cuentas = (self._cuentas - self._cuentas.multiply(mascara)
+                             + sparse.csr_matrix((cuentas, (filas, columnas)), shape=forma)).tocsr()
+            self._puntuaciones = self._promediar()
+
+            # Columnas modificadas: las de las celdas cambiadas y todas las
+            # de sus usuarios (nueva media); filas a recalcular: ademas,
+            # las peliculas que comparten algun usuario con ellas
+            por_columnas = self._puntuaciones.tocsc()
+            modificadas = np.union1d(
+                np.fromiter(self._afectadas, dtype=np.int64),
+                self._puntuaciones[np.unique(filas)].indices
+            )
+            usuarios = np.unique(por_columnas[:, modificadas].indices)
+            afectadas = np.union1d(modificadas, self._puntuaciones[usuarios].indices)
+
+            self._pendientes.clear()
+            self._afectadas.clear()
+            self._cache.clear()
+            self._centrar()
+            self._calcular_vecinos(None if len(afectadas) == len(self._nombres) else afectadas.tolist())
+
+        logger.info("Modelo colaborativo: %d peliculas recalculadas", len(afectadas), extra=MUESTREO)
+        return len(afectadas)
+
+    # ==================== RECOMENDACION ====================
+
+    def recomendar(self, usuario: str, n: int = 10) -> List[Dict[str, Any]]:
+        """
+        Peliculas no valoradas con mayor puntuacion estimada para un usuario.
+
+        Entrena el modelo si aun no existe y aplica antes las reviews
+        pendientes.
+
+        Args:
+            usuario: Nombre de usuario de las reviews
+            n: Numero de recomendaciones
+
+        Returns:
+            Lista de {"titulo", "puntuacion_estimada"}; vacia si el
+            usuario no tiene reviews
+        """
+        import numpy as np
+
+        with self._lock:
+            if self._puntuaciones is None:
+                self.entrenar()
+            self.refrescar()
+            if (usuario, n) in self._cache:
+                return self._cache[(usuario, n)]
+            fila = self._usuarios.get(usuario)
+            if fila is None or fila >= self._centradas.shape[0]:
+                return []
+
+            valoradas = self._centradas[fila]
+            if valoradas.nnz == 0:
+                return []
+            vecinos = [self._vecinos[j] for j in valoradas.indices]
+            indices = np.concatenate(vecinos)
+            similitudes = np.concatenate([self._similitudes[j] for j in valoradas.indices])
+            pesos = np.repeat(valoradas.data, [len(v) for v in vecinos])
+
+            total = len(self._nombres)
+            numerador = np.bincount(indices, weights=pesos * similitudes, minlength=total)
+            denominador = np.bincount(indices, weights=similitudes, minlength=total)
+            candidatas = np.flatnonzero(denominador > 0)
+            excluidas = np.concatenate([valoradas.indices, np.fromiter(self._eliminadas, dtype=np.int64)])
+            candidatas = np.setdiff1d(candidatas, excluidas, assume_unique=False)
+
+            estimadas = self._medias[fila] + numerador[candidatas] / denominador[candidatas]
+            mejores = candidatas[np.argsort(-estimadas, kind="stable")[:n]]
+            resultado = [
+                {"titulo": self._nombres[j], "puntuacion_estimada": round(float(self._medias[fila] + numerador[j] / denominador[j]), 2)}
+                for j in mejores
+            ]
+            self._cache[(usuario, n)] = resultado
+            return resultado
+
+
+if __name__ == "__main__":
+    from config import SIMILARES_COLLECTION
+    from database import DatabaseManager
+
+    db_manager = DatabaseManager()
+    if not db_manager.conectar():
+        sys.exit(1)
+    try:
+        recomendador = RecomendadorContenido(db_manager.collection, db_manager.db[SIMILARES_COLLECTION])
+        recomendador.crear_indices()
+        recomendador.calcular(*[int(a) for a in sys.argv[1:2]])
+    finally:
+        db_manager.desconectar()
@@ -0,0 +1,430 @@
+"""
+Replica local de solo lectura del catalogo de peliculas.
+
+Guarda una copia de la coleccion en SQLite (en memoria o en fichero) con
+indices por titulo, director, año, rating y genero, y la mantiene al dia
+con un hilo que sigue el change stream de la coleccion. El resume token
+se guarda junto a los datos, de modo que una replica en fichero continua
+donde lo dejo al reiniciarse.
+
+CRUDOperations lee de la replica mientras este vigente y el filtro sea
+traducible a SQL; en otro caso consulta MongoDB. La replica esta vigente
+si esta al dia con el servidor dentro del retraso maximo: el hilo ha
+vaciado el change stream hace poco o ha aplicado un cambio reciente
+(segun su wallTime/clusterTime), y si ya incluye las escrituras hechas
+por este proceso (leer lo escrito).
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import json_util
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+
+from cambios import momento_evento
+from config import (
+    MUESTREO,
+    REPLICA_AWAIT_MS,
+    REPLICA_MAX_STALENESS,
+    REPLICA_PATH,
+    REPLICA_RETRY_SECONDS,
+    get_logger,
+)
+
+logger = get_logger(__name__)
+
+# Campo de MongoDB -> columna indexada de la replica
+COLUMNAS = ("titulo", "director", "año", "rating", "id", "disponible")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS peliculas (
+    oid TEXT PRIMARY KEY,
+    titulo TEXT, director TEXT, año INTEGER, rating REAL, id TEXT, disponible INTEGER,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS generos (oid TEXT NOT NULL, genero TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+CREATE INDEX IF NOT EXISTS idx_titulo ON peliculas (titulo);
+CREATE INDEX IF NOT EXISTS idx_director ON peliculas (director);
+CREATE INDEX IF NOT EXISTS idx_año ON peliculas (año);
+CREATE INDEX IF NOT EXISTS idx_rating ON peliculas (rating);
+CREATE INDEX IF NOT EXISTS idx_generos ON generos (genero, oid);
+CREATE INDEX IF NOT EXISTS idx_generos_oid ON generos (oid);
+"""
+
+_COMPARADORES = {"$eq": "=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+# Documentos por transaccion al cargar la instantanea
+_TAMAÑO_LOTE = 1000
+
+
+class _Reiniciar(Exception):
+    """El change stream no puede continuar; hay que recargar la instantanea."""
+
+
+@lru_cache(maxsize=256)
+def _compilar(patron: str) -> "re.Pattern":
+    return re.compile(patron)
+
+
+def _regexp(patron: str, valor: Any) -> bool:
+    return valor is not None and _compilar(patron).search(str(valor)) is not None
+
+
+def _condicion(campo: str, valor: Any, parametros: List[Any]) -> Optional[str]:
+    """Traduce la condicion de un campo a SQL (None si no es traducible)."""
+    if campo == "generos":
+        if isinstance(valor, dict):
+            if set(valor) == {"$all"}:
+                generos = list(valor["$all"])
+            elif set(valor) == {"$in"}:
+                parametros.extend(valor["$in"])
+                marcas = ", ".join("?" * len(valor["$in"]))
+                return f"EXISTS (SELECT 1 FROM generos g WHERE g.oid = p.oid AND g.genero IN ({marcas}))"
+            else:
+                return None
+        else:
+            generos = [valor]
+        parametros.extend(generos)
+        return " AND ".join(
+            "EXISTS (SELECT 1 FROM generos g WHERE g.oid = p.oid AND g.genero = ?)" for _ in generos
+        ) or "1"
+
+    if campo not in COLUMNAS:
+        return None
+    columna = f'p."{campo}"'
+    if valor is None:
+        # En MongoDB tambien coincide con campos ausentes
+        return None
+    if not isinstance(valor, dict):
+        parametros.append(valor)
+        return f"{columna} = ?"
+
+    partes = []
+    for operador, operando in valor.items():
+        if operador in _COMPARADORES:
+            parametros.append(operando)
+            partes.append(f"{columna} {_COMPARADORES[operador]} ?")
+        elif operador == "$in":
+            parametros.extend(operando)
+            partes.append(f"{columna} IN ({', '.join('?' * len(operando))})")
+        elif operador == "$regex":
+            opciones = valor.get("$options", "")
+            if set(opciones) - {"i"}:
+                return None
+            parametros.append(("(?i)" if "i" in opciones else "") + operando)
+            partes.append(f"{columna} REGEXP ?")
+        elif operador != "$options":
+            return None
+    return " AND ".join(partes) or "1"
+
+
+def traducir_filtro(filtro: Dict[str, Any], parametros: List[Any]) -> Optional[str]:
+    """
+    Traduce un filtro de MongoDB a una clausula WHERE.
+
+    Admite igualdad, comparaciones, $in, $regex (opcion i), $all sobre
+    generos y $and; cualquier otro operador devuelve None.
+    """
+    partes = []
+    for campo, valor in filtro.items():
+        if campo == "$and":
+            sub = [traducir_filtro(f, parametros) for f in valor]
+            if any(s is None for s in sub):
+                return None
+            partes.extend(sub)
+        else:
+            condicion = _condicion(campo, valor, parametros)
+            if condicion is None:
+                return None
+            partes.append(condicion)
+    return " AND ".join(f"({p})" for p in partes) or "1"
+
+
+def _proyectar(doc: Dict[str, Any], proyeccion: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Aplica una proyeccion de campos de primer nivel."""
+    if not proyeccion:
+        return doc
+    campos = {c: v for c, v in proyeccion.items() if c != "_id"}
+    if any("." in c or isinstance(v, dict) for c, v in campos.items()):
+        raise ValueError("proyeccion no soportada")
+    incluir_id = bool(proyeccion.get("_id", 1))
+    if campos and all(campos.values()):
+        resultado = {c: doc[c] for c in campos if c in doc}
+        if incluir_id and "_id" in doc:
+            resultado["_id"] = doc["_id"]
+        return resultado
+    if any(campos.values()):
+        raise ValueError("proyeccion mixta")
+    resultado = {c: v for c, v in doc.items() if c not in campos}
+    if not incluir_id:
+        resultado.pop("_id", None)
+    return resultado
+
+
+class ReplicaLocal:
+    """
+    Copia local del catalogo mantenida con un change stream.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        ruta: str = REPLICA_PATH,
+        max_retraso: float = REPLICA_MAX_STALENESS
+    ):
+        """
+        Inicializa la replica (sin empezar a seguir cambios).
+
+        Args:
+            collection: Coleccion de peliculas
+            ruta: Fichero SQLite (":memory:" para una replica volatil)
+            max_retraso: Retraso maximo (segundos) respecto al servidor
+                con el que la replica sirve lecturas
+        """
+        self.collection = collection
+        self.max_retraso = max_retraso
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._conn.create_function("REGEXP", 2, _regexp, deterministic=True)
+        self._conn.executescript(_ESQUEMA)
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        # Momentos (time.time) hasta los que la replica esta al dia: por
+        # un sondeo vacio del stream y por la fecha del ultimo cambio
+        self._confirmado = float("-inf")
+        self._al_dia = float("-inf")
+        self._escritura_local = float("-inf")
+        self.estadisticas = {"locales": 0, "remotas": 0, "cambios": 0, "recargas": 0}
+
+    # ==================== CICLO DE VIDA ====================
+
+    def iniciar(self) -> None:
+        """Arranca el hilo que sigue el change stream."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="replica-local", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: Optional[float] = None) -> None:
+        """Detiene el hilo y cierra la base de datos local."""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ReplicaLocal":
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.detener()
+
+    def vigente(self) -> bool:
+        """
+        True si la replica puede servir lecturas.
+
+        Exige estar al dia dentro del retraso maximo y haber confirmado,
+        tras la ultima escritura local, que no quedan cambios pendientes.
+        """
+        return (
+            self._hilo is not None and self._hilo.is_alive()
+            and self.retraso() <= self.max_retraso
+            and self._confirmado > self._escritura_local
+        )
+
+    def retraso(self) -> float:
+        """Segundos de retraso respecto al servidor (infinito antes de sincronizar)."""
+        return time.time() - self._al_dia
+
+    def registrar_escritura(self) -> None:
+        """
+        Marca una escritura de este proceso ya confirmada por el servidor.
+
+        Hasta que el hilo vacie el change stream despues de este momento
+        las lecturas van a MongoDB, de modo que se lee lo escrito.
+        """
+        self._escritura_local = time.time()
+
+    # ==================== SINCRONIZACION ====================
+
+    def _bucle(self) -> None:
+        while not self._detener.is_set():
+            try:
+                self._seguir()
+            except _Reiniciar as e:
+                logger.warning("Replica local: %s; recargando", e)
+                self._guardar_meta("resume_token", None)
+            except PyMongoError as e:
+                logger.error("Replica local sin change stream: %s", e)
+                self._detener.wait(REPLICA_RETRY_SECONDS)
+            except sqlite3.Error:
+                logger.exception("Error en la base de datos local de la replica")
+                self._detener.wait(REPLICA_RETRY_SECONDS)
+
+    def _seguir(self) -> None:
+        """Abre el change stream (reanudando si hay token) y aplica los cambios."""
+        opciones = {"full_document": "updateLookup", "max_await_time_ms": REPLICA_AWAIT_MS}
+        token = self._leer_meta("resume_token")
+        stream = None
+        if token is not None:
+            try:
+                stream = self.collection.watch(resume_after=token, **opciones)
+            except OperationFailure as e:
+                logger.warning("Resume token no valido (%s); recargando", e)
+        if stream is None:
+            # El stream se abre antes de leer la instantanea para no perder
+            # cambios concurrentes; aplicarlos de nuevo es idempotente.
+            stream = self.collection.watch(**opciones)
+            self._cargar_instantanea()
+            self._guardar_meta("resume_token", stream.resume_token)
+
+        with stream:
+            while not self._detener.is_set() and stream.alive:
+                # Un sondeo vacio confirma los cambios anteriores a su inicio;
+                # mientras se recupera un atraso, la fecha del cambio aplicado
+                # indica lo desfasada que esta la replica
+                inicio = time.time()
+                cambio = stream.try_next()
+                if cambio is not None:
+                    self._aplicar(cambio, stream.resume_token)
+                    momento = momento_evento(cambio)
+                    if momento is not None:
+                        self._al_dia = max(self._al_dia, momento.timestamp())
+                else:
+                    self._confirmado = inicio
+                    self._al_dia = max(self._al_dia, inicio)
+                    if stream.resume_token is not None:
+                        self._guardar_meta("resume_token", stream.resume_token)
+
+    def _cargar_instantanea(self) -> int:
+        """Sustituye el contenido local por la coleccion completa."""
+        total = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM peliculas")
+            self._conn.execute("DELETE FROM generos")
+            lote = []
+            for doc in self.collection.find({}):
+                lote.append(doc)
+                if len(lote) >= _TAMAÑO_LOTE:
+                    total += self._guardar_documentos(lote)
+                    lote = []
+            total += self._guardar_documentos(lote)
+            self._conn.execute("COMMIT")
+        self.estadisticas["recargas"] += 1
+        logger.info("Replica local cargada: %d peliculas", total)
+        return total
+
+    def _guardar_documentos(self, documentos: Sequence[Dict[str, Any]]) -> int:
+        """Inserta o sustituye documentos (dentro de una transaccion abierta)."""
+        oids = [(str(d["_id"]),) for d in documentos]
+        self._conn.executemany("DELETE FROM generos WHERE oid = ?", oids)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO peliculas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    str(d["_id"]), d.get("titulo"), d.get("director"), d.get("año"), d.get("rating"),
+                    d.get("id"), d.get("disponible"), json_util.dumps(d)
+                )
+                for d in documentos
+            ]
+        )
+        self._conn.executemany(
+            "INSERT INTO generos VALUES (?, ?)",
+            [(str(d["_id"]), g) for d in documentos for g in set(d.get("generos") or [])]
+        )
+        return len(documentos)
+
+    def _aplicar(self, cambio: Dict[str, Any], token: Any) -> None:
+        """Aplica un evento del change stream y guarda su token en la misma transaccion."""
+        operacion = cambio["operationType"]
+        if operacion in ("drop", "rename", "dropDatabase", "invalidate"):
+            raise _Reiniciar(f"evento {operacion}")
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            documento = cambio.get("fullDocument")
+            if operacion in ("insert", "replace", "update") and documento is not None:
+                self._guardar_documentos([documento])
+            elif "documentKey" in cambio:
+                oid = str(cambio["documentKey"]["_id"])
+                self._conn.execute("DELETE FROM peliculas WHERE oid = ?", (oid,))
+                self._conn.execute("DELETE FROM generos WHERE oid = ?", (oid,))
+            self._escribir_meta("resume_token", token)
+            self._conn.execute("COMMIT")
+        self.estadisticas["cambios"] += 1
+        logger.debug("Replica local: %s aplicado", operacion)
+
+    def _leer_meta(self, clave: str) -> Any:
+        with self._lock:
+            fila = self._conn.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return json_util.loads(fila[0]) if fila and fila[0] is not None else None
+
+    def _escribir_meta(self, clave: str, valor: Any) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            (clave, None if valor is None else json_util.dumps(valor))
+        )
+
+    def _guardar_meta(self, clave: str, valor: Any) -> None:
+        with self._lock:
+            self._escribir_meta(clave, valor)
+
+    # ==================== LECTURA ====================
+
+    def find(
+        self,
+        filtro: Optional[Dict[str, Any]] = None,
+        proyeccion: Optional[Dict[str, Any]] = None,
+        limite: int = 0,
+        orden: Optional[List[Tuple[str, int]]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Equivalente local de find.
+
+        Returns:
+            Documentos encontrados, o None si la replica no esta vigente o
+            el filtro, la proyeccion o el orden no se pueden resolver en
+            local (el llamador debe consultar MongoDB)
+        """
+        if not self.vigente():
+            self.estadisticas["remotas"] += 1
+            return None
+        parametros: List[Any] = []
+        where = traducir_filtro(filtro or {}, parametros)
+        if where is None or any(campo not in COLUMNAS for campo, _ in orden or []):
+            self.estadisticas["remotas"] += 1
+            return None
+
+        sql = f"SELECT doc FROM peliculas p WHERE {where}"
+        if orden:
+            # SQLite ordena NULL como el menor valor, igual que MongoDB
+            sql += " ORDER BY " + ", ".join(
+                f'p."{campo}" {"DESC" if direccion < 0 else "ASC"}' for campo, direccion in orden
+            )
+        if limite:
+            sql += f" LIMIT {int(limite)}"
+
+        with self._lock:
+            filas = self._conn.execute(sql, parametros).fetchall()
+        try:
+            resultado = [_proyectar(json_util.loads(doc), proyeccion) for doc, in filas]
+        except ValueError:
+            self.estadisticas["remotas"] += 1
+            return None
+        self.estadisticas["locales"] += 1
+        logger.debug("Lectura local: %d documentos", len(resultado), extra=MUESTREO)
+        return resultado
+
+    def contar(self) -> int:
+        """Numero de peliculas en la replica."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM peliculas").fetchone()[0]
@@ -0,0 +1,343 @@
+"""
+Cola de ingesta de reviews con escritura diferida (write-behind).
+
+Las reviews se encolan en memoria y un hilo de fondo las agrupa por
+pelicula, escribiendo un solo $push con $each por pelicula cuando se
+alcanza el tamaño de lote o el intervalo de tiempo. Opcionalmente cada
+review se registra antes en un write-ahead log local para poder
+reprocesarla tras una caida. Las reviews de una pelicula que falla en
+varios volcados seguidos se apartan al fichero dead-letter.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from config import (
+    DEAD_LETTER_PATH,
+    REVIEW_QUEUE_BATCH_SIZE,
+    REVIEW_QUEUE_CAPACITY,
+    REVIEW_QUEUE_FLUSH_SECONDS,
+    REVIEW_QUEUE_MAX_ATTEMPTS,
+    get_logger,
+)
+from crud import CRUDOperations, nueva_review_doc, titulos_fallidos
+from validator import escribir_rechazados
+
+logger = get_logger(__name__)
+
+# Entrada de la cola: (secuencia, titulo, review)
+Entrada = Tuple[int, str, Dict[str, Any]]
+
+
+class ColaReviews:
+    """
+    Cola acotada de reviews con volcado por lotes en segundo plano.
+
+    Uso:
+        with ColaReviews(crud, ruta_wal="reviews.wal") as cola:
+            cola.encolar("Matrix", "neo", 10, "Imprescindible")
+    """
+
+    def __init__(
+        self,
+        crud: CRUDOperations,
+        capacidad: int = REVIEW_QUEUE_CAPACITY,
+        tamaño_lote: int = REVIEW_QUEUE_BATCH_SIZE,
+        intervalo: float = REVIEW_QUEUE_FLUSH_SECONDS,
+        ruta_wal: Optional[str] = None,
+        fsync: bool = False,
+        max_intentos: int = REVIEW_QUEUE_MAX_ATTEMPTS,
+        ruta_rechazados: str = DEAD_LETTER_PATH
+    ):
+        """
+        Crea la cola, arranca el hilo de volcado y reencola lo pendiente del WAL.
+
+        Args:
+            crud: Operaciones CRUD usadas para escribir los lotes
+            capacidad: Maximo de reviews pendientes (al llenarse, encolar bloquea)
+            tamaño_lote: Reviews que fuerzan un volcado inmediato
+            intervalo: Segundos maximos entre volcados
+            ruta_wal: Fichero write-ahead log (None para desactivarlo)
+            fsync: Si True, fuerza fsync del WAL en cada review
+            max_intentos: Volcados fallidos seguidos de una pelicula antes
+                de apartar sus reviews
+            ruta_rechazados: Fichero dead-letter para esas reviews
+        """
+        self.crud = crud
+        self.tamaño_lote = tamaño_lote
+        self.intervalo = intervalo
+        self.ruta_wal = ruta_wal
+        self.fsync = fsync
+        self.max_intentos = max(1, max_intentos)
+        self.ruta_rechazados = ruta_rechazados
+        self.estadisticas = {"encoladas": 0, "escritas": 0, "lotes": 0, "errores": 0, "rechazadas": 0}
+
+        self._cola: "queue.Queue[Entrada]" = queue.Queue(maxsize=capacidad)
+        self._lock = threading.Lock()
+        # Lock propio: encolar retiene _lock mientras espera hueco en la cola
+        self._lock_estadisticas = threading.Lock()
+        self._detener = threading.Event()
+        self._seq = 0
+        self._seq_escrito = 0
+        self._wal = None
+        # Titulo -> volcados fallidos seguidos (solo los usa el hilo de volcado)
+        self._intentos: Dict[str, int] = {}
+
+        # El checkpoint se lee antes de que el hilo pueda volcar, y el hilo
+        # arranca antes de reencolar: un WAL con mas entradas que la
+        # capacidad bloquearia put sin nadie que vaciara la cola
+        if ruta_wal:
+            self._seq_escrito = self._leer_checkpoint()
+        self._hilo = threading.Thread(target=self._bucle, name="cola-reviews", daemon=True)
+        self._hilo.start()
+        if ruta_wal:
+            self._recuperar_wal()
+            self._wal = open(ruta_wal, "a", encoding="utf-8")
+
+    def __enter__(self) -> "ColaReviews":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+    # ==================== PRODUCTOR ====================
+
+    def encolar(
+        self,
+        titulo: str,
+        usuario: str,
+        puntuacion: int,
+        comentario: str,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Encola una review para escritura diferida.
+
+        Si la cola esta llena, espera hasta `timeout` segundos
+        (indefinidamente si es None) para aplicar backpressure.
+
+        Returns:
+            True si la review quedo encolada
+        """
+        if self._detener.is_set():
+            raise RuntimeError("La cola de reviews esta cerrada")
+        if not 1 <= puntuacion <= 10:
+            logger.error("Puntuacion debe estar entre 1 y 10")
+            return False
+
+        review = nueva_review_doc(usuario, puntuacion, comentario)
+        with self._lock:
+            entrada = (self._seq + 1, titulo, review)
+            try:
+                self._cola.put(entrada, timeout=timeout)
+            except queue.Full:
+                logger.warning("Cola de reviews llena; review de %s descartada", usuario)
+                return False
+            self._seq += 1
+            if self._wal is not None:
+                self._escribir_wal(entrada)
+        self._contar(encoladas=1)
+        return True
+
+    def pendientes(self) -> int:
+        """Reviews encoladas aun no escritas."""
+        return self._cola.qsize()
+
+    def cerrar(self, timeout: Optional[float] = None) -> None:
+        """
+        Vuelca todas las reviews pendientes y detiene el hilo.
+
+        Args:
+            timeout: Segundos maximos de espera (None = sin limite)
+        """
+        self._detener.set()
+        self._hilo.join(timeout)
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        logger.info("Cola de reviews cerrada: %s", self.estadisticas)
+
+    # ==================== CONSUMIDOR ====================
+
+    def _bucle(self) -> None:
+        """Acumula entradas y las vuelca por tamaño o por tiempo."""
+        lote: List[Entrada] = []
+        limite = time.monotonic() + self.intervalo
+        fallo = False
+
+        while True:
+            if len(lote) < self.tamaño_lote:
+                try:
+                    lote.append(self._cola.get(timeout=max(0.0, min(limite - time.monotonic(), 0.1))))
+                    while len(lote) < self.tamaño_lote:
+                        lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    pass
+            else:
+                # Lote lleno tras un fallo: esperar al siguiente intento
+                time.sleep(max(0.0, min(limite - time.monotonic(), 0.1)))
+
+            deteniendo = self._detener.is_set()
+            if not lote:
+                limite = time.monotonic() + self.intervalo
+            elif deteniendo or time.monotonic() >= limite or (len(lote) >= self.tamaño_lote and not fallo):
+                lote = self._volcar(lote)
+                fallo = bool(lote)
+                if fallo and deteniendo:
+                    logger.error("%d reviews sin escribir al cerrar (quedan en el WAL si esta activo)", len(lote))
+                    lote = []
+                limite = time.monotonic() + self.intervalo
+
+            if deteniendo and not lote and self._cola.empty():
+                return
+
+    def _volcar(self, lote: List[Entrada]) -> List[Entrada]:
+        """
+        Escribe un lote agrupado por pelicula.
+
+        Returns:
+            Entradas que quedan por escribir. Si el bulk_write falla solo
+            en algunas peliculas, se devuelven unicamente las de esas
+            peliculas: reenviar las demas duplicaria sus reviews y
+            contadores. Las de peliculas que agotan max_intentos van al
+            dead-letter y no se devuelven.
+        """
+        por_titulo: Dict[str, List[Dict[str, Any]]] = {}
+        for _, titulo, review in lote:
+            por_titulo.setdefault(titulo, []).append(review)
+
+        fallidos: Set[str] = set()
+        try:
+            self.crud.añadir_reviews_lote(por_titulo)
+            restantes: List[Entrada] = []
+        except BulkWriteError as e:
+            fallidos = titulos_fallidos(e, list(por_titulo))
+            logger.error("Error al volcar reviews de %d peliculas: %s", len(fallidos), e.details.get("writeErrors"))
+            restantes = self._apartar_agotadas([entrada for entrada in lote if entrada[1] in fallidos], e)
+        except PyMongoError as e:
+            # Fallo del lote entero (red, servidor): se reintenta sin limite
+            self._contar(errores=1)
+            logger.error("Error al volcar %d reviews: %s", len(lote), e)
+            return lote
+
+        for titulo in por_titulo.keys() - fallidos:
+            self._intentos.pop(titulo, None)
+        escritas = sum(1 for entrada in lote if entrada[1] not in fallidos)
+        if fallidos:
+            self._contar(escritas=escritas, errores=1)
+            if len(restantes) == len(lote):
+                return restantes
+        else:
+            self._contar(escritas=escritas, lotes=1)
+
+        # El checkpoint no puede pasar de la primera entrada pendiente; tras
+        # una caida se reprocesan las escritas despues de ella
+        self._seq_escrito = restantes[0][0] - 1 if restantes else lote[-1][0]
+        if self.ruta_wal:
+            self._checkpoint()
+        return restantes
+
+    def _apartar_agotadas(self, restantes: List[Entrada], error: BulkWriteError) -> List[Entrada]:
+        """
+        Cuenta un intento fallido por pelicula y envia al dead-letter las
+        reviews de las que llegan a max_intentos.
+
+        Returns:
+            Entradas que se siguen reintentando
+        """
+        agotados = set()
+        for titulo in {entrada[1] for entrada in restantes}:
+            self._intentos[titulo] = self._intentos.get(titulo, 0) + 1
+            if self._intentos[titulo] >= self.max_intentos:
+                agotados.add(titulo)
+                del self._intentos[titulo]
+        if not agotados:
+            return restantes
+
+        errores = [err.get("errmsg", "") for err in error.details.get("writeErrors", [])]
+        apartadas = [
+            ({"titulo": titulo, "review": review}, [f"{self.max_intentos} intentos fallidos"] + errores)
+            for _, titulo, review in restantes if titulo in agotados
+        ]
+        escribir_rechazados(apartadas, self.ruta_rechazados)
+        self._contar(rechazadas=len(apartadas))
+        return [entrada for entrada in restantes if entrada[1] not in agotados]
+
+    def _contar(self, **incrementos: int) -> None:
+        """Actualiza las estadisticas (productor y consumidor en hilos distintos)."""
+        with self._lock_estadisticas:
+            for clave, valor in incrementos.items():
+                self.estadisticas[clave] += valor
+
+    # ==================== WRITE-AHEAD LOG ====================
+
+    def _escribir_wal(self, entrada: Entrada) -> None:
+        """Registra una entrada en el WAL (llamado con el lock tomado)."""
+        seq, titulo, review = entrada
+        linea = {"seq": seq, "titulo": titulo, "review": {**review, "createdAt": review["createdAt"].isoformat()}}
+        self._wal.write(json.dumps(linea, ensure_ascii=False) + "\n")
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+
+    def _checkpoint(self) -> None:
+        """Guarda la ultima secuencia escrita y trunca el WAL si no queda nada."""
+        ruta_ckpt = self.ruta_wal + ".ckpt"
+        temporal = ruta_ckpt + ".tmp"
+        with open(temporal, "w") as f:
+            f.write(str(self._seq_escrito))
+        os.replace(temporal, ruta_ckpt)
+
+        if self._cola.empty() and self._lock.acquire(blocking=False):
+            try:
+                if self._wal is not None and self._seq == self._seq_escrito:
+                    self._wal.seek(0)
+                    self._wal.truncate()
+            finally:
+                self._lock.release()
+
+    def _leer_checkpoint(self) -> int:
+        """Ultima secuencia escrita segun el checkpoint del WAL."""
+        ruta_ckpt = self.ruta_wal + ".ckpt"
+        if not os.path.exists(ruta_ckpt):
+            return 0
+        with open(ruta_ckpt) as f:
+            return int(f.read().strip() or 0)
+
+    def _recuperar_wal(self) -> None:
+        """
+        Reencola las entradas del WAL posteriores al ultimo checkpoint.
+
+        Se llama con el hilo de volcado en marcha, que vacia la cola
+        mientras se reencola.
+        """
+        escrito = self._seq_escrito
+        recuperadas = 0
+        ultimo = escrito
+        if os.path.exists(self.ruta_wal):
+            with open(self.ruta_wal, encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        datos = json.loads(linea)
+                    except ValueError:
+                        logger.warning("Linea corrupta en el WAL ignorada")
+                        continue
+                    ultimo = max(ultimo, datos["seq"])
+                    if datos["seq"] <= escrito:
+                        continue
+                    review = datos["review"]
+                    review["createdAt"] = datetime.fromisoformat(review["createdAt"])
+                    self._cola.put((datos["seq"], datos["titulo"], review))
+                    recuperadas += 1
+
+        with self._lock:
+            self._seq = ultimo
+        if recuperadas:
+            logger.warning("%d reviews recuperadas del WAL", recuperadas)
@@ -0,0 +1,189 @@
+"""
+Acceso a las reviews por usuario.
+
+Las reviews estan embebidas en cada pelicula, asi que "todas las reviews
+de un usuario" obliga a recorrer las peliculas. Este servicio mantiene
+una copia desnormalizada (un documento por review) indexada por usuario,
+actualizada con los eventos de escritura de CRUDOperations, y ofrece el
+historial paginado y el resumen de cada usuario.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.collection import Collection
+
+from config import USER_REVIEWS_PAGE_SIZE, get_logger
+
+logger = get_logger(__name__)
+
+# Documentos por insert_many al reconstruir
+_TAMAÑO_LOTE = 1000
+
+_PROYECCION = {"_id": 0, "usuario": 0}
+
+
+def _documentos(titulo: str, reviews: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copias desnormalizadas de las reviews de una pelicula (no modifica las originales)."""
+    return [{**r, "titulo": titulo} for r in reviews if r.get("usuario")]
+
+
+class ReviewsUsuarioService:
+    """
+    Indice de reviews por usuario mantenido en escritura.
+    """
+
+    def __init__(self, collection: Collection, reviews_usuario: Collection):
+        """
+        Inicializa el servicio.
+
+        Args:
+            collection: Coleccion de peliculas
+            reviews_usuario: Coleccion con una review por documento
+        """
+        self.collection = collection
+        self.reviews_usuario = reviews_usuario
+
+    def crear_indices(self) -> None:
+        """Indices de la coleccion desnormalizada."""
+        self.reviews_usuario.create_index(
+            [("usuario", ASCENDING), ("fecha", DESCENDING), ("_id", DESCENDING)],
+            name="idx_usuario_fecha"
+        )
+        self.reviews_usuario.create_index(
+            [("titulo", ASCENDING), ("usuario", ASCENDING)],
+            name="idx_titulo_usuario"
+        )
+
+    # ==================== MANTENIMIENTO ====================
+
+    def aplicar_evento(self, evento: str, datos: Dict[str, Any]) -> None:
+        """
+        Observador para CRUDOperations.registrar_observador.
+
+        archivar_reviews se ignora: las reviews archivadas siguen en el
+        historial.
+
+        Args:
+            evento: Nombre del evento de escritura
+            datos: Datos del evento
+        """
+        if evento == "insertar":
+            self._insertar(
+                doc for p in datos["peliculas"] for doc in _documentos(p["titulo"], p.get("reviews") or [])
+            )
+        elif evento == "reviews":
+            self._insertar(
+                doc for titulo, reviews in datos["reviews"].items() for doc in _documentos(titulo, reviews)
+            )
+        elif evento == "eliminar_review":
+            for titulo, usuarios in datos["reviews"].items():
+                self.reviews_usuario.delete_many({"titulo": titulo, "usuario": {"$in": list(usuarios)}})
+        elif evento == "eliminar":
+            self.reviews_usuario.delete_many({"titulo": {"$in": [p["titulo"] for p in datos["peliculas"]]}})
+
+    def _insertar(self, documentos: Iterable[Dict[str, Any]]) -> int:
+        """Inserta documentos de review."""
+        documentos = list(documentos)
+        if documentos:
+            self.reviews_usuario.insert_many(documentos, ordered=False)
+        return len(documentos)
+
+    def reconstruir(self) -> int:
+        """
+        Regenera la coleccion desnormalizada desde las peliculas.
+
+        Returns:
+            Numero de reviews copiadas
+        """
+        pipeline = [
+            {"$match": {"reviews.0": {"$exists": True}}},
+            {"$unwind": "$reviews"},
+            {"$replaceWith": {"$mergeObjects": ["$reviews", {"titulo": "$titulo"}]}}
+        ]
+        self.reviews_usuario.delete_many({})
+        total = 0
+        lote: List[Dict[str, Any]] = []
+        for doc in self.collection.aggregate(pipeline, allowDiskUse=True):
+            lote.append(doc)
+            if len(lote) >= _TAMAÑO_LOTE:
+                total += self._insertar(lote)
+                lote = []
+        total += self._insertar(lote)
+        self.crear_indices()
+
+        logger.info("Reviews por usuario reconstruidas: %d", total)
+        return total
+
+    # ==================== CONSULTA ====================
+
+    def historial(self, usuario: str, pagina: int = 1, tamaño: int = USER_REVIEWS_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Reviews de un usuario, de la mas reciente a la mas antigua.
+
+        Args:
+            usuario: Nombre del usuario
+            pagina: Numero de pagina (desde 1)
+            tamaño: Reviews por pagina
+
+        Returns:
+            Diccionario con reviews, pagina, paginas y total
+        """
+        total = self.reviews_usuario.count_documents({"usuario": usuario})
+        reviews = list(
+            self.reviews_usuario.find({"usuario": usuario}, _PROYECCION)
+            .sort([("fecha", DESCENDING), ("_id", DESCENDING)])
+            .skip((max(pagina, 1) - 1) * tamaño)
+            .limit(tamaño)
+        )
+        return {
+            "reviews": reviews,
+            "pagina": max(pagina, 1),
+            "paginas": -(-total // tamaño),
+            "total": total
+        }
+
+    def resumen(self, usuario: str) -> Dict[str, Any]:
+        """
+        Numero de reviews y puntuacion media de un usuario.
+
+        Returns:
+            Diccionario con usuario, total_reviews, puntuacion_media,
+            primera y ultima fecha
+        """
+        pipeline = [
+            {"$match": {"usuario": usuario}},
+            {"$group": {
+                "_id": None,
+                "total_reviews": {"$sum": 1},
+                "puntuacion_media": {"$avg": "$puntuacion"},
+                "primera": {"$min": "$fecha"},
+                "ultima": {"$max": "$fecha"}
+            }}
+        ]
+        resultado = next(self.reviews_usuario.aggregate(pipeline), None)
+        if resultado is None:
+            return {"usuario": usuario, "total_reviews": 0, "puntuacion_media": None, "primera": None, "ultima": None}
+        resultado.pop("_id")
+        resultado["puntuacion_media"] = round(resultado["puntuacion_media"], 2)
+        return {"usuario": usuario, **resultado}
+
+    def usuarios_mas_activos(self, limite: int = 10) -> List[Dict[str, Any]]:
+        """
+        Usuarios con mas reviews.
+
+        Returns:
+            Lista de {"usuario", "total_reviews", "puntuacion_media"}
+        """
+        pipeline = [
+            {"$group": {"_id": "$usuario", "total_reviews": {"$sum": 1}, "puntuacion_media": {"$avg": "$puntuacion"}}},
+            {"$sort": {"total_reviews": -1, "_id": 1}},
+            {"$limit": limite},
+            {"$project": {
+                "_id": 0,
+                "usuario": "$_id",
+                "total_reviews": 1,
+                "puntuacion_media": {"$round": ["$puntuacion_media", 2]}
+            }}
+        ]
+        return list(self.reviews_usuario.aggregate(pipeline))
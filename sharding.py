@@ -0,0 +1,146 @@
+"""
+Soporte para despliegues shardeados de la coleccion de peliculas.
+
+Define las claves de shard admitidas, detecta si un filtro puede
+dirigirse a un solo shard y ofrece un enrutador local sobre varias
+colecciones/servidores que sirve como sustituto de un cluster para
+verificar el enrutamiento.
+"""
+
+import hashlib
+from bisect import bisect_right
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pymongo.collection import Collection
+
+from config import get_logger
+
+logger = get_logger(__name__)
+
+# Claves de shard admitidas. generos no puede formar parte de la clave
+# porque es un array (MongoDB no admite claves de shard multikey).
+CLAVES_SHARD: Dict[str, Dict[str, Any]] = {
+    "hashed_id": {"id": "hashed"},
+    "año_id": {"año": 1, "id": 1},
+}
+
+
+class ResultadoEscritura(NamedTuple):
+    """Resultado de RouterLocal.update_one (como UpdateResult de pymongo)."""
+
+    matched_count: int
+    modified_count: int
+
+
+def campos_clave(clave: Dict[str, Any]) -> Tuple[str, ...]:
+    """Campos que forman una clave de shard."""
+    return tuple(clave)
+
+
+def _igualdades(filtro: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos de primer nivel (o dentro de $and) comparados por igualdad."""
+    iguales: Dict[str, Any] = {}
+    for campo, valor in filtro.items():
+        if campo == "$and":
+            for sub in valor:
+                iguales.update(_igualdades(sub))
+        elif campo.startswith("$"):
+            continue
+        elif isinstance(valor, dict) and any(k.startswith("$") for k in valor):
+            if "$eq" in valor:
+                iguales[campo] = valor["$eq"]
+        else:
+            iguales[campo] = valor
+    return iguales
+
+
+def es_dirigida(filtro: Dict[str, Any], clave: Dict[str, Any]) -> bool:
+    """
+    Indica si un filtro puede resolverse en un solo shard.
+
+    Para claves hashed se necesita igualdad en el campo; para claves por
+    rango basta la igualdad en el prefijo completo de la clave.
+
+    Args:
+        filtro: Filtro de MongoDB
+        clave: Clave de shard (valor de CLAVES_SHARD)
+    """
+    iguales = _igualdades(filtro)
+    return all(campo in iguales for campo in campos_clave(clave))
+
+
+def valores_clave(documento: Dict[str, Any], clave: Dict[str, Any]) -> Dict[str, Any]:
+    """Extrae los valores de la clave de shard de un documento."""
+    return {campo: documento[campo] for campo in campos_clave(clave) if campo in documento}
+
+
+class RouterLocal:
+    """
+    Enrutador en cliente sobre varias colecciones que actuan como shards.
+
+    Sustituye a mongos en pruebas locales: cada shard puede ser una
+    coleccion en un mongod distinto (o en el mismo). Las operaciones con
+    la clave de shard completa van a un unico shard; el resto se
+    difunden a todos y se contabilizan como scatter-gather. Implementa
+    find, find_one y update_one como Collection, de modo que
+    CRUDOperations puede escribir sobre el cluster simulado.
+    """
+
+    def __init__(
+        self,
+        shards: Sequence[Collection],
+        clave: Dict[str, Any] = CLAVES_SHARD["hashed_id"],
+        limites_año: Optional[List[int]] = None
+    ):
+        """
+        Args:
+            shards: Colecciones que actuan como shards
+            clave: Clave de shard (valor de CLAVES_SHARD)
+            limites_año: Para claves por año, limites entre shards
+                (len(shards) - 1 valores crecientes)
+        """
+        self.shards = list(shards)
+        self.clave = clave
+        self.limites_año = limites_año or []
+        self.estadisticas = {"dirigidas": 0, "scatter_gather": 0}
+
+    def shard_de(self, valores: Dict[str, Any]) -> int:
+        """Indice del shard que corresponde a los valores de la clave."""
+        if self.clave.get("id") == "hashed":
+            digest = hashlib.md5(str(valores["id"]).encode()).digest()
+            return int.from_bytes(digest[:8], "little") % len(self.shards)
+        return bisect_right(self.limites_año, valores["año"])
+
+    def _destinos(self, filtro: Dict[str, Any]) -> List[Collection]:
+        if es_dirigida(filtro, self.clave):
+            self.estadisticas["dirigidas"] += 1
+            return [self.shards[self.shard_de(_igualdades(filtro))]]
+        self.estadisticas["scatter_gather"] += 1
+        logger.debug("Consulta scatter-gather: %s", filtro)
+        return self.shards
+
+    def insert_one(self, documento: Dict[str, Any]) -> int:
+        """Inserta en el shard de la clave; devuelve el indice del shard."""
+        indice = self.shard_de(valores_clave(documento, self.clave))
+        self.shards[indice].insert_one(documento)
+        return indice
+
+    def find(self, filtro: Dict[str, Any], proyeccion: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """Busca en los shards que pueden contener resultados."""
+        resultados: List[Dict] = []
+        for shard in self._destinos(filtro):
+            resultados.extend(shard.find(filtro, proyeccion))
+        return resultados
+
+    def find_one(self, filtro: Dict[str, Any], proyeccion: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+        """Primer documento que cumple el filtro, o None."""
+        resultados = self.find(filtro, proyeccion)
+        return resultados[0] if resultados else None
+
+    def update_one(self, filtro: Dict[str, Any], update: Any) -> ResultadoEscritura:
+        """Actualiza un documento en el primer shard que lo contiene."""
+        for shard in self._destinos(filtro):
+            resultado = shard.update_one(filtro, update)
+            if resultado.matched_count:
+                return ResultadoEscritura(resultado.matched_count, resultado.modified_count)
+        return ResultadoEscritura(0, 0)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los modulos del proyecto se importan como modulos planos (from config import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
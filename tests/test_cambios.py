@@ -0,0 +1,50 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import cambios
+from cambios import BusCambios
+
+
+def _bus(tmp_path, **opciones):
+    bus = BusCambios(None, None, max_intentos=3, ruta_rechazados=str(tmp_path / "rechazados.jsonl"), **opciones)
+    bus._pool = ThreadPoolExecutor(max_workers=2)
+    return bus
+
+
+def _evento(segundos_atras):
+    momento = datetime.now(timezone.utc) - timedelta(seconds=segundos_atras)
+    return {"operationType": "insert", "wallTime": momento, "documentKey": {"_id": 1}}
+
+
+def test_consumidor_que_siempre_falla_no_bloquea_el_bus(tmp_path, monkeypatch):
+    monkeypatch.setattr(cambios, "CHANGE_RETRY_MAX_SECONDS", 0.01)
+    bus = _bus(tmp_path)
+    recibidos = []
+
+    def roto(lote):
+        raise ValueError("evento venenoso")
+
+    bus.registrar("roto", roto)
+    bus.registrar("sano", recibidos.extend)
+    bus._detener.wait = lambda espera: False
+
+    assert bus._despachar([_evento(1)])
+    metricas = bus.metricas()["consumidores"]
+    assert metricas["roto"]["errores"] == 3
+    assert metricas["roto"]["descartados"] == 1
+    assert metricas["sano"]["procesados"] == 1 and len(recibidos) == 1
+    with open(tmp_path / "rechazados.jsonl", encoding="utf-8") as f:
+        rechazo = json.loads(f.readline())
+    assert "evento venenoso" in rechazo["errores"][0]
+
+
+def test_retraso_crece_mientras_hay_un_lote_pendiente(tmp_path):
+    bus = _bus(tmp_path)
+    bus.registrar("lento", lambda lote: None)
+    registro = bus._consumidores[0]
+    registro.pendiente_desde = _evento(120)["wallTime"]
+
+    assert bus.metricas()["consumidores"]["lento"]["retraso_segundos"] >= 120
+    assert bus._despachar([_evento(0)])
+    assert bus.metricas()["consumidores"]["lento"]["retraso_segundos"] < 60
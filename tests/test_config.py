@@ -0,0 +1,49 @@
+import logging
+
+import config
+from config import MUESTREO, FiltroMuestreo, LoggerMuestreado, _QueueHandlerDiferido
+
+
+class _Cola:
+    def __init__(self):
+        self.registros = []
+
+    def put_nowait(self, registro):
+        self.registros.append(registro)
+
+
+def test_muestreo_descarta_antes_de_crear_el_registro(monkeypatch):
+    monkeypatch.setattr(config, "_muestreo", FiltroMuestreo(10))
+    logger = LoggerMuestreado("prueba_muestreo")
+    creados = []
+    crear = logger.makeRecord
+    monkeypatch.setattr(logger, "makeRecord", lambda *a, **k: creados.append(1) or crear(*a, **k))
+    cola = _Cola()
+    logger.addHandler(_QueueHandlerDiferido(cola))
+
+    for i in range(100):
+        logger.info("Pelicula %d insertada", i, extra=MUESTREO)
+    logger.warning("sin muestreo")
+
+    assert len(creados) == 11
+    assert len(cola.registros) == 11
+    assert cola.registros[-1].levelno == logging.WARNING
+
+
+def test_prepare_congela_argumentos_mutables():
+    cola = _Cola()
+    handler = _QueueHandlerDiferido(cola)
+    filtro = {"año": 1999}
+    titulos = ["Matrix"]
+
+    handler.emit(logging.LogRecord("prueba", logging.INFO, __file__, 1, "Filtro %s", (filtro,), None))
+    handler.emit(logging.LogRecord("prueba", logging.INFO, __file__, 1, "%(n)d titulos", ({"n": 1},), None))
+    handler.emit(logging.LogRecord("prueba", logging.INFO, __file__, 1, "Titulos %s (%d)", (titulos, 1), None))
+    handler.emit(logging.LogRecord("prueba", logging.INFO, __file__, 1, "Titulo %s", ("Matrix",), None))
+    filtro["año"] = 2000
+    titulos.append("Alien")
+
+    mensajes = [r.getMessage() for r in cola.registros]
+    assert mensajes == ["Filtro {'año': 1999}", "1 titulos", "Titulos ['Matrix'] (1)", "Titulo Matrix"]
+    # Los argumentos inmutables se siguen formateando en el listener
+    assert cola.registros[-1].args == ("Matrix",)
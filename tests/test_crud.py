@@ -0,0 +1,37 @@
+import crud
+from crud import CRUDOperations
+from sharding import CLAVES_SHARD
+
+
+class _Coleccion:
+    """Solo el find por titulos con que se resuelven las claves de shard."""
+
+    def __init__(self, documentos):
+        self.documentos = {d["titulo"]: d for d in documentos}
+        self.consultas = []
+
+    def find(self, filtro, proyeccion=None):
+        titulos = filtro["titulo"]["$in"]
+        self.consultas.append(list(titulos))
+        return [
+            {"titulo": t, "id": self.documentos[t]["id"]}
+            for t in titulos if t in self.documentos
+        ]
+
+
+def test_claves_de_shard_en_lru_acotada(monkeypatch):
+    monkeypatch.setattr(crud, "SHARD_KEY_CACHE_SIZE", 2)
+    coleccion = _Coleccion([{"titulo": t, "id": i} for i, t in enumerate("abc")])
+    operaciones = CRUDOperations(coleccion, clave_shard=CLAVES_SHARD["hashed_id"])
+
+    assert operaciones._filtro_titulo("a") == {"titulo": "a", "id": 0}
+    operaciones._filtro_titulo("b")
+    operaciones._filtro_titulo("a")  # "a" pasa a ser la mas reciente
+    operaciones._filtro_titulo("c")  # expulsa a "b"
+
+    assert list(operaciones._claves_por_titulo) == ["a", "c"]
+    assert coleccion.consultas == [["a"], ["b"], ["c"]]
+
+    assert operaciones._filtro_titulo("b") == {"titulo": "b", "id": 1}
+    assert coleccion.consultas[-1] == ["b"]
+    assert list(operaciones._claves_por_titulo) == ["c", "b"]
@@ -0,0 +1,54 @@
+from copy import deepcopy
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from exporter import Exportador
+from models import PELICULAS_INICIALES
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+class _Cursor(list):
+    def sort(self, orden):
+        return self
+
+
+class _Coleccion:
+    def __init__(self, documentos):
+        self.documentos = documentos
+
+    def find(self, filtro, proyeccion=None, batch_size=None):
+        return _Cursor(deepcopy(self.documentos))
+
+
+def _semilla():
+    ahora = datetime(2024, 1, 1, 12, 30)
+    pelicula = deepcopy(PELICULAS_INICIALES[0])
+    pelicula.update({"_id": ObjectId(), "id": "p1", "createdAt": ahora, "updatedAt": ahora})
+    return pelicula
+
+
+def test_parquet_conserva_fechas(tmp_path):
+    ruta = tmp_path / "peliculas.parquet"
+    total = Exportador(_Coleccion([_semilla()])).exportar("filtro", str(ruta))
+
+    tabla = pq.read_table(ruta)
+    assert total == 1
+    assert tabla.column("createdAt").to_pylist() == [datetime(2024, 1, 1, 12, 30)]
+    assert tabla.column("titulo").to_pylist() == ["Inception"]
+
+
+def test_parquet_columnas_de_varios_chunks(tmp_path):
+    ruta = tmp_path / "mixto.parquet"
+    documentos = [
+        {"titulo": "A", "createdAt": datetime(2024, 1, 1), "año": 2000},
+        {"titulo": "B", "año": None, "extra": 1.5},
+    ]
+    Exportador(_Coleccion(documentos), tamaño_chunk=1).exportar("filtro", str(ruta))
+
+    filas = pq.read_table(ruta).to_pylist()
+    assert [f["titulo"] for f in filas] == ["A", "B"]
+    assert filas[0]["createdAt"] == datetime(2024, 1, 1)
+    assert filas[1]["extra"] == 1.5
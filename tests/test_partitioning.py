@@ -0,0 +1,84 @@
+from collections import Counter
+from numbers import Number
+
+from parallel_aggregation import AgregacionParalela
+from partitioning import calcular_rangos, filtro_rango
+
+
+def _cumple_condicion(documento, campo, condicion):
+    valor = documento.get(campo)
+    if not isinstance(condicion, dict):
+        return valor == condicion
+    for op, referencia in condicion.items():
+        # Como en MongoDB, las comparaciones solo casan valores del mismo tipo
+        comparable = isinstance(valor, Number) and isinstance(referencia, Number)
+        if op == "$gte" and not (comparable and valor >= referencia):
+            return False
+        if op == "$lt" and not (comparable and valor < referencia):
+            return False
+        if op == "$ne" and valor == referencia:
+            return False
+        if op == "$exists" and (campo in documento) != referencia:
+            return False
+        if op == "$not" and _cumple_condicion(documento, campo, referencia):
+            return False
+    return True
+
+
+def _cumple(documento, filtro):
+    for clave, condicion in filtro.items():
+        if clave == "$and":
+            if not all(_cumple(documento, f) for f in condicion):
+                return False
+        elif not _cumple_condicion(documento, clave, condicion):
+            return False
+    return True
+
+
+class _Coleccion:
+    """Las etapas que usan calcular_rangos y AgregacionParalela.agrupar."""
+
+    def __init__(self, documentos):
+        self.documentos = documentos
+
+    def aggregate(self, pipeline):
+        docs = list(self.documentos)
+        for etapa in pipeline:
+            (nombre, valor), = etapa.items()
+            if nombre == "$match":
+                docs = [d for d in docs if _cumple(d, valor)]
+            elif nombre == "$project":
+                docs = [{"v": d[valor["v"][1:]]} for d in docs]
+            elif nombre == "$sort":
+                # Orden BSON: numeros antes que cadenas
+                docs.sort(key=lambda d: (isinstance(d["v"], str), d["v"]))
+            elif nombre == "$group":
+                conteo = Counter(d.get(valor["_id"][1:]) for d in docs)
+                docs = [{"_id": clave, "cantidad": n} for clave, n in conteo.items()]
+        return iter(docs)
+
+
+def _peliculas():
+    documentos = [{"_id": i, "año": 1950 + i % 70} for i in range(200)]
+    documentos += [{"_id": 200}, {"_id": 201, "año": None}, {"_id": 202, "año": "desconocido"}]
+    return documentos
+
+
+def test_rangos_cubren_documentos_sin_campo():
+    documentos = _peliculas()
+    rangos = calcular_rangos(_Coleccion(documentos), 4, "año")
+    assert len(rangos) > 1
+
+    for documento in documentos:
+        coincidencias = [r for r in rangos if _cumple(documento, filtro_rango(r, "año"))]
+        assert len(coincidencias) == 1, documento
+
+
+def test_agrupacion_paralela_igual_a_serie():
+    documentos = _peliculas()
+    serie = Counter(d.get("año") for d in documentos)
+
+    grupos = AgregacionParalela(_Coleccion(documentos), workers=4, campo="año").agrupar(
+        "$año", {"cantidad": ("count", None)}
+    )
+    assert {g["_id"]: g["cantidad"] for g in grupos} == dict(serie)
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+pytest.importorskip("scipy")
+
+from recomendador import RecomendadorColaborativo
+
+
+class _Coleccion:
+    """Responde a la agregacion de extraer_matriz con una review por fila."""
+
+    def __init__(self, peliculas):
+        self.peliculas = peliculas
+
+    def aggregate(self, pipeline, **opciones):
+        for titulo, reviews in self.peliculas.items():
+            for r in reviews:
+                yield {"titulo": titulo, "usuario": r["usuario"], "puntuacion": r["puntuacion"]}
+
+
+def _catalogo(semilla=7, usuarios=40, peliculas=30):
+    azar = random.Random(semilla)
+    return azar, {
+        f"P{j}": [
+            {"usuario": f"u{i}", "puntuacion": azar.randint(1, 10)}
+            for i in range(usuarios) if azar.random() < 0.3
+        ]
+        for j in range(peliculas)
+    }
+
+
+def _añadir(catalogo, modelo, titulo, usuario, puntuacion):
+    review = {"usuario": usuario, "puntuacion": puntuacion}
+    catalogo.setdefault(titulo, []).append(review)
+    modelo.aplicar_evento("reviews", {"reviews": {titulo: [review]}})
+
+
+def test_refresco_incremental_igual_a_reentrenar():
+    azar, catalogo = _catalogo()
+    incremental = RecomendadorColaborativo(_Coleccion(catalogo), k=5)
+    incremental.entrenar()
+
+    # Review repetida del mismo usuario en la misma pelicula
+    ya_valorada = catalogo["P3"][0]["usuario"]
+    _añadir(catalogo, incremental, "P3", ya_valorada, 1)
+    _añadir(catalogo, incremental, "P3", ya_valorada, 10)
+    # Reviews nuevas, usuario nuevo y pelicula nueva
+    for _ in range(20):
+        _añadir(catalogo, incremental, f"P{azar.randrange(30)}", f"u{azar.randrange(40)}", azar.randint(1, 10))
+    _añadir(catalogo, incremental, "P0", "nuevo", 9)
+    _añadir(catalogo, incremental, "Estreno", "u1", 6)
+    # Eliminacion de todas las reviews de un usuario en una pelicula
+    eliminado = catalogo["P5"][0]["usuario"]
+    catalogo["P5"] = [r for r in catalogo["P5"] if r["usuario"] != eliminado]
+    incremental.aplicar_evento("eliminar_review", {"reviews": {"P5": [eliminado]}})
+    # Reviews movidas al archivo: fuera de la coleccion principal
+    archivadas = catalogo["P7"][:2]
+    catalogo["P7"] = catalogo["P7"][2:]
+    incremental.aplicar_evento("archivar_reviews", {"reviews": {"P7": archivadas}})
+    incremental.refrescar()
+
+    completo = RecomendadorColaborativo(_Coleccion(catalogo), k=5)
+    completo.entrenar()
+
+    usuarios = sorted(set(completo._usuarios) | set(incremental._usuarios))
+    for usuario in usuarios:
+        assert incremental.recomendar(usuario, 10) == completo.recomendar(usuario, 10), usuario
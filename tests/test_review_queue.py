@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+
+from pymongo.errors import BulkWriteError
+
+from review_queue import ColaReviews
+
+
+class _CrudFalso:
+    """Escribe en memoria; los titulos de `rotos` fallan siempre."""
+
+    def __init__(self, rotos=()):
+        self.rotos = set(rotos)
+        self.escritas = {}
+
+    def añadir_reviews_lote(self, reviews_por_titulo):
+        titulos = list(reviews_por_titulo)
+        errores = [
+            {"index": i, "code": 121, "errmsg": "Document failed validation"}
+            for i, titulo in enumerate(titulos) if titulo in self.rotos
+        ]
+        for titulo, reviews in reviews_por_titulo.items():
+            if titulo not in self.rotos:
+                self.escritas.setdefault(titulo, []).extend(reviews)
+        if errores:
+            raise BulkWriteError({"writeErrors": errores})
+        return len(titulos)
+
+
+def _escribir_wal(ruta, entradas):
+    with open(ruta, "w", encoding="utf-8") as f:
+        for seq, titulo in entradas:
+            review = {"usuario": f"u{seq}", "puntuacion": 7, "comentario": "", "createdAt": "2024-01-01T00:00:00"}
+            f.write(json.dumps({"seq": seq, "titulo": titulo, "review": review}) + "\n")
+
+
+def test_wal_mayor_que_la_capacidad_no_bloquea(tmp_path):
+    ruta = str(tmp_path / "reviews.wal")
+    _escribir_wal(ruta, [(seq, f"P{seq % 3}") for seq in range(1, 51)])
+    crud = _CrudFalso()
+
+    creada = []
+    hilo = threading.Thread(target=lambda: creada.append(
+        ColaReviews(crud, capacidad=5, tamaño_lote=4, intervalo=0.01, ruta_wal=ruta)
+    ))
+    hilo.start()
+    hilo.join(10)
+    assert creada, "el constructor se quedo bloqueado"
+
+    creada[0].cerrar()
+    assert sum(len(r) for r in crud.escritas.values()) == 50
+
+
+def test_titulo_que_siempre_falla_va_al_dead_letter(tmp_path):
+    ruta_rechazados = str(tmp_path / "rechazados.jsonl")
+    crud = _CrudFalso(rotos={"Rota"})
+
+    with ColaReviews(crud, tamaño_lote=10, intervalo=0.01, max_intentos=3,
+                     ruta_rechazados=ruta_rechazados) as cola:
+        cola.encolar("Rota", "ana", 5, "")
+        cola.encolar("Buena", "luis", 8, "")
+        limite = time.monotonic() + 10
+        while cola.estadisticas["rechazadas"] == 0 and time.monotonic() < limite:
+            time.sleep(0.01)
+
+    with open(ruta_rechazados, encoding="utf-8") as f:
+        rechazadas = [json.loads(linea) for linea in f]
+    assert [r["documento"]["titulo"] for r in rechazadas] == ["Rota"]
+    assert len(crud.escritas["Buena"]) == 1
+    assert cola.estadisticas["rechazadas"] == 1
@@ -0,0 +1,215 @@
+"""
+Validacion de documentos en cliente a partir de SCHEMA_VALIDATOR.
+
+El esquema $jsonSchema se compila una sola vez a un arbol de funciones,
+de modo que validar un documento no vuelve a interpretar el esquema.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from bson import ObjectId
+
+from config import DEAD_LETTER_PATH, get_logger
+from models import SCHEMA_VALIDATOR
+
+logger = get_logger(__name__)
+
+# Funcion compilada: (valor, ruta, errores) -> None
+Regla = Callable[[Any, str, List[str]], None]
+
+_INT32_MIN = -(2 ** 31)
+_INT32_MAX = 2 ** 31 - 1
+
+
+def _es_int(v: Any) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool) and _INT32_MIN <= v <= _INT32_MAX
+
+
+def _es_long(v: Any) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+_TIPOS_BSON: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "int": _es_int,
+    "long": _es_long,
+    "double": lambda v: isinstance(v, float),
+    "bool": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "date": lambda v: isinstance(v, datetime),
+    "objectId": lambda v: isinstance(v, ObjectId),
+    "null": lambda v: v is None,
+}
+
+
+def _compilar(esquema: Dict[str, Any]) -> Regla:
+    """
+    Compila un nodo de $jsonSchema a una funcion de validacion.
+
+    Args:
+        esquema: Nodo del esquema (con bsonType, properties, items...)
+
+    Returns:
+        Funcion que añade a `errores` los fallos encontrados
+    """
+    tipo = esquema.get("bsonType")
+    if isinstance(tipo, list):
+        comprobadores = tuple(_TIPOS_BSON[t] for t in tipo)
+        es_tipo = lambda v: any(c(v) for c in comprobadores)
+        tipo = "|".join(tipo)
+    else:
+        es_tipo = _TIPOS_BSON[tipo] if tipo else None
+    reglas: List[Regla] = []
+
+    if "minimum" in esquema:
+        minimo = esquema["minimum"]
+
+        def _minimo(v, ruta, errores):
+            if v < minimo:
+                errores.append(f"{ruta}: {v!r} menor que {minimo}")
+        reglas.append(_minimo)
+
+    if "maximum" in esquema:
+        maximo = esquema["maximum"]
+
+        def _maximo(v, ruta, errores):
+            if v > maximo:
+                errores.append(f"{ruta}: {v!r} mayor que {maximo}")
+        reglas.append(_maximo)
+
+    if "minItems" in esquema:
+        min_items = esquema["minItems"]
+
+        def _min_items(v, ruta, errores):
+            if len(v) < min_items:
+                errores.append(f"{ruta}: requiere al menos {min_items} elementos")
+        reglas.append(_min_items)
+
+    if "required" in esquema:
+        requeridos = tuple(esquema["required"])
+
+        def _requeridos(v, ruta, errores):
+            for campo in requeridos:
+                if campo not in v:
+                    errores.append(f"{ruta}.{campo}: campo requerido" if ruta else f"{campo}: campo requerido")
+        reglas.append(_requeridos)
+
+    if "properties" in esquema:
+        propiedades = tuple(
+            (campo, _compilar(sub)) for campo, sub in esquema["properties"].items()
+        )
+
+        def _propiedades(v, ruta, errores):
+            for campo, regla in propiedades:
+                if campo in v:
+                    regla(v[campo], f"{ruta}.{campo}" if ruta else campo, errores)
+        reglas.append(_propiedades)
+
+    if "items" in esquema:
+        regla_item = _compilar(esquema["items"])
+
+        def _items(v, ruta, errores):
+            for i, item in enumerate(v):
+                regla_item(item, f"{ruta}[{i}]", errores)
+        reglas.append(_items)
+
+    reglas_t = tuple(reglas)
+
+    def _validar(v, ruta, errores):
+        if es_tipo is not None and not es_tipo(v):
+            if tipo == "int" and _es_long(v):
+                errores.append(f"{ruta}: {v!r} fuera del rango de int32")
+            else:
+                errores.append(f"{ruta or 'documento'}: se esperaba {tipo}, recibido {type(v).__name__}")
+            return
+        for regla in reglas_t:
+            regla(v, ruta, errores)
+
+    return _validar
+
+
+class ValidadorEsquema:
+    """
+    Validador en cliente compilado a partir de un $jsonSchema de MongoDB.
+
+    Replica las reglas usadas en SCHEMA_VALIDATOR (bsonType, required,
+    properties, items, minimum, maximum, minItems) para descartar
+    documentos invalidos antes de enviarlos al servidor.
+    """
+
+    def __init__(self, schema: Dict[str, Any] = SCHEMA_VALIDATOR):
+        """
+        Compila el esquema.
+
+        Args:
+            schema: Validador con la clave $jsonSchema
+        """
+        self._validar = _compilar(schema["$jsonSchema"])
+
+    def errores(self, documento: Dict[str, Any]) -> List[str]:
+        """
+        Valida un documento.
+
+        Returns:
+            Lista de errores (vacia si el documento es valido)
+        """
+        errores: List[str] = []
+        self._validar(documento, "", errores)
+        return errores
+
+    def es_valido(self, documento: Dict[str, Any]) -> bool:
+        """Indica si el documento cumple el esquema."""
+        return not self.errores(documento)
+
+    def filtrar(
+        self,
+        documentos: Iterable[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], List[str]]]]:
+        """
+        Separa documentos validos de rechazados.
+
+        Returns:
+            Tupla (validos, rechazados) donde cada rechazado es (documento, errores)
+        """
+        validos = []
+        rechazados = []
+        for doc in documentos:
+            errores = self.errores(doc)
+            if errores:
+                rechazados.append((doc, errores))
+            else:
+                validos.append(doc)
+        return validos, rechazados
+
+
+def escribir_rechazados(
+    rechazados: List[Tuple[Dict[str, Any], List[str]]],
+    ruta: str = DEAD_LETTER_PATH
+) -> int:
+    """
+    Añade documentos rechazados a un fichero dead-letter JSONL.
+
+    Args:
+        rechazados: Pares (documento, errores)
+        ruta: Fichero de destino
+
+    Returns:
+        Numero de documentos escritos
+    """
+    if not rechazados:
+        return 0
+
+    with open(ruta, "a", encoding="utf-8") as f:
+        for doc, errores in rechazados:
+            linea = {"documento": doc, "errores": errores, "fecha": datetime.now()}
+            f.write(json.dumps(linea, ensure_ascii=False, default=str) + "\n")
+
+    logger.warning("%d documentos rechazados enviados a %s", len(rechazados), ruta)
+    return len(rechazados)
+
+
+# Validador compilado una vez para el esquema de peliculas
+VALIDADOR_PELICULAS = ValidadorEsquema()